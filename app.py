@@ -1,29 +1,210 @@
 from io import BytesIO
-from flask_cors import CORS
 from dotenv import load_dotenv
-from google.genai import Client
-import os, json, re, math, requests
-from reportlab.lib.units import inch
-from reportlab.lib.pagesizes import letter
-from flask import Flask, jsonify, request, send_file
-from reportlab.lib.styles import getSampleStyleSheet
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
-
-
-from symptom_analyser import SymptomAnalyzer
+import os, json, re, math, time, uuid, queue, threading, contextvars
+from datetime import date
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from flask import Blueprint, Flask, Response, g, jsonify, request, send_file, stream_with_context
+
+
+from ttl_cache import TTLCache
+from shared_cache import SharedCache
+from single_flight import SingleFlight
+from gemini_scheduler import GeminiScheduler, SchedulerBusy, PRIORITY_SYMPTOM, PRIORITY_LIFESTYLE
+from pdf_renderer import PDFRenderer, RendererBusy, condition_keyword
+from text_normalizer import normalize
+from health_records import HealthRecordStore, InvalidCursor, DATE_FILTERS
+from deadline import current_deadline, end_deadline, out_of_time, start_deadline, time_left
+from metrics import (
+    REGISTRY, REQUEST_SECONDS, REQUESTS_TOTAL, GEMINI_REQUESTS_TOTAL, CollectedCounter, Counter, Gauge, Histogram, stage,
+    start_request_timings, end_request_timings, server_timing_header,
+)
+
+# Heavy libraries (google.genai, reportlab, rapidfuzz, numpy, requests,
+# flask_cors) are imported where they are first needed, so importing this
+# module stays cheap. Serve with create_app(); warm_up() builds the lazy
+# pieces ahead of traffic.
 
 load_dotenv()
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+GEMINI_BASE_URL = os.getenv("GEMINI_BASE_URL")
+WARM_UP = os.getenv("WARM_UP", "0").lower() in ("1", "true", "yes")
+
+api = Blueprint("medisense", __name__)
+
+_init_lock = threading.RLock()
+_app = None
+
+client = None
+analyzer = None
+critical_detector = None
+hospital_index = None
+overpass_client = None
+health_records = None
+firebase_request = None
+condition_index = None
+
+
+def _lazy_global(name, factory):
+    """Value of module global ``name``, creating it with ``factory()`` on first use."""
+    value = globals()[name]
+    if value is None:
+        with _init_lock:
+            value = globals()[name]
+            if value is None:
+                value = globals()[name] = factory()
+    return value
+
+
+def _make_client():
+    if not GEMINI_API_KEY:
+        raise RuntimeError("❌ Missing GEMINI_API_KEY environment variable.")
+    from google.genai import Client
+    gemini = Client(api_key=GEMINI_API_KEY, http_options={"base_url": GEMINI_BASE_URL} if GEMINI_BASE_URL else None)
+    print("✅ Gemini client initialized successfully.")
+    return gemini
+
+
+def get_client():
+    return _lazy_global("client", _make_client)
+
+
+SYMPTOM_LEXICON_PATH = os.getenv("SYMPTOM_LEXICON_PATH")
+# Where the compiled lexicon is written and memory-mapped from; workers
+# pointed at the same file share it. Defaults to next to the lexicon.
+SYMPTOM_LEXICON_COMPILED_PATH = os.getenv("SYMPTOM_LEXICON_COMPILED_PATH")
+SYMPTOM_LEXICON_RELOAD_SECONDS = float(os.getenv("SYMPTOM_LEXICON_RELOAD_SECONDS", "60"))
+
+
+def _make_analyzer():
+    from symptom_analyser import SymptomAnalyzer
+    from symptom_lexicon import DEFAULT_LEXICON_PATH, SymptomLexicon
+    lexicon = SymptomLexicon(SYMPTOM_LEXICON_PATH or DEFAULT_LEXICON_PATH, SYMPTOM_LEXICON_COMPILED_PATH)
+    if SYMPTOM_LEXICON_RELOAD_SECONDS > 0:
+        lexicon.start_auto_reload(SYMPTOM_LEXICON_RELOAD_SECONDS)
+    return SymptomAnalyzer(lexicon)
+
+
+def get_analyzer():
+    return _lazy_global("analyzer", _make_analyzer)
+
+
+gemini_scheduler = GeminiScheduler(
+    rate=float(os.getenv("GEMINI_RATE_LIMIT", "10")),
+    burst=int(os.getenv("GEMINI_BURST", "20")),
+    max_in_flight=int(os.getenv("GEMINI_MAX_IN_FLIGHT", "8")),
+    max_queue=int(os.getenv("GEMINI_MAX_QUEUE", "100")),
+    queue_timeout=float(os.getenv("GEMINI_QUEUE_TIMEOUT", "5")),
+)
+gemini_flights = SingleFlight(timeout=float(os.getenv("GEMINI_COALESCE_TIMEOUT", "60")))
+
+MAX_BATCH_RECORDS = int(os.getenv("MAX_BATCH_RECORDS", "5000"))
+BATCH_GEMINI_WORKERS = int(os.getenv("BATCH_GEMINI_WORKERS", "8"))
+
+CACHE_DB_PATH = os.getenv("CACHE_DB_PATH")
+
+
+def make_cache(namespace, maxsize, ttl, dumps=json.dumps, loads=json.loads, **kwargs):
+    """A SharedCache in CACHE_DB_PATH when set, so worker processes share entries; otherwise a TTLCache."""
+    if CACHE_DB_PATH:
+        return SharedCache(CACHE_DB_PATH, namespace, maxsize=maxsize, ttl=ttl, dumps=dumps, loads=loads, **kwargs)
+    return TTLCache(maxsize=maxsize, ttl=ttl, **kwargs)
+
+
+RECOMMENDATION_CACHE_SIZE = int(os.getenv("RECOMMENDATION_CACHE_SIZE", "512"))
+recommendation_cache = make_cache(
+    "lifestyle_recommendations",
+    maxsize=RECOMMENDATION_CACHE_SIZE,
+    ttl=float(os.getenv("RECOMMENDATION_CACHE_TTL", "86400")),
+)
+summary_cache = make_cache(
+    "ai_summaries",
+    maxsize=int(os.getenv("SUMMARY_CACHE_SIZE", "2048")),
+    ttl=float(os.getenv("SUMMARY_CACHE_TTL", "86400")),
+)
+# Per-session state of /api/symptom-analysis follow-ups: the last normalized
+# text, its raw symptom matches and the last AI summary.
+analysis_sessions = make_cache(
+    "analysis_sessions",
+    maxsize=int(os.getenv("ANALYSIS_SESSION_CACHE_SIZE", "4096")),
+    ttl=float(os.getenv("ANALYSIS_SESSION_TTL", "3600")),
+)
+
+HOSPITAL_EXTRACT_PATH = os.getenv("HOSPITAL_EXTRACT_PATH")
+HOSPITAL_INDEX_RELOAD_SECONDS = float(os.getenv("HOSPITAL_INDEX_RELOAD_SECONDS", "300"))
+OVERPASS_FALLBACK = os.getenv("OVERPASS_FALLBACK", "1").lower() not in ("0", "false", "no")
+
+
+
+def _make_hospital_index():
+    from hospital_index import HospitalIndex
+    index = HospitalIndex(HOSPITAL_EXTRACT_PATH)
+    if HOSPITAL_INDEX_RELOAD_SECONDS > 0:
+        index.start_auto_reload(HOSPITAL_INDEX_RELOAD_SECONDS)
+    return index
+
+
+def get_hospital_index():
+    """The local hospital index, loaded on first use; None without HOSPITAL_EXTRACT_PATH."""
+    if not HOSPITAL_EXTRACT_PATH:
+        return None
+    return _lazy_global("hospital_index", _make_hospital_index)
+
+
+OVERPASS_MIRRORS = [
+    "https://overpass-api.de/api/interpreter",
+    "https://overpass.kumi.systems/api/interpreter",
+    "https://overpass.openstreetmap.ru/api/interpreter",
+    "https://overpass.nchc.org.tw/api/interpreter",
+    "https://overpass.openstreetmap.fr/api/interpreter",
+    "https://overpass.osm.ch/api/interpreter",
+    "https://maps.mail.ru/osm/tools/overpass/api/interpreter",
+    "https://overpass.openstreetmap.ie/api/interpreter",
+]
+if os.getenv("OVERPASS_MIRRORS"):
+    OVERPASS_MIRRORS = [url.strip() for url in os.getenv("OVERPASS_MIRRORS").split(",") if url.strip()]
+
+OVERPASS_HEDGE = int(os.getenv("OVERPASS_HEDGE", "2"))
+OVERPASS_TIMEOUT = float(os.getenv("OVERPASS_TIMEOUT", "10"))
+
+
+def _make_overpass_client():
+    from overpass_client import OverpassClient
+    return OverpassClient(OVERPASS_MIRRORS, hedge=OVERPASS_HEDGE, timeout=OVERPASS_TIMEOUT)
+
+
+def get_overpass_client():
+    return _lazy_global("overpass_client", _make_overpass_client)
 
-app = Flask(__name__)
-CORS(app)
 
-if not GEMINI_API_KEY:
-    raise RuntimeError("❌ Missing GEMINI_API_KEY environment variable.")
+HOSPITAL_TILE_DEG = float(os.getenv("HOSPITAL_TILE_DEG", "0.02"))
+DEFAULT_HOSPITAL_LIMIT = 15
+MAX_HOSPITAL_LIMIT = int(os.getenv("MAX_HOSPITAL_LIMIT", "100"))
+RADIUS_BUCKETS_KM = [1, 2, 5, 10, 20, 50]
+MAX_HOSPITAL_RADIUS_KM = float(os.getenv("MAX_HOSPITAL_RADIUS_KM", str(RADIUS_BUCKETS_KM[-1])))
 
-analyzer = SymptomAnalyzer()
-client = Client(api_key=GEMINI_API_KEY)
-print("✅ Gemini client initialized successfully.")
+def load_tile(text):
+    from hospital_index import tile_from_hospitals
+    return tile_from_hospitals(json.loads(text))
+
+
+hospital_tile_cache = make_cache(
+    "hospital_tiles",
+    maxsize=int(os.getenv("HOSPITAL_TILE_CACHE_SIZE", "4096")),
+    ttl=float(os.getenv("HOSPITAL_TILE_CACHE_TTL", "21600")),
+    max_weight=int(os.getenv("HOSPITAL_TILE_CACHE_MAX_ELEMENTS", "200000")),
+    weigh=lambda tile: len(tile[0]),
+    # Only the hospital dicts are stored; the coordinate arrays are rebuilt on load.
+    dumps=lambda tile: json.dumps(tile[0]),
+    loads=load_tile,
+)
+# Tiles where Overpass answered with no hospitals. Kept apart, and for less
+# time, so a newly mapped hospital shows up sooner than a full tile refresh.
+empty_tile_cache = make_cache(
+    "hospital_empty_tiles",
+    maxsize=int(os.getenv("HOSPITAL_TILE_CACHE_SIZE", "4096")),
+    ttl=float(os.getenv("HOSPITAL_EMPTY_TILE_TTL", "1800")),
+)
 
 CRITICAL_SYMPTOMS = [
     "chest pain", "difficulty breathing", "severe bleeding", "unconscious", "seizure",
@@ -33,6 +214,166 @@ CRITICAL_SYMPTOMS = [
     "paralysis", "severe trauma", "overdose"
 ]
 
+
+def _make_critical_detector():
+    from symptom_matcher import CriticalSymptomDetector
+    return CriticalSymptomDetector(CRITICAL_SYMPTOMS)
+
+
+def get_critical_detector():
+    return _lazy_global("critical_detector", _make_critical_detector)
+
+
+CRITICAL_FAST_PATH = os.getenv("CRITICAL_FAST_PATH", "1").lower() not in ("0", "false", "no")
+CRITICAL_BACKGROUND_SUMMARY = os.getenv("CRITICAL_BACKGROUND_SUMMARY", "1").lower() not in ("0", "false", "no")
+EMERGENCY_GUIDANCE = (
+    "Your symptoms may indicate a medical emergency. Call your local emergency number "
+    "or go to the nearest emergency department now. Do not drive yourself if you feel "
+    "faint, confused or short of breath, and do not wait for symptoms to improve."
+)
+
+pdf_renderer = PDFRenderer(
+    workers=int(os.getenv("PDF_RENDER_WORKERS", "2")),
+    max_pending=int(os.getenv("PDF_MAX_PENDING", "16")),
+)
+PDF_RENDER_TIMEOUT = float(os.getenv("PDF_RENDER_TIMEOUT", "30"))
+
+background_executor = ThreadPoolExecutor(max_workers=int(os.getenv("BACKGROUND_WORKERS", "4")))
+# Background summaries of emergency answers, by summary id. The state lives
+# in a shared cache, since the poll may reach another worker; the futures
+# only in the process computing them.
+BACKGROUND_SUMMARY_TTL = float(os.getenv("BACKGROUND_SUMMARY_TTL", "600"))
+if CACHE_DB_PATH:
+    # No in-process copy: a worker must see "ready" as soon as the owner writes it.
+    background_summaries = SharedCache(CACHE_DB_PATH, "background_summaries", maxsize=1024,
+                                       ttl=BACKGROUND_SUMMARY_TTL, local_size=0)
+else:
+    background_summaries = TTLCache(maxsize=1024, ttl=BACKGROUND_SUMMARY_TTL)
+pending_summaries = TTLCache(maxsize=1024, ttl=BACKGROUND_SUMMARY_TTL)
+
+SERVER_TIMING = os.getenv("SERVER_TIMING", "0").lower() in ("1", "true", "yes")
+
+CACHE_ENTRIES = REGISTRY.register(Gauge("medisense_cache_entries", "Entries currently held per cache.", ["cache"]))
+CACHE_LOOKUPS = REGISTRY.register(CollectedCounter("medisense_cache_lookups_total", "Cache lookups since start, by result.", ["cache", "result"]))
+
+
+def collect_cache_metrics():
+    for name, cache in (("lifestyle_recommendations", recommendation_cache), ("ai_summaries", summary_cache),
+                        ("analysis_sessions", analysis_sessions), ("hospital_tiles", hospital_tile_cache),
+                        ("hospital_empty_tiles", empty_tile_cache)):
+        stats = cache.stats()
+        CACHE_ENTRIES.set(stats["size"], cache=name)
+        CACHE_LOOKUPS.set_total(stats["hits"], cache=name, result="hit")
+        CACHE_LOOKUPS.set_total(stats["misses"], cache=name, result="miss")
+    if condition_index is not None:
+        stats = condition_index.stats()
+        CACHE_LOOKUPS.set_total(stats["hits"], cache="lifestyle_similarity", result="hit")
+        CACHE_LOOKUPS.set_total(stats["lookups"] - stats["hits"], cache="lifestyle_similarity", result="miss")
+
+
+REGISTRY.add_collector(collect_cache_metrics)
+
+GEMINI_CALLS = REGISTRY.register(CollectedCounter("medisense_gemini_coalesced_calls_total", "Gemini calls since start, executed vs. served from an identical in-flight call.", ["result"]))
+
+
+def collect_single_flight_metrics(flights=None):
+    stats = (flights or gemini_flights).stats()
+    GEMINI_CALLS.set_total(stats["executions"], result="executed")
+    GEMINI_CALLS.set_total(stats["coalesced"], result="coalesced")
+
+
+REGISTRY.add_collector(collect_single_flight_metrics)
+
+GEMINI_QUEUE_DEPTH = REGISTRY.register(Gauge("medisense_gemini_queue_depth", "Gemini calls waiting for the scheduler.", ["priority"]))
+GEMINI_IN_FLIGHT = REGISTRY.register(Gauge("medisense_gemini_in_flight", "Gemini calls currently running."))
+
+
+def collect_scheduler_metrics(scheduler=None):
+    stats = (scheduler or gemini_scheduler).stats()
+    for priority, depth in stats["queued"].items():
+        GEMINI_QUEUE_DEPTH.set(depth, priority=priority)
+    GEMINI_IN_FLIGHT.set(stats["in_flight"])
+
+
+REGISTRY.add_collector(collect_scheduler_metrics)
+
+
+# Every request gets a time budget: its X-Request-Timeout header (seconds),
+# at most MAX_REQUEST_TIMEOUT, or REQUEST_TIMEOUT (0 disables the default).
+# Gemini and Overpass calls take their timeouts from what is left, and a
+# route that runs out returns what it has, flagged "partial".
+REQUEST_TIMEOUT = float(os.getenv("REQUEST_TIMEOUT", "25"))
+MAX_REQUEST_TIMEOUT = float(os.getenv("MAX_REQUEST_TIMEOUT", "60"))
+# Kept back from upstream calls for building and sending the response.
+REQUEST_TIMEOUT_MARGIN = float(os.getenv("REQUEST_TIMEOUT_MARGIN", "0.25"))
+REQUEST_TIMEOUT_HEADER = "x-request-timeout"
+
+DEADLINE_DEGRADED_TOTAL = REGISTRY.register(Counter(
+    "medisense_deadline_degraded_total", "Responses cut short by the request deadline, by the part left out.", ["route", "part"]))
+
+
+def request_timeout(headers):
+    """Seconds upstream calls of a request may use in total, or None for no limit."""
+    try:
+        seconds = float(headers.get(REQUEST_TIMEOUT_HEADER) or REQUEST_TIMEOUT)
+    except ValueError:
+        seconds = REQUEST_TIMEOUT
+    if not math.isfinite(seconds) or seconds <= 0:
+        seconds = REQUEST_TIMEOUT
+    if seconds <= 0:
+        return None
+    return max(0.0, min(seconds, MAX_REQUEST_TIMEOUT) - REQUEST_TIMEOUT_MARGIN)
+
+
+def start_request_deadline(headers):
+    seconds = request_timeout(headers)
+    return None if seconds is None else start_deadline(seconds)
+
+
+def record_deadline_metrics(route):
+    deadline = current_deadline()
+    for part in deadline.degraded if deadline is not None else ():
+        DEADLINE_DEGRADED_TOTAL.inc(route=route, part=part)
+
+
+def mark_partial(payload):
+    """Flags ``payload`` as partial, listing what was left out, if the request deadline cut anything short."""
+    deadline = current_deadline()
+    if deadline is not None and deadline.degraded:
+        payload["partial"] = True
+        payload["degraded"] = list(deadline.degraded)
+    return payload
+
+
+@api.before_app_request
+def start_request_metrics():
+    g.request_started = time.perf_counter()
+    g.request_timings = start_request_timings()
+    start_request_deadline(request.headers)
+
+
+@api.after_app_request
+def record_request_metrics(response):
+    elapsed = time.perf_counter() - g.get("request_started", time.perf_counter())
+    route = request.url_rule.rule if request.url_rule else "unmatched"
+    REQUEST_SECONDS.observe(elapsed, route=route, method=request.method)
+    REQUESTS_TOTAL.inc(route=route, method=request.method, status=response.status_code)
+    record_deadline_metrics(route)
+    if SERVER_TIMING:
+        response.headers["Server-Timing"] = server_timing_header(g.get("request_timings") or [], elapsed)
+    return response
+
+
+@api.teardown_app_request
+def end_request_metrics(exc):
+    end_request_timings()
+    end_deadline()
+
+
+@api.route("/metrics", methods=["GET"])
+def metrics():
+    return Response(REGISTRY.render(), mimetype="text/plain; version=0.0.4")
+
 def calculate_distance(lat1, lon1, lat2, lon2):
     R = 6371
     dlat = math.radians(lat2 - lat1)
@@ -44,19 +385,35 @@ def calculate_distance(lat1, lon1, lat2, lon2):
     return R * c
 
 
-def get_hospitals_overpass(lat, lng, radius_km=5):
-    mirrors = [
-        "https://overpass-api.de/api/interpreter",
-        "https://overpass.kumi.systems/api/interpreter",
-        "https://overpass.openstreetmap.ru/api/interpreter",
-        "https://overpass.nchc.org.tw/api/interpreter",
-        "https://overpass.openstreetmap.fr/api/interpreter",
-        "https://overpass.osm.ch/api/interpreter",
-        "https://maps.mail.ru/osm/tools/overpass/api/interpreter",
-        "https://overpass.openstreetmap.ie/api/interpreter",
-    ]
+def radius_bucket(radius_km):
+    for bucket in RADIUS_BUCKETS_KM:
+        if radius_km <= bucket:
+            return bucket
+    return math.ceil(radius_km / RADIUS_BUCKETS_KM[-1]) * RADIUS_BUCKETS_KM[-1]
 
-    query = f"""
+
+def hospital_tile(lat, lng, radius_km):
+    """
+    Cache key plus the Overpass search circle for the tile containing (lat, lng).
+    The circle is padded by the tile's half-diagonal so the cached elements
+    cover radius_km around any point inside the tile.
+    """
+    row = math.floor(lat / HOSPITAL_TILE_DEG)
+    col = math.floor(lng / HOSPITAL_TILE_DEG)
+    bucket = radius_bucket(radius_km)
+
+    center_lat = (row + 0.5) * HOSPITAL_TILE_DEG
+    center_lng = (col + 0.5) * HOSPITAL_TILE_DEG
+    half_diagonal = max(
+        calculate_distance(center_lat, center_lng, corner_lat, corner_lng)
+        for corner_lat in (row * HOSPITAL_TILE_DEG, (row + 1) * HOSPITAL_TILE_DEG)
+        for corner_lng in (col * HOSPITAL_TILE_DEG, (col + 1) * HOSPITAL_TILE_DEG)
+    )
+    return (row, col, bucket), center_lat, center_lng, bucket + half_diagonal
+
+
+def hospital_query(lat, lng, radius_km):
+    return f"""
     [out:json][timeout:15];
     (
       node["amenity"="hospital"](around:{radius_km * 1000},{lat},{lng});
@@ -65,87 +422,207 @@ def get_hospitals_overpass(lat, lng, radius_km=5):
     out center tags;
     """
 
-    for url in mirrors:
-        try:
-            print(f"🔍 Trying Overpass endpoint: {url}")
-            response = requests.post(url, data={"data": query}, timeout=10)
-            response.raise_for_status()
-
-            data = response.json()
-            if not data.get("elements"):
-                print(f"⚠️ No data returned from {url}, trying next mirror...")
-                continue
-
-            hospitals, seen = [], set()
-            for element in data["elements"]:
-                tags = element.get("tags", {})
-                name = tags.get("name", "Hospital")
-                if name in seen:
-                    continue
-                seen.add(name)
-                hospital_lat = element["lat"] if element["type"] == "node" else element.get("center", {}).get("lat")
-                hospital_lng = element["lon"] if element["type"] == "node" else element.get("center", {}).get("lon")
-                if not hospital_lat or not hospital_lng:
-                    continue
-
-                distance = calculate_distance(lat, lng, hospital_lat, hospital_lng)
-
-                phone = (
-                    tags.get("phone")
-                    or tags.get("contact:phone")
-                    or tags.get("mobile")
-                    or tags.get("contact:mobile")
-                    or tags.get("telephone")
-                    or tags.get("contact:telephone")
-                    or tags.get("fax")
-                    or "N/A"
-                )
-
-                hospitals.append({
-                    "id": element["id"],
-                    "name": name,
-                    "lat": hospital_lat,
-                    "lng": hospital_lng,
-                    "distance": round(distance, 2),
-                    "phone": phone.strip() if isinstance(phone, str) else "N/A",
-                })
-
-            if hospitals:
-                hospitals.sort(key=lambda x: x["distance"])
-                return hospitals[:15]
-
-        except Exception as e:
-            print(f"⚠️ Overpass mirror {url} failed: {e}")
-            continue
 
-    print("❌ All Overpass mirrors failed. Returning empty list.")
+def fetch_hospital_elements(lat, lng, radius_km):
+    try:
+        timeout = time_left()
+    except TimeoutError:
+        return None
+    with stage("overpass_query"):
+        data = get_overpass_client().query(hospital_query(lat, lng, radius_km), timeout=timeout)
+    return data["elements"] if data else None
+
+
+def cached_tile(key):
+    """The cached tile for ``key``, an empty one if Overpass recently found no hospitals there, or None."""
+    tile = hospital_tile_cache.get(key)
+    if tile is None and empty_tile_cache.get(key):
+        from hospital_index import parse_elements
+        return parse_elements([])
+    return tile
+
+
+def cache_tile(key, elements):
+    from hospital_index import parse_elements
+    with stage("hospital_parsing"):
+        tile = parse_elements(elements)
+    if elements:
+        hospital_tile_cache.set(key, tile)
+    else:
+        empty_tile_cache.set(key, True)
+    return tile
+
+
+def nearest_in_tile(tile, lat, lng, radius_km, k):
+    from hospital_index import select_nearest
+    hospitals, lats, lngs = tile
+    with stage("hospital_selection"):
+        return select_nearest(hospitals, lats, lngs, lat, lng, radius_km, k)
+
+
+def other_cached_tile(lat, lng, key):
+    """
+    The largest cached tile for (lat, lng) at another radius bucket, or None.
+    A smaller bucket only holds the hospitals nearest the tile.
+    """
+    for bucket in sorted(RADIUS_BUCKETS_KM, reverse=True):
+        other_key = hospital_tile(lat, lng, bucket)[0]
+        if other_key != key:
+            tile = hospital_tile_cache.get(other_key)
+            if tile is not None:
+                return tile
+    return None
+
+
+def get_hospitals_overpass(lat, lng, radius_km=5, k=DEFAULT_HOSPITAL_LIMIT):
+    key, center_lat, center_lng, fetch_radius = hospital_tile(lat, lng, radius_km)
+    tile = cached_tile(key)
+    if tile is None:
+        elements = fetch_hospital_elements(center_lat, center_lng, fetch_radius)
+        if elements is None:
+            return overpass_fallback(lat, lng, radius_km, k, key)
+        tile = cache_tile(key, elements)
+    else:
+        print(f"⚡ Hospital tile cache hit: {key}")
+
+    return nearest_in_tile(tile, lat, lng, radius_km, k)
+
+
+def overpass_fallback(lat, lng, radius_km, k, key):
+    """Hospitals from a cached tile of another radius when Overpass gave no answer, else []."""
+    timed_out = out_of_time("hospitals")
+    tile = other_cached_tile(lat, lng, key)
+    if tile is None:
+        print("⏱️ Out of time for Overpass. Returning empty list." if timed_out
+              else "❌ All Overpass mirrors failed. Returning empty list.")
+        return []
+    print(f"⚡ Overpass unavailable, using a cached tile of another radius for {key}")
+    return nearest_in_tile(tile, lat, lng, radius_km, k)
+
+
+def use_hospital_index(lat, lng):
+    index = get_hospital_index()
+    return index is not None and index.covers(lat, lng)
+
+
+def query_hospital_index(lat, lng, radius_km, k):
+    with stage("hospital_index_query"):
+        return get_hospital_index().query(lat, lng, radius_km, k=k)
+
+
+def find_nearby_hospitals(lat, lng, radius_km=5, k=DEFAULT_HOSPITAL_LIMIT):
+    if use_hospital_index(lat, lng):
+        return query_hospital_index(lat, lng, radius_km, k)
+    if get_hospital_index() is None or OVERPASS_FALLBACK:
+        return get_hospitals_overpass(lat, lng, radius_km, k)
     return []
 
-@app.route('/api/nearby-hospitals', methods=['POST'])
-def nearby_hospitals():
-    data = request.json
+
+class RequestError(Exception):
+    """Invalid request body; carries the JSON error payload to return."""
+
+    def __init__(self, payload, status=400):
+        super().__init__(payload.get('error'))
+        self.payload = payload
+        self.status = status
+
+
+def parse_nearby_request(data):
     user_lat = data.get('latitude')
     user_lng = data.get('longitude')
     max_distance = data.get('max_distance', 10)  # Default 10km
+    limit = data.get('limit', DEFAULT_HOSPITAL_LIMIT)
 
     if not user_lat or not user_lng:
-        return jsonify({
+        raise RequestError({
             'error': 'Location coordinates are required',
             'hospitals': []
-        }), 400
+        })
 
     try:
-        hospitals = get_hospitals_overpass(user_lat, user_lng, max_distance)
-        return jsonify({
-            'hospitals': hospitals[:20]  # Return up to 10 hospitals
+        max_distance = float(max_distance)
+        limit = int(limit)
+        if not math.isfinite(max_distance) or max_distance <= 0 or limit <= 0:
+            raise ValueError
+    except (TypeError, ValueError, OverflowError):
+        raise RequestError({
+            'error': '"max_distance" and "limit" must be positive numbers',
+            'hospitals': []
         })
+    if max_distance > MAX_HOSPITAL_RADIUS_KM:
+        raise RequestError({
+            'error': f'"max_distance" must be at most {MAX_HOSPITAL_RADIUS_KM:g} km',
+            'hospitals': []
+        })
+
+    return user_lat, user_lng, max_distance, min(limit, MAX_HOSPITAL_LIMIT)
+
+
+HOSPITALS_ERROR = {
+    'error': 'Failed to fetch hospitals',
+    'hospitals': []
+}
+
+
+@api.route('/api/nearby-hospitals', methods=['POST'])
+def nearby_hospitals():
+    try:
+        user_lat, user_lng, max_distance, limit = parse_nearby_request(request.json)
+    except RequestError as e:
+        return jsonify(e.payload), e.status
+
+    try:
+        hospitals = find_nearby_hospitals(user_lat, user_lng, max_distance, limit)
+        return jsonify(mark_partial({
+            'hospitals': hospitals
+        }))
     
     except Exception as e:
         print(f"Error fetching hospitals: {e}")
-        return jsonify({
-            'error': 'Failed to fetch hospitals',
-            'hospitals': []
-        }), 500
+        return jsonify(HOSPITALS_ERROR), 500
+
+def gemini_outcome(error):
+    return "rejected" if isinstance(error, SchedulerBusy) else "error"
+
+
+@contextmanager
+def gemini_call(call, stage_name):
+    """Times a Gemini call as ``stage_name`` and counts its outcome."""
+    with stage(stage_name):
+        try:
+            yield
+        except Exception as e:
+            GEMINI_REQUESTS_TOTAL.inc(call=call, outcome=gemini_outcome(e))
+            raise
+    GEMINI_REQUESTS_TOTAL.inc(call=call, outcome="ok")
+
+
+def gemini_config():
+    """generate_content config limiting the call to the request's remaining time, or None outside a request."""
+    timeout = time_left()
+    if timeout is None:
+        return None
+    # google-genai validates plain dicts into GenerateContentConfig; timeouts are in milliseconds.
+    return {"http_options": {"timeout": max(1, int(timeout * 1000))}}
+
+
+def scheduled_generate(prompt, priority):
+    with gemini_scheduler.slot(priority, timeout=time_left(gemini_scheduler.queue_timeout)):
+        return get_client().models.generate_content(model="gemini-2.5-flash", contents=prompt, config=gemini_config())
+
+
+def coalesced_generate(key, prompt, priority):
+    """
+    generate_content through the scheduler, sharing one upstream call among
+    concurrent callers with the same key. Queueing, waiting on a shared call
+    and the call itself all stop at the request deadline.
+    """
+    response, shared = gemini_flights.do(
+        key, lambda: scheduled_generate(prompt, priority), timeout=time_left(gemini_flights.timeout))
+    if shared:
+        print(f"🔗 Shared in-flight Gemini call: {key[0]}")
+    return response
+
 
 def build_prompt(health_condition):
     return f"""
@@ -157,6 +634,10 @@ Each should have 3–5 short actionable points, general + condition-specific.
 No markdown, no extra commentary, JSON only.
 """
 
+def normalize_condition(health_condition):
+    text = re.sub(r"[^a-z0-9\s]", " ", health_condition.lower())
+    return re.sub(r"\s+", " ", text).strip()
+
 def clean_gemini_json(text):
     if not isinstance(text, str):
         return ""
@@ -208,116 +689,171 @@ def normalize_recommendations(raw: dict) -> dict:
         "wellness_tips": wellness
     }
 
-@app.route("/api/lifestyle-recommendations", methods=["POST"])
-def lifestyle_recommendations():
-    data = request.json or {}
+FALLBACK_RECOMMENDATIONS = {
+    "diet": {"general": ["Eat fruits & vegetables"], "specific_conditions": []},
+    "activity": {"general": ["Walk 30 minutes daily"], "specific_conditions": []},
+    "prevention": {"general": ["Sleep 7-9 hours"], "specific_conditions": []},
+    "wellness_tips": ["Stay positive"]
+}
+
+
+def parse_lifestyle_request(data):
     condition = (data.get("health_condition") or data.get("healthCondition") or "").strip()
     if not condition:
-        return jsonify({"success": False, "error": "Health condition required"}), 400
+        raise RequestError({"success": False, "error": "Health condition required"})
+    return condition
 
-    try:
-        print(f"🧠 Using Gemini for condition: {condition}")
-        response = client.models.generate_content(
-            model="gemini-2.5-flash",
-            contents=build_prompt(condition)
-        )
+
+def parse_recommendations(response):
+    with stage("recommendation_parsing"):
         raw_text = getattr(response, "text", "") or ""
         cleaned = clean_gemini_json(raw_text)
-        raw_recs = json.loads(cleaned)
+        return json.loads(cleaned)
+
+
+# Lifestyle conditions that differ only in wording ("high BP for 2 years",
+# "hypertension") share one cached answer when their similarity score
+# (0-100) reaches this; above 100 only exact repeats hit the cache.
+LIFESTYLE_SIMILARITY_THRESHOLD = float(os.getenv("LIFESTYLE_SIMILARITY_THRESHOLD", "90"))
+LIFESTYLE_SIMILARITY = REGISTRY.register(Histogram(
+    "medisense_lifestyle_similarity", "Similarity score of lifestyle cache hits on a near-duplicate condition.",
+    buckets=(80, 85, 90, 92.5, 95, 97.5, 99, 100)))
+
+
+def _make_condition_index():
+    from similarity_index import SimilarityIndex
+    return SimilarityIndex(maxsize=RECOMMENDATION_CACHE_SIZE, threshold=LIFESTYLE_SIMILARITY_THRESHOLD)
+
+
+def get_condition_index():
+    return _lazy_global("condition_index", _make_condition_index)
+
+
+def cached_recommendations(cache_key):
+    """
+    Cached recommendations for ``cache_key`` and the extra response fields
+    describing a near-duplicate match (empty for an exact hit), or
+    ``(None, None)`` on a miss.
+    """
+    index = get_condition_index()
+    cached = recommendation_cache.get(cache_key)
+    if cached is not None:
+        # Entries written by other workers sharing CACHE_DB_PATH are learned here.
+        index.add(cache_key)
+        return cached, {}
+
+    with stage("similarity_lookup"):
+        match = index.lookup(cache_key)
+    if match is None:
+        return None, None
+    matched_key, score = match
+    cached = recommendation_cache.get(matched_key)
+    if cached is None:
+        index.discard(matched_key)
+        return None, None
+    LIFESTYLE_SIMILARITY.observe(score)
+    return cached, {"matched_condition": matched_key, "similarity": round(score, 1)}
+
+
+def recommendations_payload(cache_key, raw_recs, from_gemini):
+    with stage("recommendation_normalization"):
+        normalized = normalize_recommendations(raw_recs)
+    if from_gemini:
+        recommendation_cache.set(cache_key, normalized)
+        get_condition_index().add(cache_key)
+    return {"success": True, "recommendations": normalized}
+
+
+@api.route("/api/lifestyle-recommendations", methods=["POST"])
+def lifestyle_recommendations():
+    try:
+        condition = parse_lifestyle_request(request.json or {})
+    except RequestError as e:
+        return jsonify(e.payload), e.status
+
+    cache_key = normalize_condition(condition)
+    cached, match = cached_recommendations(cache_key)
+    if cached is not None:
+        print(f"⚡ Cache hit for condition: {cache_key}" + (f" (≈ {match['matched_condition']})" if match else ""))
+        return jsonify({"success": True, "recommendations": cached, **match})
+
+    try:
+        print(f"🧠 Using Gemini for condition: {condition}")
+        with gemini_call("lifestyle", "gemini_lifestyle"):
+            response = coalesced_generate(("lifestyle", cache_key), build_prompt(condition), PRIORITY_LIFESTYLE)
+        raw_recs = parse_recommendations(response)
         print("✅ Gemini JSON parsed successfully.")
+        from_gemini = True
     except Exception as e:
         print(f"⚠️ Gemini call failed or invalid JSON → fallback: {e}")
-        raw_recs = {
-            "diet": {"general": ["Eat fruits & vegetables"], "specific_conditions": []},
-            "activity": {"general": ["Walk 30 minutes daily"], "specific_conditions": []},
-            "prevention": {"general": ["Sleep 7-9 hours"], "specific_conditions": []},
-            "wellness_tips": ["Stay positive"]
-        }
+        out_of_time("recommendations")
+        raw_recs = FALLBACK_RECOMMENDATIONS
+        from_gemini = False
 
-    normalized = normalize_recommendations(raw_recs)
-    return jsonify({"success": True, "recommendations": normalized})
+    return jsonify(mark_partial(recommendations_payload(cache_key, raw_recs, from_gemini)))
 
-@app.route("/api/download-recommendations", methods=["POST"])
-def download_recommendations():
-    data = request.get_json()
-    health_condition = data.get("health_condition", "").strip()
-    recommendations = data.get("recommendations", {})
 
-    try:
-        detection_prompt = f"""
-        You are a medical text interpreter.
-        From this input: "{health_condition}"
-        Extract only the *main health symptom or condition* in ONE word.
-        Reply with only the keyword.
-        """
-        response = client.models.generate_content(
-            model="gemini-2.5-flash",
-            contents=detection_prompt
-        )
-        raw_symptom = response.text.strip().lower()
-        symptom_name = re.sub(r"[^a-zA-Z0-9_]", "_", raw_symptom)
-    except Exception:
-        words = re.findall(r"[a-zA-Z]+", health_condition)
-        ignore = {"i", "have", "been", "am", "with", "feeling", "a", "the"}
-        symptom_name = next((w.lower() for w in words if w.lower() not in ignore), "health")
+def cache_stats_payload(scheduler, flights):
+    return {
+        "lifestyle_recommendations": recommendation_cache.stats(),
+        "lifestyle_similarity": get_condition_index().stats(),
+        "symptom_lexicon": get_analyzer().lexicon.stats(),
+        "ai_summaries": summary_cache.stats(),
+        "analysis_sessions": analysis_sessions.stats(),
+        "hospital_tiles": hospital_tile_cache.stats(),
+        "hospital_empty_tiles": empty_tile_cache.stats(),
+        "gemini_single_flight": flights.stats(),
+        "gemini_scheduler": scheduler.stats(),
+    }
 
-    filename = f"medisense_{symptom_name}_recommendations.pdf"
 
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=letter)
-    styles = getSampleStyleSheet()
-    elements = []
+@api.route("/api/cache-stats", methods=["GET"])
+def cache_stats():
+    return jsonify(cache_stats_payload(gemini_scheduler, gemini_flights))
 
-    title = Paragraph(
-        "<para align='center'><b><font size=18 color='green'>Medisense Lifestyle Recommendations</font></b></para>",
-        styles["Title"],
-    )
-    elements += [title, Spacer(1, 0.3 * inch)]
-    intro = Paragraph(f"<b>Based on your condition:</b> {health_condition}", styles["BodyText"])
-    elements += [intro, Spacer(1, 0.2 * inch)]
 
-    def render_data(d):
-        if isinstance(d, dict):
-            return "".join(f"<b>{k.title()}</b><br/>{render_data(v)}" for k, v in d.items())
-        if isinstance(d, list):
-            return "".join(f"- {item}<br/>" for item in d)
-        return f"{d}<br/>"
+@api.route("/api/overpass-mirrors", methods=["GET"])
+def overpass_mirrors():
+    mirrors = get_overpass_client()
+    return jsonify({"mirrors": mirrors.stats(), "ranking": mirrors.ranked_mirrors()})
 
-    elements.append(Paragraph(render_data(recommendations), styles["BodyText"]))
-    elements += [Spacer(1, 0.5 * inch),
-                 Paragraph("<para align='center'><font size=10 color='gray'>Generated by Medisense AI Health Assistant</font></para>", styles["BodyText"])]
 
-    doc.build(elements)
-    buffer.seek(0)
+PDF_BUSY_ERROR = {"error": "PDF service is busy, please retry shortly."}
 
-    response = send_file(buffer, as_attachment=True, download_name=filename, mimetype="application/pdf")
-    response.headers.add("Access-Control-Expose-Headers", "Content-Disposition")
-    return response
 
+def parse_download_request(data):
+    health_condition = data.get("health_condition", "").strip()
+    recommendations = data.get("recommendations", {})
+
+    with stage("pdf_keyword"):
+        symptom_name = condition_keyword(health_condition, get_analyzer())
+    filename = f"medisense_{symptom_name}_recommendations.pdf"
+    return health_condition, recommendations, filename
 
-@app.route('/api/symptom-analysis', methods=['POST'])
-def analyze_symptoms():
-    try:
-        data = request.get_json()
-        if not data or 'symptoms_input' not in data:
-            return jsonify({'error': 'Invalid input. Missing "symptoms_input".'}), 400
 
-        symptoms_input = data.get('symptoms_input', '')
-        symptoms_input = re.sub(
-            r'\b(i have|i am|im|my|i feel|i got|i suffer from|having|got|is|was|the|a|an)\b',
-            '',
-            re.sub(r'[^a-z0-9 ,.-]', '', re.sub(r'\s+', ' ', str(symptoms_input).strip().lower()))
-        ).strip()
-        duration_days = int(data.get('duration_days', 0))
-        age = int(data.get('age', 1)) if data.get('age') else None
+@api.route("/api/download-recommendations", methods=["POST"])
+def download_recommendations():
+    health_condition, recommendations, filename = parse_download_request(request.get_json())
 
-        result = analyzer.analyze(symptoms_input, age, duration_days)
+    try:
+        with stage("pdf_render"):
+            future = pdf_renderer.submit(health_condition, recommendations)
+            pdf = future.result(timeout=PDF_RENDER_TIMEOUT)
+    except RendererBusy:
+        return jsonify(PDF_BUSY_ERROR), 503
+    except TimeoutError:
+        # Frees the slot if the render has not started; a running one finishes on its own.
+        future.cancel()
+        return jsonify(PDF_BUSY_ERROR), 503
+
+    buffer = BytesIO(pdf)
+    response = send_file(buffer, as_attachment=True, download_name=filename, mimetype="application/pdf")
+    response.headers.add("Access-Control-Expose-Headers", "Content-Disposition")
+    return response
 
-        result.setdefault("severity_score", 0)
-        result.setdefault("severity_category", "UNKNOWN")
-        result.setdefault("detected_symptoms", [])
 
-        prompt = f"""
+def build_summary_prompt(result, symptoms_input, age, duration_days):
+    return f"""
             You are a medically trained AI assistant with advanced reasoning and communication skills.
             Read the JSON symptom analysis and provide a short, plain-English summary that sounds natural and human.
 
@@ -351,66 +887,691 @@ def analyze_symptoms():
             {symptoms_input}
 
             JSON input:
-            {analyzer.feed_to_gemini(result, symptoms_input)}
+            {get_analyzer().feed_to_gemini(result, symptoms_input)}
             """
-        
-        ai_summary = None
 
-        try:
-            gemini_response = client.models.generate_content(
-                model="gemini-2.5-flash",
-                contents=prompt,
+
+def summary_key(result, symptoms_input, age, duration_days):
+    # Everything build_summary_prompt() depends on except its timestamp.
+    return (
+        "summary", symptoms_input, age, duration_days,
+        tuple(result.get("detected_symptoms", [])), result.get("severity_score"), result.get("severity_category"),
+    )
+
+
+def generate_ai_summary(result, symptoms_input, age, duration_days):
+    key = summary_key(result, symptoms_input, age, duration_days)
+    ai_summary = summary_cache.get(key)
+    if ai_summary is not None:
+        return ai_summary
+
+    try:
+        with gemini_call("summary", "gemini_summary"):
+            gemini_response = coalesced_generate(
+                key,
+                build_summary_prompt(result, symptoms_input, age, duration_days),
+                PRIORITY_SYMPTOM,
             )
-            if hasattr(gemini_response, "text"):
-                ai_summary = gemini_response.text.strip()
-        except Exception as e:
-            ai_summary = f"(Gemini unavailable: {e})"
+        ai_summary = store_summary(key, gemini_response)
+    except Exception as e:
+        ai_summary = None if out_of_time("ai_summary") else f"(Gemini unavailable: {e})"
+
+    return ai_summary
+
+
+def store_summary(key, gemini_response):
+    ai_summary = None
+    if hasattr(gemini_response, "text"):
+        ai_summary = gemini_response.text.strip()
+        if ai_summary:
+            summary_cache.set(key, ai_summary)
+    return ai_summary
+
+
+def sse_event(event, payload):
+    return f"event: {event}\ndata: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+
+def analysis_event(result, symptoms_input):
+    return sse_event("analysis", {
+        "symptoms_input": symptoms_input,
+        "detected_symptoms": result.get("detected_symptoms", []),
+        "severity_score": result.get("severity_score", 0),
+        "severity_category": result.get("severity_category", "UNKNOWN"),
+    })
+
+
+def final_event(result, symptoms_input, ai_summary):
+    apply_ai_summary(result, ai_summary)
+    return sse_event("final", mark_partial(build_analysis_response(symptoms_input, result, ai_summary)))
+
+
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
 
-        result["ai_summary"] = ai_summary or "(No AI summary returned.)"
 
-        updated_risk = None
-        updated_score = None
+def emergency_events(response):
+    """The critical fast path for streaming clients: an ``emergency`` event, then the same payload as ``final``."""
+    return sse_event("emergency", response) + sse_event("final", response)
 
+
+def pump_summary_stream(key, prompt, tokens):
+    """
+    Streams a Gemini summary into queue ``tokens`` as ("token", text)
+    items, then ("final", ai_summary), and caches the summary.
+    """
+    chunks = []
+    try:
+        with gemini_call("summary_stream", "gemini_stream"), \
+                gemini_scheduler.slot(PRIORITY_SYMPTOM, timeout=time_left(gemini_scheduler.queue_timeout)):
+            stream = get_client().models.generate_content_stream(
+                model="gemini-2.5-flash", contents=prompt, config=gemini_config())
+            for chunk in stream:
+                text = getattr(chunk, "text", None)
+                if text:
+                    chunks.append(text)
+                    tokens.put(("token", text))
+        ai_summary = "".join(chunks).strip() or None
         if ai_summary:
-            score_match = re.search(r"final severity score:\s*([0-9]+(?:\.[0-9]+)?)/?10", ai_summary.lower())
-            if score_match:
-                updated_score = float(score_match.group(1))
-                if updated_score > 10:
-                    updated_score = 10.0
-                if updated_score < 0:
-                    updated_score = 0.0
-
-            risk_match = re.search(r"final risk assessment:\s*(low|moderate|medium|high)", ai_summary.lower())
-            if risk_match:
-                word = risk_match.group(1)
-                if word in ["moderate", "medium"]:
-                    updated_risk = "MODERATE"
-                elif word == "high":
-                    updated_risk = "HIGH"
-                elif word == "low":
-                    updated_risk = "LOW"
-
-        if updated_score is not None:
-            result["severity_score"] = round(updated_score, 1)
-
-        if updated_risk:
-            result["risk_level"] = updated_risk
-
-        result["risk_score"] = result["severity_score"]
-
-        response = {
-            "symptoms_input": symptoms_input,
-            "detected_symptoms": result.get("detected_symptoms", []),
-            "severity_score": result.get("severity_score", 0),
-            "risk_level": result.get("risk_level", "UNKNOWN"),
-            "ai_summary": ai_summary,
-            "disclaimer": "This summary is informational and not a substitute for professional medical evaluation."
-        }
-
-        return jsonify(response)
+            summary_cache.set(key, ai_summary)
+    except Exception as e:
+        ai_summary = None if out_of_time("ai_summary") else f"(Gemini unavailable: {e})"
+    tokens.put(("final", ai_summary))
+
+
+def stream_analysis(result, symptoms_input, age, duration_days):
+    """
+    Server-Sent Events: the local analysis first, then Gemini text as it
+    arrives, then the final response with the re-parsed score and risk.
+    """
+    key = summary_key(result, symptoms_input, age, duration_days)
+    prompt = build_summary_prompt(result, symptoms_input, age, duration_days)
+
+    def generate():
+        yield analysis_event(result, symptoms_input)
+
+        ai_summary = summary_cache.get(key)
+        if ai_summary is not None:
+            yield sse_event("token", {"text": ai_summary})
+            yield final_event(result, symptoms_input, ai_summary)
+            return
+
+        # The upstream stream is read on its own thread, which holds the
+        # scheduler slot only until Gemini is done; a slow reader of this
+        # response then delays nothing but itself.
+        tokens = queue.Queue()
+        threading.Thread(target=contextvars.copy_context().run, args=(pump_summary_stream, key, prompt, tokens),
+                         name="gemini-stream", daemon=True).start()
+        while True:
+            kind, value = tokens.get()
+            if kind == "final":
+                break
+            yield sse_event("token", {"text": value})
+
+        yield final_event(result, symptoms_input, value)
+
+    return Response(stream_with_context(generate()), mimetype="text/event-stream", headers=SSE_HEADERS)
+
+
+def apply_ai_summary(result, ai_summary):
+    with stage("summary_parsing"):
+        return _apply_ai_summary(result, ai_summary)
+
+
+def _apply_ai_summary(result, ai_summary):
+    result["ai_summary"] = ai_summary or "(No AI summary returned.)"
+
+    updated_risk = None
+    updated_score = None
+
+    if ai_summary:
+        score_match = re.search(r"final severity score:\s*([0-9]+(?:\.[0-9]+)?)/?10", ai_summary.lower())
+        if score_match:
+            updated_score = float(score_match.group(1))
+            if updated_score > 10:
+                updated_score = 10.0
+            if updated_score < 0:
+                updated_score = 0.0
+
+        risk_match = re.search(r"final risk assessment:\s*(low|moderate|medium|high)", ai_summary.lower())
+        if risk_match:
+            word = risk_match.group(1)
+            if word in ["moderate", "medium"]:
+                updated_risk = "MODERATE"
+            elif word == "high":
+                updated_risk = "HIGH"
+            elif word == "low":
+                updated_risk = "LOW"
+
+    if updated_score is not None:
+        result["severity_score"] = round(updated_score, 1)
+
+    if updated_risk:
+        result["risk_level"] = updated_risk
+
+    result["risk_score"] = result["severity_score"]
+    return result
+
+
+def emergency_response(result, symptoms_input, age, duration_days, critical, start_summary=None):
+    """
+    Immediate HIGH-risk answer for critical symptoms; the AI summary follows in the background.
+    ``start_summary(result, symptoms_input, age, duration_days)`` returns a future-like object
+    with done() and result(); by default the summary runs on background_executor.
+    """
+    result["risk_level"] = "HIGH"
+    response = build_analysis_response(symptoms_input, result, EMERGENCY_GUIDANCE)
+    response["emergency"] = True
+    response["critical_symptoms"] = critical
+
+    if CRITICAL_BACKGROUND_SUMMARY:
+        start_summary = start_summary or (lambda *args: background_executor.submit(generate_ai_summary, *args))
+        summary_id = uuid.uuid4().hex
+        entry = {"status": "pending", "owner": os.getpid(), "result": dict(result), "symptoms_input": symptoms_input}
+        background_summaries.set(summary_id, entry)
+        future = start_summary(dict(result), symptoms_input, age, duration_days)
+        pending_summaries.set(summary_id, future)
+        future.add_done_callback(lambda done: finish_summary(summary_id, entry, done))
+        response["summary_id"] = summary_id
+        response["summary_url"] = f"/api/symptom-analysis/summary/{summary_id}"
+
+    return response
+
+
+def build_analysis_response(symptoms_input, result, ai_summary):
+    return {
+        "symptoms_input": symptoms_input,
+        "detected_symptoms": result.get("detected_symptoms", []),
+        "severity_score": result.get("severity_score", 0),
+        "risk_level": result.get("risk_level", "UNKNOWN"),
+        "ai_summary": ai_summary,
+        "disclaimer": "This summary is informational and not a substitute for professional medical evaluation."
+    }
+
+
+def parse_analysis_request(data):
+    if not data or 'symptoms_input' not in data:
+        raise RequestError({'error': 'Invalid input. Missing "symptoms_input".'})
+
+    with stage("input_normalization"):
+        symptoms_input = normalize(data.get('symptoms_input', ''))
+    duration_days = int(data.get('duration_days', 0))
+    age = int(data.get('age', 1)) if data.get('age') else None
+    return symptoms_input, age, duration_days
+
+
+MAX_SESSION_ID_LENGTH = 128
+SESSION_SUMMARIES = REGISTRY.register(Counter(
+    "medisense_session_summaries_total",
+    "AI summaries for symptom analyses in a session, generated vs. reused from the previous submission.", ["result"]))
+
+
+def parse_session_id(data):
+    session_id = (data or {}).get('session_id')
+    if session_id in (None, ''):
+        return None
+    if not isinstance(session_id, str) or len(session_id) > MAX_SESSION_ID_LENGTH:
+        raise RequestError({'error': f'Invalid "session_id". Expected a string of at most {MAX_SESSION_ID_LENGTH} characters.'})
+    return session_id
+
+
+def load_session(session_id):
+    """A copy of the state kept for ``session_id`` ({} for a new session), or None without one."""
+    if session_id is None:
+        return None
+    return dict(analysis_sessions.get(session_id) or {})
+
+
+def save_session(session_id, session):
+    if session_id is not None:
+        analysis_sessions.set(session_id, session)
+
+
+def session_summary(session, result):
+    """
+    The summary stored by remember_summary() for an earlier submission in
+    this session, if that found the same symptoms in the same severity
+    category as ``result``; otherwise None.
+    """
+    previous = (session or {}).get("summary")
+    if (previous and previous["category"] == result["severity_category"]
+            and sorted(previous["symptoms"]) == sorted(result["detected_symptoms"])):
+        return previous
+    return None
+
+
+def remember_summary(session, result, ai_summary):
+    """Keeps ``ai_summary`` with the local analysis it was generated for; call before apply_ai_summary()."""
+    if session is None or not ai_summary or ai_summary.startswith("(Gemini unavailable"):
+        return
+    session["summary"] = {
+        "text": ai_summary,
+        "symptoms": result["detected_symptoms"],
+        "category": result["severity_category"],
+        "score": result["severity_score"],
+    }
+
+
+def apply_session_summary(result, previous):
+    """
+    Applies a reused summary to a fresh local ``result``: its risk level as
+    is, its severity score moved by as much as the local score moved.
+    """
+    local_score = result["severity_score"]
+    apply_ai_summary(result, previous["text"])
+    result["severity_score"] = round(min(max(result["severity_score"] + local_score - previous["score"], 0.0), 10.0), 1)
+    result["risk_score"] = result["severity_score"]
+    return result
+
+
+def session_response(response, session_id, reused):
+    if session_id is not None:
+        response["session_id"] = session_id
+        response["summary_reused"] = reused
+    return response
+
+
+def run_analysis(symptoms_input, age, duration_days, session=None):
+    result = get_analyzer().analyze(symptoms_input, age, duration_days, normalized=True, session=session)
+
+    result.setdefault("severity_score", 0)
+    result.setdefault("severity_category", "UNKNOWN")
+    result.setdefault("detected_symptoms", [])
+    return result
+
+
+def detect_critical(text):
+    """Critical symptoms stated in the user's text, as typed (not normalized)."""
+    if not CRITICAL_FAST_PATH:
+        return []
+    with stage("critical_detection"):
+        critical = get_critical_detector().detect(text)
+    if critical:
+        print(f"🚨 Critical symptoms detected: {', '.join(critical)}")
+    return critical
+
+
+def wants_stream(args, data):
+    return args.get("stream", "").lower() in ("1", "true", "yes") or data.get("stream") is True
+
+
+@api.route('/api/symptom-analysis', methods=['POST'])
+def analyze_symptoms():
+    try:
+        data = request.get_json()
+        try:
+            symptoms_input, age, duration_days = parse_analysis_request(data)
+            session_id = parse_session_id(data)
+        except RequestError as e:
+            return jsonify(e.payload), e.status
+
+        session = load_session(session_id)
+        result = run_analysis(symptoms_input, age, duration_days, session)
+
+        critical = detect_critical(data['symptoms_input'])
+        if critical:
+            save_session(session_id, session)
+            response = emergency_response(result, symptoms_input, age, duration_days, critical)
+            if wants_stream(request.args, data):
+                return Response(emergency_events(response), mimetype="text/event-stream", headers=SSE_HEADERS)
+            return jsonify(response)
+
+        if wants_stream(request.args, data):
+            save_session(session_id, session)
+            return stream_analysis(result, symptoms_input, age, duration_days)
+
+        previous = session_summary(session, result)
+        if previous:
+            SESSION_SUMMARIES.inc(result="reused")
+            ai_summary = previous["text"]
+            apply_session_summary(result, previous)
+        else:
+            if session is not None:
+                SESSION_SUMMARIES.inc(result="generated")
+            ai_summary = generate_ai_summary(result, symptoms_input, age, duration_days)
+            remember_summary(session, result, ai_summary)
+            apply_ai_summary(result, ai_summary)
+        save_session(session_id, session)
+
+        response = session_response(build_analysis_response(symptoms_input, result, ai_summary), session_id, bool(previous))
+        return jsonify(mark_partial(response))
 
     except Exception as e:
         return jsonify({'error': str(e)}), 500
-    
+
+
+def summary_result(future):
+    try:
+        return future.result()
+    except Exception as e:
+        return f"(Gemini unavailable: {e})"
+
+
+def finish_summary(summary_id, entry, future):
+    """Publish a finished background summary to every worker."""
+    background_summaries.set(summary_id, {**entry, "status": "ready", "ai_summary": summary_result(future)})
+
+
+def owner_running(pid):
+    """Whether the worker process ``pid`` (on this host, like the cache file) still exists."""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def summary_status(summary_id):
+    """(payload, status) for a background summary started by emergency_response()."""
+    future = pending_summaries.get(summary_id)
+    if future is not None and not future.done():
+        return {'status': 'pending'}, 202
+
+    entry = background_summaries.get(summary_id)
+    if entry is None:
+        return {'error': 'Unknown or expired summary id.'}, 404
+    if entry["status"] == "pending":
+        if future is not None:
+            # Finished here, but the shared entry may not be written yet.
+            entry = {**entry, "ai_summary": summary_result(future)}
+        elif entry["owner"] != os.getpid() and owner_running(entry["owner"]):
+            return {'status': 'pending'}, 202
+        else:
+            return {'error': 'The summary was lost; please submit the symptoms again.'}, 404
+
+    ai_summary = entry["ai_summary"]
+    result = apply_ai_summary(dict(entry["result"]), ai_summary)
+    response = build_analysis_response(entry["symptoms_input"], result, ai_summary)
+    response["status"] = "ready"
+    return response, 200
+
+
+@api.route('/api/symptom-analysis/summary/<summary_id>', methods=['GET'])
+def symptom_summary(summary_id):
+    payload, status = summary_status(summary_id)
+    return jsonify(payload), status
+
+
+def parse_batch_request(data):
+    records = data.get('records')
+    if not isinstance(records, list) or not records:
+        raise RequestError({'error': 'Invalid input. "records" must be a non-empty list.'})
+    if len(records) > MAX_BATCH_RECORDS:
+        raise RequestError({'error': f'Too many records. Maximum batch size is {MAX_BATCH_RECORDS}.'}, 413)
+    return records, bool(data.get('ai_summary', False))
+
+
+def analyze_batch(records):
+    """Per-record parsed inputs (None if invalid), errors by index, and analyzer results."""
+    parsed, errors = [], {}
+    for index, record in enumerate(records):
+        try:
+            if not isinstance(record, dict) or 'symptoms_input' not in record:
+                raise ValueError('Missing "symptoms_input".')
+            parsed.append({
+                'symptoms_input': normalize(record.get('symptoms_input', '')),
+                'duration_days': int(record.get('duration_days', 0)),
+                'age': int(record.get('age', 1)) if record.get('age') else None,
+            })
+        except Exception as e:
+            errors[index] = str(e)
+            parsed.append(None)
+
+    valid = [r for r in parsed if r is not None]
+    analyses = iter(get_analyzer().analyze_many(valid, normalized=True))
+    results = [next(analyses) if r is not None else None for r in parsed]
+
+    for result in results:
+        if result is not None:
+            result.setdefault("severity_score", 0)
+            result.setdefault("severity_category", "UNKNOWN")
+            result.setdefault("detected_symptoms", [])
+
+    return parsed, errors, results
+
+
+def batch_responses(parsed, errors, results, summaries, include_summary):
+    responses = []
+    for index, (record, result) in enumerate(zip(parsed, results)):
+        if record is None:
+            responses.append({'error': errors[index]})
+            continue
+
+        if include_summary:
+            apply_ai_summary(result, summaries[index])
+        response = build_analysis_response(record['symptoms_input'], result, summaries[index])
+        response["severity_category"] = result["severity_category"]
+        responses.append(response)
+
+    return mark_partial({'results': responses})
+
+
+@api.route('/api/symptom-analysis/batch', methods=['POST'])
+def analyze_symptoms_batch():
+    try:
+        records, include_summary = parse_batch_request(request.get_json(silent=True) or {})
+    except RequestError as e:
+        return jsonify(e.payload), e.status
+
+    parsed, errors, results = analyze_batch(records)
+
+    summaries = [None] * len(records)
+    if include_summary:
+        jobs = [i for i, r in enumerate(parsed) if r is not None]
+        with ThreadPoolExecutor(max_workers=BATCH_GEMINI_WORKERS) as pool:
+            # Each job runs in a copy of this request's context, so it sees the deadline.
+            futures = {
+                i: pool.submit(contextvars.copy_context().run, generate_ai_summary,
+                               results[i], parsed[i]['symptoms_input'], parsed[i]['age'], parsed[i]['duration_days'])
+                for i in jobs
+            }
+            for i, future in futures.items():
+                summaries[i] = future.result()
+
+    return jsonify(batch_responses(parsed, errors, results, summaries, include_summary))
+
+
+
+HEALTH_RECORDS_PATH = os.getenv("HEALTH_RECORDS_PATH")
+DEFAULT_RECORD_PAGE = 20
+MAX_RECORD_PAGE = int(os.getenv("MAX_RECORD_PAGE", "100"))
+# Health records belong to the Firebase user whose ID token signs the request.
+FIREBASE_PROJECT_ID = os.getenv("FIREBASE_PROJECT_ID")
+FIREBASE_CERTS_TTL = float(os.getenv("FIREBASE_CERTS_TTL", "3600"))
+
+
+def get_health_records():
+    """Health-record store, replaying HEALTH_RECORDS_PATH on first use when it is set."""
+    return _lazy_global("health_records", lambda: HealthRecordStore(HEALTH_RECORDS_PATH))
+
+
+def _make_firebase_request():
+    import requests
+    import google.auth.transport.requests
+
+    transport = google.auth.transport.requests.Request(requests.Session())
+    certs = {}
+
+    def fetch(url, method="GET", **kwargs):
+        # Google's signing certificates rotate daily; don't fetch them for every request.
+        cached = certs.get(url)
+        if cached and cached[0] > time.monotonic():
+            return cached[1]
+        response = transport(url, method=method, **kwargs)
+        if response.status == 200:
+            certs[url] = (time.monotonic() + FIREBASE_CERTS_TTL, response)
+        return response
+
+    return fetch
+
+
+def verify_id_token(token):
+    """The uid of a Firebase ID token issued for FIREBASE_PROJECT_ID, or RequestError (401) if it is not valid."""
+    if not FIREBASE_PROJECT_ID:
+        raise RequestError({'error': 'Health records are unavailable: FIREBASE_PROJECT_ID is not set.'}, 503)
+
+    import google.auth.exceptions
+    from google.oauth2 import id_token
+
+    try:
+        claims = id_token.verify_firebase_token(
+            token, _lazy_global("firebase_request", _make_firebase_request), audience=FIREBASE_PROJECT_ID)
+    except google.auth.exceptions.TransportError as e:
+        print(f"⚠️ Could not fetch Firebase signing certificates: {e}")
+        raise RequestError({'error': 'Could not verify the ID token right now.'}, 503)
+    except (ValueError, google.auth.exceptions.GoogleAuthError):
+        raise RequestError({'error': 'Invalid or expired ID token.'}, 401)
+    if not claims or not claims.get('sub'):
+        raise RequestError({'error': 'Invalid or expired ID token.'}, 401)
+    return claims['sub']
+
+
+def authenticated_user(headers):
+    """The Firebase uid from an ``Authorization: Bearer <ID token>`` header."""
+    scheme, _, token = headers.get('Authorization', '').partition(' ')
+    if scheme.lower() != 'bearer' or not token.strip():
+        raise RequestError({'error': 'Sign in required: send "Authorization: Bearer <Firebase ID token>".'}, 401)
+    return verify_id_token(token.strip())
+
+
+def parse_record_upsert(data):
+    records = data.get('records', [data['record']] if isinstance(data.get('record'), dict) else None)
+    if not isinstance(records, list) or not records:
+        raise RequestError({'error': 'Invalid input. Provide "record" or a non-empty "records" list.'})
+    if len(records) > MAX_BATCH_RECORDS:
+        raise RequestError({'error': f'Too many records. Maximum batch size is {MAX_BATCH_RECORDS}.'}, 413)
+    if not all(isinstance(r, dict) and r.get('id') not in (None, '') for r in records):
+        raise RequestError({'error': 'Invalid input. Every record needs an "id".'})
+    return records
+
+
+def parse_record_search(args):
+    date_filter = args.get('date', 'all')
+    if date_filter not in DATE_FILTERS:
+        raise RequestError({'error': f'Invalid "date". Use one of: {", ".join(DATE_FILTERS)}.'})
+    try:
+        limit = int(args.get('limit', DEFAULT_RECORD_PAGE))
+        today = date.fromisoformat(args['today']) if args.get('today') else None
+    except ValueError:
+        raise RequestError({'error': 'Invalid "limit" or "today" (YYYY-MM-DD).'})
+    if not 1 <= limit <= MAX_RECORD_PAGE:
+        raise RequestError({'error': f'"limit" must be between 1 and {MAX_RECORD_PAGE}.'})
+
+    return {
+        'term': args.get('q', ''),
+        'status': args.get('status', 'all'),
+        'date_filter': date_filter,
+        'today': today,
+        'cursor': args.get('cursor') or None,
+        'limit': limit,
+    }
+
+
+def find_health_records(user_id, filters):
+    try:
+        with stage("record_search"):
+            records, next_cursor = get_health_records().search(user_id, **filters)
+    except InvalidCursor as e:
+        raise RequestError({'error': str(e)})
+    return {'records': records, 'next_cursor': next_cursor}
+
+
+@api.route('/api/health-records', methods=['POST'])
+def upsert_health_records():
+    try:
+        user_id = authenticated_user(request.headers)
+        records = parse_record_upsert(request.get_json(silent=True) or {})
+    except RequestError as e:
+        return jsonify(e.payload), e.status
+
+    get_health_records().upsert(user_id, records)
+    return jsonify({'success': True, 'count': len(records)})
+
+
+@api.route('/api/health-records/<record_id>', methods=['DELETE'])
+def delete_health_record(record_id):
+    try:
+        user_id = authenticated_user(request.headers)
+    except RequestError as e:
+        return jsonify(e.payload), e.status
+
+    if not get_health_records().delete(user_id, record_id):
+        return jsonify({'error': 'Unknown record id.'}), 404
+    return jsonify({'success': True})
+
+
+@api.route('/api/health-records/search', methods=['GET'])
+def search_health_records():
+    """
+    Paginated search over the signed-in user's records, with the semantics
+    of src/utils/filterHealthRecords.js. Query: q, status, date
+    (all/today/upcoming/past), today (the caller's local date,
+    YYYY-MM-DD), limit, cursor (next_cursor of the previous page).
+    """
+    try:
+        user_id = authenticated_user(request.headers)
+        return jsonify(find_health_records(user_id, parse_record_search(request.args)))
+    except RequestError as e:
+        return jsonify(e.payload), e.status
+
+
+def warm_up():
+    """
+    Builds what the first requests would otherwise pay for: the symptom
+    index, the critical-symptom detector, the hospital and health-record
+    indexes, the lifestyle condition index, the PDF stylesheet and the
+    Gemini client.
+    """
+    started = time.perf_counter()
+    get_analyzer()
+    get_critical_detector()
+    get_condition_index()
+    get_hospital_index()
+    get_health_records()
+    pdf_renderer.warm_up()
+    if GEMINI_API_KEY:
+        get_client()
+    print(f"🔥 Warm-up finished in {(time.perf_counter() - started) * 1000:.0f} ms")
+
+
+def create_app(warm=None, cors=True):
+    """
+    Builds the Flask app. ``warm`` runs warm_up() before returning and
+    defaults to the WARM_UP environment variable; otherwise everything heavy
+    is built on first use. ``cors=False`` leaves CORS headers to a server
+    mounting the app (asgi.py).
+    """
+    flask_app = Flask(__name__)
+    if cors:
+        from flask_cors import CORS
+        CORS(flask_app)
+    flask_app.register_blueprint(api)
+
+    if not GEMINI_API_KEY:
+        print("⚠️ GEMINI_API_KEY is not set; AI summaries and recommendations will use fallbacks.")
+    if WARM_UP if warm is None else warm:
+        warm_up()
+    return flask_app
+
+
+def get_app():
+    """The module's shared Flask app (``app:app``), created on first access."""
+    global _app
+    if _app is None:
+        with _init_lock:
+            if _app is None:
+                _app = create_app()
+    return _app
+
+
+def __getattr__(name):
+    # Keeps ``gunicorn app:app`` and ``from app import app`` working without
+    # building the app at import time.
+    if name == "app":
+        return get_app()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
 if __name__ == "__main__":
-    app.run(host='0.0.0.0', port=5000)
+    get_app().run(host='0.0.0.0', port=int(os.getenv("PORT", "5000")))
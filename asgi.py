@@ -0,0 +1,416 @@
+"""
+ASGI serving mode for the same routes as app.py.
+
+The routes that wait on Gemini or Overpass (symptom analysis, its batch
+version, lifestyle recommendations, nearby hospitals, PDF downloads and the
+two stats pages reporting on the async clients) are async here: Gemini
+calls go through the async client (client.aio) and Overpass through httpx,
+so a request waiting on an upstream call holds a coroutine instead of a
+thread and one process can keep hundreds of them in flight. Every other
+route is app.py's own Flask view, mounted through a2wsgi and run on its
+thread pool. Configuration, caches, the analyzer and all request parsing
+and response building are shared with app.py, which keeps working on its
+own.
+
+    uvicorn asgi:app --workers 4
+
+CORS is Starlette's CORSMiddleware over both halves; the mounted Flask
+app is built without flask_cors.
+"""
+import json
+import time
+import asyncio
+import contextlib
+import contextvars
+
+from a2wsgi import WSGIMiddleware
+from starlette.applications import Starlette
+from starlette.exceptions import HTTPException
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Mount, Route
+
+import app as medisense
+from app import RequestError, gemini_call, mark_partial, stage
+from deadline import end_deadline, out_of_time, time_left
+from gemini_scheduler import AsyncGeminiScheduler, PRIORITY_SYMPTOM, PRIORITY_LIFESTYLE
+from single_flight import AsyncSingleFlight
+from overpass_client import AsyncOverpassClient
+from pdf_renderer import RendererBusy
+from metrics import (
+    REGISTRY, REQUEST_SECONDS, REQUESTS_TOTAL,
+    start_request_timings, end_request_timings, server_timing_header,
+)
+
+gemini_scheduler = AsyncGeminiScheduler(
+    rate=medisense.gemini_scheduler.rate,
+    burst=medisense.gemini_scheduler.burst,
+    max_in_flight=medisense.gemini_scheduler.max_in_flight,
+    max_queue=medisense.gemini_scheduler.max_queue,
+    queue_timeout=medisense.gemini_scheduler.queue_timeout,
+)
+gemini_flights = AsyncSingleFlight(timeout=medisense.gemini_flights.timeout)
+overpass_client = AsyncOverpassClient(
+    medisense.OVERPASS_MIRRORS,
+    hedge=medisense.OVERPASS_HEDGE,
+    timeout=medisense.OVERPASS_TIMEOUT,
+)
+
+# In this mode the async scheduler and single-flight group do the work;
+# report them under the same metric names.
+REGISTRY.add_collector(lambda: medisense.collect_scheduler_metrics(gemini_scheduler))
+REGISTRY.add_collector(lambda: medisense.collect_single_flight_metrics(gemini_flights))
+
+
+def jsonify(payload, status: int = 200) -> JSONResponse:
+    return JSONResponse(payload, status_code=status)
+
+
+async def get_json(request: Request, silent: bool = False):
+    """Same contract as flask.Request.get_json(): 415 unless the body is JSON, 400 if it does not parse."""
+    mimetype = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    if mimetype != "application/json" and not (mimetype.startswith("application/") and mimetype.endswith("+json")):
+        if silent:
+            return None
+        raise HTTPException(415, "Did not attempt to load JSON data because the request Content-Type was not 'application/json'.")
+    try:
+        return json.loads(await request.body())
+    except ValueError as e:
+        if silent:
+            return None
+        raise HTTPException(400, f"Failed to decode JSON object: {e}")
+
+
+async def coalesced_generate(key, prompt, priority):
+    async def call():
+        async with gemini_scheduler.slot(priority, timeout=time_left(gemini_scheduler.queue_timeout)):
+            return await medisense.get_client().aio.models.generate_content(
+                model="gemini-2.5-flash", contents=prompt, config=medisense.gemini_config())
+
+    response, shared = await gemini_flights.do(key, call, timeout=time_left(gemini_flights.timeout))
+    if shared:
+        print(f"🔗 Shared in-flight Gemini call: {key[0]}")
+    return response
+
+
+async def generate_ai_summary(result, symptoms_input, age, duration_days):
+    key = medisense.summary_key(result, symptoms_input, age, duration_days)
+    ai_summary = await asyncio.to_thread(medisense.summary_cache.get, key)
+    if ai_summary is not None:
+        return ai_summary
+
+    try:
+        with gemini_call("summary", "gemini_summary"):
+            gemini_response = await coalesced_generate(
+                key,
+                medisense.build_summary_prompt(result, symptoms_input, age, duration_days),
+                PRIORITY_SYMPTOM,
+            )
+        ai_summary = await asyncio.to_thread(medisense.store_summary, key, gemini_response)
+    except Exception as e:
+        ai_summary = None if out_of_time("ai_summary") else f"(Gemini unavailable: {e})"
+
+    return ai_summary
+
+
+pumps = set()
+
+
+async def pump_summary_stream(key, prompt, tokens):
+    """app.pump_summary_stream() for asyncio: the slot is held only while Gemini streams."""
+    chunks = []
+    try:
+        with gemini_call("summary_stream", "gemini_stream"):
+            async with gemini_scheduler.slot(PRIORITY_SYMPTOM, timeout=time_left(gemini_scheduler.queue_timeout)):
+                stream = await medisense.get_client().aio.models.generate_content_stream(
+                    model="gemini-2.5-flash", contents=prompt, config=medisense.gemini_config())
+                async for chunk in stream:
+                    text = getattr(chunk, "text", None)
+                    if text:
+                        chunks.append(text)
+                        tokens.put_nowait(("token", text))
+        ai_summary = "".join(chunks).strip() or None
+        if ai_summary:
+            await asyncio.to_thread(medisense.summary_cache.set, key, ai_summary)
+    except Exception as e:
+        ai_summary = None if out_of_time("ai_summary") else f"(Gemini unavailable: {e})"
+    tokens.put_nowait(("final", ai_summary))
+
+
+def stream_analysis(result, symptoms_input, age, duration_days) -> StreamingResponse:
+    key = medisense.summary_key(result, symptoms_input, age, duration_days)
+    prompt = medisense.build_summary_prompt(result, symptoms_input, age, duration_days)
+
+    async def generate():
+        yield medisense.analysis_event(result, symptoms_input)
+
+        ai_summary = await asyncio.to_thread(medisense.summary_cache.get, key)
+        if ai_summary is not None:
+            yield medisense.sse_event("token", {"text": ai_summary})
+            yield medisense.final_event(result, symptoms_input, ai_summary)
+            return
+
+        # Reading upstream in its own task frees the scheduler slot as soon
+        # as Gemini is done, however slowly this client reads.
+        tokens = asyncio.Queue()
+        pump = asyncio.create_task(pump_summary_stream(key, prompt, tokens))
+        # Runs to the end (and fills the cache) even if the client leaves.
+        pumps.add(pump)
+        pump.add_done_callback(pumps.discard)
+        while True:
+            kind, value = await tokens.get()
+            if kind == "final":
+                break
+            yield medisense.sse_event("token", {"text": value})
+        await pump
+
+        yield medisense.final_event(result, symptoms_input, value)
+
+    return StreamingResponse(generate(), media_type="text/event-stream", headers=medisense.SSE_HEADERS)
+
+
+async def get_hospitals_overpass(lat, lng, radius_km, k):
+    key, center_lat, center_lng, fetch_radius = medisense.hospital_tile(lat, lng, radius_km)
+    tile = medisense.cached_tile(key)
+    if tile is None:
+        try:
+            timeout = time_left()
+        except TimeoutError:
+            return medisense.overpass_fallback(lat, lng, radius_km, k, key)
+        with stage("overpass_query"):
+            data = await overpass_client.query(medisense.hospital_query(center_lat, center_lng, fetch_radius), timeout=timeout)
+        if data is None:
+            return medisense.overpass_fallback(lat, lng, radius_km, k, key)
+        tile = medisense.cache_tile(key, data["elements"])
+    else:
+        print(f"⚡ Hospital tile cache hit: {key}")
+
+    return medisense.nearest_in_tile(tile, lat, lng, radius_km, k)
+
+
+async def find_nearby_hospitals(lat, lng, radius_km, k):
+    if medisense.use_hospital_index(lat, lng):
+        return medisense.query_hospital_index(lat, lng, radius_km, k)
+    if medisense.get_hospital_index() is None or medisense.OVERPASS_FALLBACK:
+        return await get_hospitals_overpass(lat, lng, radius_km, k)
+    return []
+
+
+async def nearby_hospitals(request):
+    try:
+        user_lat, user_lng, max_distance, limit = medisense.parse_nearby_request(await get_json(request))
+    except RequestError as e:
+        return jsonify(e.payload, e.status)
+
+    try:
+        hospitals = await find_nearby_hospitals(user_lat, user_lng, max_distance, limit)
+        return jsonify(mark_partial({'hospitals': hospitals}))
+    except Exception as e:
+        print(f"Error fetching hospitals: {e}")
+        return jsonify(medisense.HOSPITALS_ERROR, 500)
+
+
+async def lifestyle_recommendations(request):
+    try:
+        condition = medisense.parse_lifestyle_request(await get_json(request) or {})
+    except RequestError as e:
+        return jsonify(e.payload, e.status)
+
+    cache_key = medisense.normalize_condition(condition)
+    # Similarity lookups and shared-cache reads are blocking; keep them off the event loop.
+    cached, match = await asyncio.to_thread(medisense.cached_recommendations, cache_key)
+    if cached is not None:
+        print(f"⚡ Cache hit for condition: {cache_key}" + (f" (≈ {match['matched_condition']})" if match else ""))
+        return jsonify({"success": True, "recommendations": cached, **match})
+
+    try:
+        print(f"🧠 Using Gemini for condition: {condition}")
+        with gemini_call("lifestyle", "gemini_lifestyle"):
+            response = await coalesced_generate(("lifestyle", cache_key), medisense.build_prompt(condition), PRIORITY_LIFESTYLE)
+        raw_recs = medisense.parse_recommendations(response)
+        print("✅ Gemini JSON parsed successfully.")
+        from_gemini = True
+    except Exception as e:
+        print(f"⚠️ Gemini call failed or invalid JSON → fallback: {e}")
+        out_of_time("recommendations")
+        raw_recs = medisense.FALLBACK_RECOMMENDATIONS
+        from_gemini = False
+
+    payload = await asyncio.to_thread(medisense.recommendations_payload, cache_key, raw_recs, from_gemini)
+    return jsonify(mark_partial(payload))
+
+
+async def cache_stats(request):
+    return jsonify(medisense.cache_stats_payload(gemini_scheduler, gemini_flights))
+
+
+async def overpass_mirrors(request):
+    return jsonify({"mirrors": overpass_client.stats(), "ranking": overpass_client.ranked_mirrors()})
+
+
+async def download_recommendations(request):
+    data = await get_json(request)
+    health_condition, recommendations, filename = await asyncio.to_thread(medisense.parse_download_request, data)
+
+    try:
+        with stage("pdf_render"):
+            future = medisense.pdf_renderer.submit(health_condition, recommendations)
+            pdf = await asyncio.wait_for(asyncio.wrap_future(future), medisense.PDF_RENDER_TIMEOUT)
+    except RendererBusy:
+        return jsonify(medisense.PDF_BUSY_ERROR, 503)
+    except TimeoutError:
+        future.cancel()
+        return jsonify(medisense.PDF_BUSY_ERROR, 503)
+
+    return Response(pdf, media_type="application/pdf", headers={
+        "Content-Disposition": f'attachment; filename="{filename}"',
+        "Cache-Control": "no-cache",
+    })
+
+
+async def analyze_symptoms(request):
+    try:
+        data = await get_json(request)
+        try:
+            symptoms_input, age, duration_days = medisense.parse_analysis_request(data)
+            session_id = medisense.parse_session_id(data)
+        except RequestError as e:
+            return jsonify(e.payload, e.status)
+
+        # Symptom matching and session reads are blocking; keep them off the event loop.
+        session = await asyncio.to_thread(medisense.load_session, session_id)
+        result = await asyncio.to_thread(medisense.run_analysis, symptoms_input, age, duration_days, session)
+
+        critical = medisense.detect_critical(data['symptoms_input'])
+        if critical:
+            await asyncio.to_thread(medisense.save_session, session_id, session)
+            loop = asyncio.get_running_loop()
+            response = await asyncio.to_thread(
+                medisense.emergency_response, result, symptoms_input, age, duration_days, critical,
+                # On the loop but outside the request's context: the summary is fetched later and must not stop at its deadline.
+                start_summary=lambda *args: contextvars.Context().run(
+                    asyncio.run_coroutine_threadsafe, generate_ai_summary(*args), loop),
+            )
+            if medisense.wants_stream(request.query_params, data):
+                return Response(medisense.emergency_events(response), media_type="text/event-stream",
+                                headers=medisense.SSE_HEADERS)
+            return jsonify(response)
+
+        if medisense.wants_stream(request.query_params, data):
+            await asyncio.to_thread(medisense.save_session, session_id, session)
+            return stream_analysis(result, symptoms_input, age, duration_days)
+
+        previous = medisense.session_summary(session, result)
+        if previous:
+            medisense.SESSION_SUMMARIES.inc(result="reused")
+            ai_summary = previous["text"]
+            medisense.apply_session_summary(result, previous)
+        else:
+            if session is not None:
+                medisense.SESSION_SUMMARIES.inc(result="generated")
+            ai_summary = await generate_ai_summary(result, symptoms_input, age, duration_days)
+            medisense.remember_summary(session, result, ai_summary)
+            medisense.apply_ai_summary(result, ai_summary)
+        await asyncio.to_thread(medisense.save_session, session_id, session)
+
+        return jsonify(mark_partial(medisense.session_response(
+            medisense.build_analysis_response(symptoms_input, result, ai_summary), session_id, bool(previous))))
+
+    except Exception as e:
+        return jsonify({'error': str(e)}, 500)
+
+
+async def analyze_symptoms_batch(request):
+    try:
+        records, include_summary = medisense.parse_batch_request(await get_json(request, silent=True) or {})
+    except RequestError as e:
+        return jsonify(e.payload, e.status)
+
+    # Large batches are CPU work; keep them off the event loop.
+    parsed, errors, results = await asyncio.to_thread(medisense.analyze_batch, records)
+
+    summaries = [None] * len(records)
+    if include_summary:
+        slots = asyncio.Semaphore(medisense.BATCH_GEMINI_WORKERS)
+
+        async def summarize(i):
+            async with slots:
+                summaries[i] = await generate_ai_summary(
+                    results[i], parsed[i]['symptoms_input'], parsed[i]['age'], parsed[i]['duration_days'])
+
+        await asyncio.gather(*(summarize(i) for i, r in enumerate(parsed) if r is not None))
+
+    return jsonify(medisense.batch_responses(parsed, errors, results, summaries, include_summary))
+
+
+class Observed:
+    """
+    ASGI endpoint around an async route handler, doing what app.py's
+    before/after request hooks do for the Flask routes: request timings,
+    the request deadline (which stays set while a streamed body is sent),
+    request metrics and the Server-Timing header.
+    """
+
+    def __init__(self, rule: str, handler):
+        self.rule = rule
+        self.handler = handler
+
+    async def __call__(self, scope, receive, send):
+        request = Request(scope, receive)
+        started = time.perf_counter()
+        timings = start_request_timings()
+        medisense.start_request_deadline(request.headers)
+        status = 500
+        try:
+            try:
+                response = await self.handler(request, **request.path_params)
+            except HTTPException as e:
+                response = jsonify({"error": e.detail}, e.status_code)
+            status = response.status_code
+            if medisense.SERVER_TIMING:
+                response.headers["Server-Timing"] = server_timing_header(timings, time.perf_counter() - started)
+            await response(scope, receive, send)
+        finally:
+            REQUEST_SECONDS.observe(time.perf_counter() - started, route=self.rule, method=request.method)
+            REQUESTS_TOTAL.inc(route=self.rule, method=request.method, status=status)
+            medisense.record_deadline_metrics(self.rule)
+            end_request_timings()
+            end_deadline()
+
+
+def route(rule: str, handler, method: str) -> Route:
+    return Route(rule, Observed(rule, handler), methods=[method])
+
+
+# Built without warm-up; the lifespan handler warms it up when WARM_UP is set.
+flask_app = medisense.create_app(warm=False, cors=False)
+
+
+@contextlib.asynccontextmanager
+async def lifespan(_):
+    if medisense.WARM_UP:
+        await asyncio.to_thread(medisense.warm_up)
+    yield
+    await overpass_client.aclose()
+
+
+app = Starlette(
+    routes=[
+        route("/api/nearby-hospitals", nearby_hospitals, "POST"),
+        route("/api/lifestyle-recommendations", lifestyle_recommendations, "POST"),
+        route("/api/cache-stats", cache_stats, "GET"),
+        route("/api/overpass-mirrors", overpass_mirrors, "GET"),
+        route("/api/download-recommendations", download_recommendations, "POST"),
+        route("/api/symptom-analysis", analyze_symptoms, "POST"),
+        route("/api/symptom-analysis/batch", analyze_symptoms_batch, "POST"),
+        # Everything else, including 404s and 405s, is answered by the Flask app.
+        Mount("/", app=WSGIMiddleware(flask_app)),
+    ],
+    middleware=[
+        Middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"],
+                   expose_headers=["Content-Disposition"]),
+    ],
+    lifespan=lifespan,
+)
@@ -0,0 +1,91 @@
+"""
+Measures worker cold start: importing app.py, building the Flask app, the
+optional warm-up, and the first /api/symptom-analysis request (Gemini is
+replaced with the fake from benchmarks/fakes.py). Every run is a fresh
+interpreter, so nothing is shared between runs.
+
+Run from the repository root:
+    python benchmarks/bench_cold_start.py --runs 10
+    python benchmarks/bench_cold_start.py --runs 10 --warm
+
+Works on commits from before create_app() existed, so the same script can
+measure before and after.
+"""
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = r"""
+import os, sys, json, time, resource
+sys.path.insert(0, {root!r})
+sys.path.insert(0, {benchmarks!r})
+started = time.perf_counter()
+import app as medisense
+imported = time.perf_counter()
+flask_app = medisense.create_app(warm=False) if hasattr(medisense, "create_app") else medisense.app
+created = time.perf_counter()
+if {warm!r} and hasattr(medisense, "warm_up"):
+    medisense.warm_up()
+warmed = time.perf_counter()
+from fakes import FakeGeminiClient
+medisense.client = FakeGeminiClient(latency=0)
+response = flask_app.test_client().post(
+    "/api/symptom-analysis", json={{"symptoms_input": "I have a high fever, dry cough and body aches", "age": 34}})
+assert response.status_code == 200, response.status_code
+first = time.perf_counter()
+print(json.dumps({{
+    "import_ms": (imported - started) * 1000,
+    "create_app_ms": (created - imported) * 1000,
+    "warm_up_ms": (warmed - created) * 1000,
+    "first_request_ms": (first - warmed) * 1000,
+    "total_ms": (first - started) * 1000,
+    "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+}}))
+"""
+
+IMPORT_PROBE = r"""
+import sys
+sys.path.insert(0, {root!r})
+import app
+print(",".join(sorted(m for m in {heavy!r} if m in sys.modules)))
+"""
+
+HEAVY_MODULES = ["google.genai", "reportlab.platypus", "rapidfuzz", "flask_cors", "numpy", "requests", "httpx"]
+
+
+def run_child(code, env):
+    output = subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=env, capture_output=True, text=True)
+    if output.returncode != 0:
+        raise RuntimeError(output.stderr.strip().splitlines()[-1] if output.stderr.strip() else "child failed")
+    return (output.stdout.strip().splitlines() or [""])[-1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--warm", action="store_true", help="call warm_up() before the first request")
+    args = parser.parse_args()
+
+    env = dict(os.environ, GEMINI_API_KEY=os.environ.get("GEMINI_API_KEY", "benchmark"), WARM_UP="0")
+    env.pop("HOSPITAL_EXTRACT_PATH", None)
+    env.pop("CACHE_DB_PATH", None)
+
+    benchmarks = os.path.dirname(os.path.abspath(__file__))
+    code = CHILD.format(root=ROOT, benchmarks=benchmarks, warm=args.warm)
+    runs = [json.loads(run_child(code, env)) for _ in range(args.runs)]
+    loaded = run_child(IMPORT_PROBE.format(root=ROOT, heavy=HEAVY_MODULES), env)
+
+    print(f"{'phase':<20} {'median ms':>10} {'min ms':>10}")
+    for phase in ("import_ms", "create_app_ms", "warm_up_ms", "first_request_ms", "total_ms", "max_rss_mb"):
+        values = [run[phase] for run in runs]
+        print(f"{phase:<20} {statistics.median(values):>10.1f} {min(values):>10.1f}")
+    print(f"\nHeavy modules loaded by 'import app': {loaded or 'none'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""
+Load time and per-worker memory of the symptom lexicon at 10k terms:
+indexing the JSON file in every worker versus opening the compiled,
+memory-mapped file, plus the cost of a hot swap and of one match.
+
+Workers are separate processes that load the lexicon at the same time,
+match a few texts and then report from /proc/self/smaps_rollup (Linux):
+RSS counts shared pages in full, PSS splits them between the processes
+mapping them, USS is what the worker alone holds.
+
+Run from the repository root:
+    python benchmarks/bench_lexicon.py --terms 10000 --workers 4
+"""
+import os
+import sys
+import json
+import random
+import shutil
+import argparse
+import statistics
+import subprocess
+import tempfile
+import time
+import timeit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from symptom_lexicon import DEFAULT_LEXICON_PATH, SymptomLexicon, compile_source, load_lexicon
+
+QUALIFIERS = ["mild", "chronic", "sudden", "recurring", "left", "right", "upper", "lower", "bilateral",
+              "intermittent", "acute", "nocturnal", "radiating", "persistent", "sharp", "dull", "exertional",
+              "postprandial", "morning", "positional", "throbbing", "burning", "stabbing", "episodic"]
+FILLER = "i have been feeling really unwell since last tuesday and it got worse at night".split()
+
+CHILD = r"""
+import os, sys, json, time
+sys.path.insert(0, {root!r})
+
+def smaps():
+    with open("/proc/self/smaps_rollup") as f:
+        fields = dict(line.split(":", 1) for line in f.read().splitlines()[1:])
+    kb = lambda *names: sum(int(fields[n].split()[0]) for n in names)
+    return {{"rss": kb("Rss"), "pss": kb("Pss"), "uss": kb("Private_Clean", "Private_Dirty")}}
+
+import numpy, rapidfuzz, symptom_lexicon
+before = smaps()
+started = time.perf_counter()
+if {mode!r} == "mmap":
+    lexicon = symptom_lexicon.load_lexicon({source!r}, {compiled!r})
+else:
+    with open({source!r}, "rb") as f:
+        lexicon = symptom_lexicon.compile_source(f.read())
+loaded = time.perf_counter()
+for text in {texts!r}:
+    lexicon.matcher.find(text)
+print("ready", flush=True)
+sys.stdin.readline()
+after = smaps()
+print(json.dumps({{"load_ms": (loaded - started) * 1000, **{{k: after[k] - before[k] for k in after}}}}), flush=True)
+"""
+
+
+def make_lexicon(terms, rng):
+    """The shipped lexicon grown to ``terms`` terms, a fifth of the new ones with a synonym."""
+    with open(DEFAULT_LEXICON_PATH, encoding="utf-8") as f:
+        data = json.load(f)
+    entries = data["terms"]
+    spellings = {e["term"] for e in entries} | {s for e in entries for s in e.get("synonyms", [])}
+    base = [e["term"] for e in entries]
+    while len(entries) < terms:
+        term = f"{rng.choice(QUALIFIERS)} {rng.choice(QUALIFIERS)} {rng.choice(base)}"
+        if term in spellings:
+            continue
+        spellings.add(term)
+        entry = {"term": term, "severity": rng.randrange(1, 11), "category": "Synthetic"}
+        synonym = f"{rng.choice(QUALIFIERS)} {term}"
+        if rng.random() < 0.2 and synonym not in spellings:
+            spellings.add(synonym)
+            entry["synonyms"] = [synonym]
+        entries.append(entry)
+    return {**data, "version": f"bench-{terms}", "terms": entries}
+
+
+def make_text(vocab, length, rng):
+    words = []
+    while len(" ".join(words)) < length:
+        words.append(rng.choice(vocab) if rng.random() < 0.15 else rng.choice(FILLER))
+    return " ".join(words)[:length].strip()
+
+
+def run_workers(mode, source, compiled, workers, texts):
+    code = CHILD.format(root=ROOT, mode=mode, source=source, compiled=compiled, texts=texts)
+    procs = [subprocess.Popen([sys.executable, "-c", code], stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+             for _ in range(workers)]
+    # Every worker holds its lexicon before any of them measures, so shared
+    # pages are counted once across all of them.
+    for p in procs:
+        assert p.stdout.readline().strip() == "ready"
+    results = []
+    for p in procs:
+        p.stdin.write("\n")
+        p.stdin.flush()
+        results.append(json.loads(p.stdout.readline()))
+        p.wait()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--terms", type=int, default=10000)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    data = make_lexicon(args.terms, rng)
+    workdir = tempfile.mkdtemp(prefix="bench-lexicon-")
+    try:
+        source = os.path.join(workdir, "symptom_lexicon.json")
+        compiled = os.path.join(workdir, "symptom_lexicon.bin")
+        with open(source, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        with open(source, "rb") as f:
+            raw = f.read()
+
+        started = time.perf_counter()
+        lexicon = load_lexicon(source, compiled)
+        compile_ms = (time.perf_counter() - started) * 1000
+        index_ms = min(timeit.repeat(lambda: compile_source(raw), number=1, repeat=3)) * 1000
+        open_ms = min(timeit.repeat(lambda: load_lexicon(source, compiled), number=1, repeat=5)) * 1000
+        matcher = lexicon.matcher
+
+        print(f"lexicon: {len(lexicon.severity)} terms, {len(matcher.symptoms)} spellings, "
+              f"{len(raw) / 1e6:.2f} MB JSON, {os.path.getsize(compiled) / 1e6:.2f} MB compiled "
+              f"({matcher.bigram_counts.nbytes / 1e6:.2f} MB {matcher.bigram_counts.dtype} bigram matrix)")
+        print(f"first load, compile and write : {compile_ms:8.1f} ms")
+        print(f"index JSON in process          : {index_ms:8.1f} ms")
+        print(f"open compiled (mmap)           : {open_ms:8.1f} ms")
+
+        vocab = list(lexicon.severity)
+        for length in (120, 500):
+            text = make_text(vocab, length, rng)
+            runs = min(timeit.repeat(lambda: matcher.find(text), number=20, repeat=5)) / 20
+            print(f"find() on {length:>4} chars          : {runs * 1000:8.2f} ms")
+
+        # Hot swap: a new version of the file is compiled once and swapped in.
+        store = SymptomLexicon(source, compiled)
+        data["version"] += "-next"
+        data["terms"].append({"term": "brain fog", "severity": 4, "category": "Neurological"})
+        with open(source + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(source + ".tmp", source)
+        os.utime(source, (time.time() + 1, time.time() + 1))
+        started = time.perf_counter()
+        assert store.reload()
+        print(f"hot swap (recompile + open)    : {(time.perf_counter() - started) * 1000:8.1f} ms")
+
+        texts = [make_text(vocab, 300, rng) for _ in range(50)]
+        print(f"\n{args.workers} concurrent workers, KB per worker after load and 50 matches:")
+        print(f"{'mode':>8} {'load ms':>8} {'RSS':>8} {'PSS':>8} {'USS':>8}")
+        for mode in ("json", "mmap"):
+            results = run_workers(mode, source, compiled, args.workers, texts)
+            med = {k: statistics.median(r[k] for r in results) for k in results[0]}
+            print(f"{mode:>8} {med['load_ms']:>8.1f} {med['rss']:>8.0f} {med['pss']:>8.0f} {med['uss']:>8.0f}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Compares the original per-symptom partial_ratio loop with SymptomMatcher
+across input lengths and vocabulary sizes.
+
+Run from the repository root:
+    python benchmarks/bench_symptom_matcher.py
+"""
+import os
+import sys
+import random
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rapidfuzz import fuzz
+from symptom_analyser import SymptomAnalyzer
+from symptom_matcher import SymptomMatcher
+
+QUALIFIERS = ["mild", "chronic", "sudden", "recurring", "left", "right", "upper", "lower",
+              "intermittent", "acute", "nocturnal", "radiating", "persistent", "sharp", "dull"]
+FILLER = "i have been feeling really unwell since last tuesday and it got worse at night".split()
+
+
+def legacy_match(severity, text):
+    return [s for s in severity if fuzz.partial_ratio(s, text) > 80]
+
+
+def grow_vocabulary(severity, size):
+    vocab = dict(severity)
+    rng = random.Random(0)
+    base = list(severity.items())
+    while len(vocab) < size:
+        s, v = rng.choice(base)
+        vocab[f"{rng.choice(QUALIFIERS)} {rng.choice(QUALIFIERS)} {s}"] = v
+    return vocab
+
+
+def make_text(severity, length, rng):
+    symptoms = list(severity)
+    words = []
+    while len(" ".join(words)) < length:
+        words.append(rng.choice(symptoms) if rng.random() < 0.15 else rng.choice(FILLER))
+    return " ".join(words)[:length].strip()
+
+
+def main():
+    rng = random.Random(42)
+    severity = SymptomAnalyzer().symptom_severity
+
+    print(f"{'vocab':>6} {'chars':>6} {'legacy us':>10} {'matcher us':>11} {'speedup':>8}")
+    for vocab_size in (len(severity), 1000, 5000):
+        vocab = grow_vocabulary(severity, vocab_size)
+        matcher = SymptomMatcher(vocab, threshold=80)
+        for length in (30, 120, 500, 2000):
+            text = make_text(severity, length, rng)
+            assert legacy_match(vocab, text) == matcher.match(text)
+            runs = max(3, 2000 // (vocab_size // 50 + length // 10))
+            legacy = min(timeit.repeat(lambda: legacy_match(vocab, text), number=runs, repeat=3)) / runs
+            fast = min(timeit.repeat(lambda: matcher.match(text), number=runs, repeat=3)) / runs
+            print(f"{len(vocab):>6} {length:>6} {legacy * 1e6:>10.0f} {fast * 1e6:>11.0f} {legacy / fast:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
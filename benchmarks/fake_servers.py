@@ -0,0 +1,146 @@
+"""
+Local HTTP stand-ins for the Gemini API and Overpass mirrors.
+
+    python benchmarks/fake_servers.py --gemini-port 8701 --overpass-ports 8711 8712 \
+        --gemini-latency 0.8 --overpass-latency 0.3 --error-rate 0.02 --elements 2000
+
+Point the app at them with GEMINI_BASE_URL=http://127.0.0.1:8701 and
+OVERPASS_MIRRORS=http://127.0.0.1:8711/api/interpreter,...
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fakes import FakeModels, make_overpass_payload
+
+
+class FakeServerConfig:
+    def __init__(self, latency=0.0, jitter=0.0, error_rate=0.0, elements=500, seed=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.elements = elements
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+
+    def delay(self):
+        with self.lock:
+            jitter = self.rng.uniform(-self.jitter, self.jitter) if self.jitter else 0.0
+        time.sleep(max(0.0, self.latency + jitter))
+
+    def should_fail(self):
+        with self.lock:
+            return self.rng.random() < self.error_rate
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    config = None
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status, body, content_type="application/json"):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_body(self):
+        return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+
+def gemini_handler(config):
+    models = FakeModels()
+
+    class GeminiHandler(_Handler):
+        def do_POST(self):
+            request = json.loads(self._read_body() or b"{}")
+            prompt = "".join(
+                part.get("text", "")
+                for content in request.get("contents", [])
+                for part in content.get("parts", [])
+            )
+            config.delay()
+            if config.should_fail():
+                self._send(503, json.dumps({"error": {"code": 503, "message": "fake overload", "status": "UNAVAILABLE"}}).encode())
+                return
+
+            def candidate(text):
+                return {"candidates": [{"content": {"parts": [{"text": text}], "role": "model"}, "finishReason": "STOP"}]}
+
+            text = models._answer(prompt)
+            if ":streamGenerateContent" in self.path:
+                words = text.split(" ")
+                chunks = [" ".join(words[i:i + 8]) + " " for i in range(0, len(words), 8)]
+                body = b"".join(b"data: " + json.dumps(candidate(c)).encode() + b"\r\n\r\n" for c in chunks)
+                self._send(200, body, "text/event-stream")
+            else:
+                self._send(200, json.dumps(candidate(text)).encode())
+
+    return GeminiHandler
+
+
+def overpass_handler(config):
+    body = json.dumps(make_overpass_payload(config.elements)).encode()
+
+    class OverpassHandler(_Handler):
+        def do_POST(self):
+            self._read_body()
+            config.delay()
+            if config.should_fail():
+                self._send(504, b'{"remark": "fake timeout"}')
+                return
+            self._send(200, body)
+
+    return OverpassHandler
+
+
+def serve(handler, port=0, host="127.0.0.1"):
+    """Start ``handler`` on a daemon thread; returns the server (see ``server_port``)."""
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--gemini-port", type=int, default=0)
+    parser.add_argument("--overpass-ports", type=int, nargs="*", default=[0])
+    parser.add_argument("--gemini-latency", type=float, default=0.5)
+    parser.add_argument("--overpass-latency", type=float, default=0.2)
+    parser.add_argument("--jitter", type=float, default=0.1)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--elements", type=int, default=500, help="hospitals per Overpass response")
+    args = parser.parse_args()
+
+    gemini = serve(gemini_handler(FakeServerConfig(args.gemini_latency, args.jitter, args.error_rate)), args.gemini_port)
+    overpass = [
+        serve(overpass_handler(FakeServerConfig(args.overpass_latency, args.jitter, args.error_rate, args.elements, seed=i)), port)
+        for i, port in enumerate(args.overpass_ports)
+    ]
+
+    # The load-test harness reads this line to discover the ports.
+    print(json.dumps({
+        "gemini": f"http://127.0.0.1:{gemini.server_port}",
+        "overpass": [f"http://127.0.0.1:{s.server_port}/api/interpreter" for s in overpass],
+    }), flush=True)
+
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
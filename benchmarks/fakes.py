@@ -0,0 +1,109 @@
+"""
+Deterministic local stand-ins for Gemini and Overpass, shared by the
+benchmarks so they never touch the network.
+"""
+import json
+import random
+import time
+
+
+SUMMARY_TEXT = (
+    "These symptoms are most often caused by a viral infection, but their combination "
+    "and duration deserve attention. Rest, drink plenty of fluids and monitor your "
+    "temperature. See a doctor soon if things do not improve within two days, and call "
+    "emergency services if breathing becomes difficult.\n"
+    "Final severity score: 6.5/10\n"
+    "Final risk assessment: MODERATE\n"
+    "This summary is informational and not a substitute for professional medical evaluation."
+)
+
+MESSY_RECOMMENDATIONS = (
+    "```json\n"
+    + json.dumps({
+        "diet": {
+            "general": ["Eat more vegetables", "Limit added sugar", "  ", "Drink water regularly"],
+            "specific_conditions": "Prefer whole grains; avoid sugary drinks – read food labels, watch portions",
+        },
+        "activity": ["Walk 30 minutes a day", "Stretch every morning", "Take the stairs"],
+        "prevention": "Check blood pressure monthly\nKeep vaccinations current\nSleep 7-9 hours",
+        "wellness_tips": "Practice breathing exercises; keep a symptom journal; stay connected",
+    }, indent=2)
+    + "\n```\nLet me know if you need anything else!"
+)
+
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeModels:
+    """Mimics ``client.models`` with canned answers chosen from the prompt."""
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.calls = 0
+
+    def _answer(self, contents):
+        if "JSON only" in contents:
+            return MESSY_RECOMMENDATIONS
+        if "ONE word" in contents:
+            return "Headache"
+        return SUMMARY_TEXT
+
+    def generate_content(self, model, contents, **kwargs):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        return FakeResponse(self._answer(contents))
+
+    def generate_content_stream(self, model, contents, **kwargs):
+        self.calls += 1
+        text = self._answer(contents)
+        words = text.split(" ")
+        for i in range(0, len(words), 8):
+            if self.latency:
+                time.sleep(self.latency / max(len(words) // 8, 1))
+            yield FakeResponse(" ".join(words[i:i + 8]) + " ")
+
+
+class FakeGeminiClient:
+    def __init__(self, latency=0.0):
+        self.models = FakeModels(latency)
+
+
+def make_overpass_payload(count, lat=12.97, lng=77.59, spread_deg=0.1, seed=0):
+    """An Overpass ``out center tags`` response with ``count`` hospitals around (lat, lng)."""
+    rng = random.Random(seed)
+    phone_keys = ["phone", "contact:phone", "mobile", "telephone", None]
+    elements = []
+    for i in range(count):
+        h_lat = lat + rng.uniform(-spread_deg, spread_deg)
+        h_lng = lng + rng.uniform(-spread_deg, spread_deg)
+        tags = {"amenity": "hospital", "name": f"Hospital {i % max(count // 3, 1)}"}
+        phone_key = rng.choice(phone_keys)
+        if phone_key:
+            tags[phone_key] = f" +91 80 {rng.randrange(10**7, 10**8)} "
+        if rng.random() < 0.6:
+            elements.append({"type": "node", "id": 10**6 + i, "lat": h_lat, "lon": h_lng, "tags": tags})
+        else:
+            elements.append({"type": "way", "id": 10**6 + i, "center": {"lat": h_lat, "lon": h_lng}, "tags": tags})
+    return {"version": 0.6, "generator": "fake-overpass", "elements": elements}
+
+
+class FakeOverpassClient:
+    """Drop-in for OverpassClient that answers every query with a canned payload."""
+
+    def __init__(self, payload):
+        self.payload = payload
+        self.calls = 0
+
+    def query(self, query, timeout=None):
+        self.calls += 1
+        return self.payload
+
+    def stats(self):
+        return []
+
+    def ranked_mirrors(self):
+        return []
@@ -0,0 +1,227 @@
+"""
+End-to-end load test for the four /api/* routes.
+
+Starts benchmarks/fake_servers.py (Gemini + Overpass stand-ins) and the
+Flask app wired to them, then drives each route at increasing
+concurrency and reports latency percentiles, a latency histogram,
+throughput and error rate per route and level.
+
+    python benchmarks/load_test.py --levels 1 4 16 64 --duration 5 \
+        --gemini-latency 0.8 --overpass-latency 0.3 --error-rate 0.02 --output load.json
+
+Use --app-url to target an app that is already running (it must be pointed
+at the fakes itself). The load generator is a thread pool in this process,
+so at very high concurrency it can become the bottleneck.
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import bisect
+import threading
+import subprocess
+import requests
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+BUCKETS_MS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 30000]
+CONDITIONS = ["diabetes", "hypertension", "back pain", "asthma", "migraine"]
+SYMPTOMS = ["fever", "dry cough", "headache", "nausea", "sore throat", "fatigue", "body aches",
+            "dizziness", "back pain", "runny nose", "joint pain", "rash", "vomiting", "chills"]
+RECOMMENDATIONS = {
+    "diet": {"general": ["Eat more vegetables", "Limit added sugar"], "specific_conditions": ["Prefer whole grains"]},
+    "activity": {"general": ["Walk 30 minutes a day"], "specific_conditions": []},
+    "prevention": {"general": ["Sleep 7-9 hours"], "specific_conditions": []},
+    "wellness_tips": ["Practice breathing exercises", "Stay connected"],
+}
+
+
+def symptom_request(rng):
+    text = "I have " + " and ".join(rng.sample(SYMPTOMS, rng.randrange(1, 4)))
+    return "/api/symptom-analysis", {"symptoms_input": text, "age": rng.randrange(5, 85), "duration_days": rng.randrange(0, 14)}
+
+
+def lifestyle_request(rng):
+    condition = rng.choice(CONDITIONS) if rng.random() < 0.8 else f"condition {rng.randrange(10_000)}"
+    return "/api/lifestyle-recommendations", {"health_condition": condition}
+
+
+def hospitals_request(rng):
+    return "/api/nearby-hospitals", {
+        "latitude": 12.97 + rng.uniform(-0.1, 0.1),
+        "longitude": 77.59 + rng.uniform(-0.1, 0.1),
+        "max_distance": rng.choice([5, 10]),
+    }
+
+
+def download_request(rng):
+    return "/api/download-recommendations", {"health_condition": rng.choice(CONDITIONS), "recommendations": RECOMMENDATIONS}
+
+
+ROUTES = {
+    "symptom-analysis": symptom_request,
+    "lifestyle-recommendations": lifestyle_request,
+    "nearby-hospitals": hospitals_request,
+    "download-recommendations": download_request,
+}
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, int(round(q / 100 * (len(sorted_values) - 1)))))
+    return sorted_values[index]
+
+
+def run_level(base_url, make_request, concurrency, duration):
+    latencies, errors = [], 0
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+
+    def worker(seed):
+        nonlocal errors
+        rng = random.Random(seed)
+        session = requests.Session()
+        local_latencies, local_errors = [], 0
+        while time.monotonic() < deadline:
+            path, payload = make_request(rng)
+            started = time.perf_counter()
+            try:
+                response = session.post(base_url + path, json=payload, timeout=60)
+                response.content
+                ok = response.status_code < 400
+            except requests.RequestException:
+                ok = False
+            local_latencies.append((time.perf_counter() - started) * 1000)
+            local_errors += 0 if ok else 1
+        with lock:
+            latencies.extend(local_latencies)
+            errors += local_errors
+
+    started = time.monotonic()
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.monotonic() - started
+
+    latencies.sort()
+    histogram = [0] * (len(BUCKETS_MS) + 1)
+    for value in latencies:
+        histogram[bisect.bisect_left(BUCKETS_MS, value)] += 1
+
+    return {
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "errors": errors,
+        "error_rate": round(errors / len(latencies), 4) if latencies else 0.0,
+        "throughput_rps": round(len(latencies) / elapsed, 2),
+        "p50_ms": percentile(latencies, 50),
+        "p90_ms": percentile(latencies, 90),
+        "p99_ms": percentile(latencies, 99),
+        "max_ms": latencies[-1] if latencies else None,
+        "histogram": {
+            (f"<={BUCKETS_MS[i]}ms" if i < len(BUCKETS_MS) else f">{BUCKETS_MS[-1]}ms"): count
+            for i, count in enumerate(histogram) if count
+        },
+    }
+
+
+def print_level(route, result):
+    fmt = lambda v: f"{v:8.1f}" if v is not None else "       -"
+    print(f"{route:<26} c={result['concurrency']:<4} n={result['requests']:<6} "
+          f"rps={result['throughput_rps']:<8} err={result['error_rate']:<6.2%} "
+          f"p50={fmt(result['p50_ms'])} p90={fmt(result['p90_ms'])} p99={fmt(result['p99_ms'])}")
+    total = result["requests"] or 1
+    for bucket, count in result["histogram"].items():
+        print(f"{'':<30}{bucket:>10} {'#' * max(1, round(40 * count / total)):<40} {count}")
+
+
+def start_fakes(args):
+    command = [
+        sys.executable, os.path.join(HERE, "fake_servers.py"),
+        "--overpass-ports", *(["0"] * args.mirrors),
+        "--gemini-latency", str(args.gemini_latency),
+        "--overpass-latency", str(args.overpass_latency),
+        "--error-rate", str(args.error_rate),
+        "--elements", str(args.elements),
+    ]
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+    return process, json.loads(process.stdout.readline())
+
+
+def start_app(args, endpoints):
+    env = dict(os.environ)
+    env.update({
+        "PORT": str(args.port),
+        "GEMINI_API_KEY": env.get("GEMINI_API_KEY", "load-test"),
+        "GEMINI_BASE_URL": endpoints["gemini"],
+        "OVERPASS_MIRRORS": ",".join(endpoints["overpass"]),
+    })
+    env.pop("HOSPITAL_EXTRACT_PATH", None)
+    process = subprocess.Popen([sys.executable, "app.py"], cwd=ROOT, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    base_url = f"http://127.0.0.1:{args.port}"
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("app exited during startup")
+        try:
+            requests.get(base_url + "/api/cache-stats", timeout=1)
+            return process, base_url
+        except requests.RequestException:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("app did not start within 60s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--duration", type=float, default=5.0, help="seconds per route and level")
+    parser.add_argument("--routes", nargs="+", choices=list(ROUTES), default=list(ROUTES))
+    parser.add_argument("--gemini-latency", type=float, default=0.5)
+    parser.add_argument("--overpass-latency", type=float, default=0.2)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--elements", type=int, default=500, help="hospitals per Overpass response")
+    parser.add_argument("--mirrors", type=int, default=3)
+    parser.add_argument("--port", type=int, default=5055)
+    parser.add_argument("--app-url", help="use an already running app instead of starting one")
+    parser.add_argument("--output", help="write results to this JSON file")
+    args = parser.parse_args()
+
+    processes = []
+    try:
+        if args.app_url:
+            base_url = args.app_url.rstrip("/")
+        else:
+            fakes, endpoints = start_fakes(args)
+            processes.append(fakes)
+            app_process, base_url = start_app(args, endpoints)
+            processes.append(app_process)
+
+        report = {"config": vars(args), "routes": {}}
+        for route in args.routes:
+            report["routes"][route] = []
+            for level in args.levels:
+                result = run_level(base_url, ROUTES[route], level, args.duration)
+                report["routes"][route].append(result)
+                print_level(route, result)
+
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as f:
+                json.dump(report, f, indent=2)
+            print(f"\nResults written to {args.output}")
+    finally:
+        for process in processes:
+            process.terminate()
+            process.wait(timeout=10)
+
+
+if __name__ == "__main__":
+    main()
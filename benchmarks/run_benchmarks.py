@@ -0,0 +1,174 @@
+"""
+Benchmarks for the analyzer, normalization, hospital and PDF hot paths.
+Gemini and Overpass are replaced with the deterministic fakes from
+benchmarks/fakes.py, so results only reflect local CPU work.
+
+Run from the repository root:
+    python benchmarks/run_benchmarks.py --output bench_results.json
+    python benchmarks/run_benchmarks.py --compare bench_results.json
+
+Results are written as JSON (per-call timings in microseconds) so two runs,
+e.g. from different commits, can be compared with --compare.
+"""
+import io
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import contextlib
+import platform
+import statistics
+import subprocess
+import timeit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+os.environ.setdefault("GEMINI_API_KEY", "benchmark")
+os.environ.pop("HOSPITAL_EXTRACT_PATH", None)
+
+import app as medisense
+from fakes import FakeGeminiClient, FakeOverpassClient, MESSY_RECOMMENDATIONS, make_overpass_payload
+
+FILLER = "i have been feeling really unwell since last tuesday and it got worse at night".split()
+
+
+def symptom_text(length, seed=0):
+    rng = random.Random(seed)
+    symptoms = list(medisense.get_analyzer().symptom_severity)
+    words = []
+    while len(" ".join(words)) < length:
+        words.append(rng.choice(symptoms) if rng.random() < 0.15 else rng.choice(FILLER))
+    return " ".join(words)[:length].strip()
+
+
+def measure(fn, repeat=5, min_time=0.2):
+    timer = timeit.Timer(fn)
+    number, _ = timer.autorange()
+    number = max(1, int(number * min_time / 0.2))
+    runs = [t / number for t in timer.repeat(repeat=repeat, number=number)]
+    return {
+        "median_us": round(statistics.median(runs) * 1e6, 3),
+        "min_us": round(min(runs) * 1e6, 3),
+        "loops": number,
+        "repeat": repeat,
+    }
+
+
+def build_benchmarks():
+    analyzer = medisense.get_analyzer()
+    benchmarks = {}
+
+    for length in (30, 120, 500, 2000):
+        text = symptom_text(length, seed=length)
+        benchmarks[f"analyzer.preprocess_input[chars={length}]"] = lambda text=text: analyzer.preprocess_input(text)
+
+    vocab = list(analyzer.symptom_severity)
+    for count in (1, 3, 8):
+        symptoms = vocab[:count]
+        benchmarks[f"analyzer.compute_severity_score[symptoms={count}]"] = \
+            lambda symptoms=symptoms: analyzer.compute_severity_score(symptoms, 45, 4)
+
+    rng = random.Random(1)
+    batch = [rng.sample(vocab, rng.randrange(1, 6)) for _ in range(1000)]
+    ages = [rng.choice([None, 8, 30, 70]) for _ in batch]
+    durations = [rng.choice([None, 1, 5, 30]) for _ in batch]
+    benchmarks["analyzer.compute_severity_scores[batch=1000]"] = \
+        lambda: analyzer.compute_severity_scores(batch, ages, durations)
+
+    benchmarks["clean_gemini_json"] = lambda: medisense.clean_gemini_json(MESSY_RECOMMENDATIONS)
+    raw = json.loads(medisense.clean_gemini_json(MESSY_RECOMMENDATIONS))
+    benchmarks["normalize_recommendations"] = lambda: medisense.normalize_recommendations(raw)
+
+    for count in (100, 1000, 10000):
+        fake = FakeOverpassClient(make_overpass_payload(count))
+
+        def cold(fake=fake):
+            medisense.overpass_client = fake
+            medisense.hospital_tile_cache.clear()
+            return medisense.get_hospitals_overpass(12.97, 77.59, 10)
+
+        def warm(fake=fake):
+            medisense.overpass_client = fake
+            return medisense.get_hospitals_overpass(12.97, 77.59, 10)
+
+        benchmarks[f"get_hospitals_overpass[elements={count},cold]"] = cold
+        benchmarks[f"get_hospitals_overpass[elements={count},cached]"] = warm
+
+    client = medisense.app.test_client()
+    recommendations = medisense.normalize_recommendations(raw)
+    for label, recs in (("small", recommendations), ("large", {k: recommendations for k in "abcdefgh"})):
+        payload = {"health_condition": "persistent back pain and headache", "recommendations": recs}
+        benchmarks[f"download_recommendations[{label}]"] = \
+            lambda payload=payload: client.post("/api/download-recommendations", json=payload)
+
+    symptom_payload = {"symptoms_input": "I have a high fever, dry cough and body aches", "age": 34, "duration_days": 3}
+    benchmarks["symptom_analysis[fake gemini]"] = lambda: client.post("/api/symptom-analysis", json=symptom_payload)
+
+    return benchmarks
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True).strip()
+    except Exception:
+        return None
+
+
+def compare(previous_path, results):
+    with open(previous_path, encoding="utf-8") as f:
+        previous = json.load(f)
+
+    print(f"\nComparison against {previous_path} (commit {previous['meta'].get('commit')}):")
+    print(f"{'benchmark':<55} {'before us':>11} {'after us':>11} {'change':>8}")
+    for name, result in results.items():
+        before = previous["results"].get(name)
+        if not before:
+            continue
+        change = result["median_us"] / before["median_us"] - 1 if before["median_us"] else 0.0
+        print(f"{name:<55} {before['median_us']:>11.1f} {result['median_us']:>11.1f} {change:>+7.1%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", help="write results to this JSON file")
+    parser.add_argument("--compare", help="compare against a previous results file")
+    parser.add_argument("--filter", default="", help="only run benchmarks whose name contains this text")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    medisense.client = FakeGeminiClient()
+    benchmarks = build_benchmarks()
+
+    results = {}
+    for name, fn in benchmarks.items():
+        if args.filter not in name:
+            continue
+        # The app logs with print(); keep that out of the report.
+        with contextlib.redirect_stdout(io.StringIO()):
+            results[name] = measure(fn, repeat=args.repeat)
+        print(f"{name:<55} {results[name]['median_us']:>12.1f} us")
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+        },
+        "results": results,
+    }
+
+    if args.compare:
+        compare(args.compare, results)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+Scores JSONL intake records offline, without going through the HTTP API.
+
+Each input line is a JSON object with "symptoms_input" and optionally
+"age" and "duration_days", as accepted by /api/symptom-analysis. Each
+output line is the matching result, in input order, in the same shape as
+an item of /api/symptom-analysis/batch's "results" (or {"error": ...}).
+
+    python bulk_score.py intake.jsonl -o scores.jsonl --workers 8
+    zcat intake.jsonl.gz | python bulk_score.py --ai-summary > scores.jsonl
+
+Lines are read lazily and scored in chunks on a process pool. At most
+``workers * 2`` chunks are in flight, so memory stays flat regardless of
+input size. With --ai-summary, Gemini summaries are generated in this
+process through the app's scheduler, single-flight group and summary
+cache.
+"""
+import os
+import sys
+import gzip
+import json
+import time
+import argparse
+import contextlib
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import app as medisense
+
+
+def open_text(path, mode):
+    if path in (None, "-"):
+        return sys.stdin if "r" in mode else sys.stdout
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+def read_chunks(lines, size):
+    chunk = []
+    for line in lines:
+        if not line.strip():
+            continue
+        chunk.append(line)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def init_worker():
+    # Spawned workers start with the real stdout, which may be the output file.
+    sys.stdout = sys.stderr
+    medisense.get_analyzer()
+
+
+def score_chunk(lines):
+    """(parsed, errors, results) for one chunk of raw JSONL lines, as app.analyze_batch() returns them."""
+    records, invalid = [], {}
+    for index, line in enumerate(lines):
+        try:
+            records.append(json.loads(line))
+        except ValueError as e:
+            records.append(None)
+            invalid[index] = f"Invalid JSON: {e}"
+
+    parsed, errors, results = medisense.analyze_batch(records)
+    errors.update(invalid)
+    return parsed, errors, results
+
+
+def add_summaries(parsed, results, pool):
+    summaries = [None] * len(parsed)
+    futures = {
+        i: pool.submit(medisense.generate_ai_summary, results[i], r['symptoms_input'], r['age'], r['duration_days'])
+        for i, r in enumerate(parsed) if r is not None
+    }
+    for i, future in futures.items():
+        summaries[i] = future.result()
+    return summaries
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", nargs="?", default="-", help="JSONL file (.gz allowed), or - for stdin")
+    parser.add_argument("-o", "--output", default="-", help="JSONL file (.gz allowed), or - for stdout")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--chunk-size", type=int, default=500, help="records per pool task")
+    parser.add_argument("--ai-summary", action="store_true", help="add Gemini summaries, as the batch endpoint does")
+    args = parser.parse_args()
+
+    # Build the analyzer once here so forked workers inherit it. The app
+    # logs with print(); keep that off the output stream.
+    with contextlib.redirect_stdout(sys.stderr):
+        medisense.get_analyzer()
+
+    started = time.perf_counter()
+    scored = failed = 0
+    source = open_text(args.input, "r")
+    sink = open_text(args.output, "w")
+    summary_pool = ThreadPoolExecutor(max_workers=medisense.BATCH_GEMINI_WORKERS) if args.ai_summary else None
+
+    def write(future):
+        nonlocal scored, failed
+        parsed, errors, results = future.result()
+        summaries = add_summaries(parsed, results, summary_pool) if args.ai_summary else [None] * len(parsed)
+        responses = medisense.batch_responses(parsed, errors, results, summaries, args.ai_summary)['results']
+        sink.write("".join(json.dumps(r, ensure_ascii=False) + "\n" for r in responses))
+        scored += len(responses)
+        failed += len(errors)
+
+    try:
+        with contextlib.redirect_stdout(sys.stderr), \
+                ProcessPoolExecutor(max_workers=max(1, args.workers), initializer=init_worker) as pool:
+            pending = deque()
+            for chunk in read_chunks(source, max(1, args.chunk_size)):
+                pending.append(pool.submit(score_chunk, chunk))
+                if len(pending) >= max(1, args.workers) * 2:
+                    write(pending.popleft())
+            while pending:
+                write(pending.popleft())
+    finally:
+        if summary_pool is not None:
+            summary_pool.shutdown()
+        sink.flush()
+        if sink is not sys.stdout:
+            sink.close()
+        if source is not sys.stdin:
+            source.close()
+
+    elapsed = time.perf_counter() - started
+    print(f"✅ Scored {scored} records ({failed} invalid) in {elapsed:.1f}s "
+          f"({scored / elapsed if elapsed else 0:.0f} records/s)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
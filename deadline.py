@@ -0,0 +1,75 @@
+import time
+import contextvars
+from typing import List, Optional
+
+
+class DeadlineExceeded(TimeoutError):
+    """Raised instead of starting an upstream call when the request's time budget is used up."""
+
+
+class Deadline:
+    """
+    Time budget of one request. Upstream calls take their timeouts from
+    timeout(); parts of the answer that were skipped or cut short because
+    the budget ran out are recorded with degrade(), so the route can flag
+    its response as partial.
+    """
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.expires = time.monotonic() + seconds
+        self.degraded: List[str] = []
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return time.monotonic() >= self.expires
+
+    def timeout(self, cap: Optional[float] = None) -> float:
+        """Seconds the next upstream call may take: what is left, at most ``cap``."""
+        remaining = self.remaining()
+        if remaining <= 0:
+            raise DeadlineExceeded(f"request deadline of {self.seconds:g}s exceeded")
+        return remaining if cap is None else min(remaining, cap)
+
+    def degrade(self, part: str) -> None:
+        if part not in self.degraded:
+            self.degraded.append(part)
+
+
+_current = contextvars.ContextVar("deadline", default=None)
+
+
+def start_deadline(seconds: float) -> Deadline:
+    deadline = Deadline(seconds)
+    _current.set(deadline)
+    return deadline
+
+
+def current_deadline() -> Optional[Deadline]:
+    return _current.get()
+
+
+def end_deadline() -> None:
+    _current.set(None)
+
+
+def time_left(cap: Optional[float] = None) -> Optional[float]:
+    """
+    Timeout for an upstream call made now: the current request's remaining
+    budget, at most ``cap``. Outside a request (CLI tools, background work)
+    this is just ``cap``. Raises DeadlineExceeded when nothing is left.
+    """
+    deadline = _current.get()
+    return cap if deadline is None else deadline.timeout(cap)
+
+
+def out_of_time(part: str) -> bool:
+    """True if the current request's deadline has passed, recording ``part`` as degraded."""
+    deadline = _current.get()
+    if deadline is None or not deadline.expired:
+        return False
+    deadline.degrade(part)
+    return True
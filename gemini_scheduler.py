@@ -0,0 +1,245 @@
+import time
+import heapq
+import asyncio
+import itertools
+import threading
+from contextlib import contextmanager, asynccontextmanager
+from typing import Dict, Optional
+
+from metrics import GEMINI_QUEUE_WAIT_SECONDS, GEMINI_REJECTED_TOTAL
+
+PRIORITY_SYMPTOM = 0
+PRIORITY_LIFESTYLE = 1
+PRIORITY_PDF_FILENAME = 2
+
+PRIORITY_NAMES = {
+    PRIORITY_SYMPTOM: "symptom",
+    PRIORITY_LIFESTYLE: "lifestyle",
+    PRIORITY_PDF_FILENAME: "pdf_filename",
+}
+
+
+class SchedulerBusy(RuntimeError):
+    """Raised when a Gemini call cannot be scheduled: queue full, shed, or queue deadline passed."""
+
+
+class GeminiScheduler:
+    """
+    Admission control for Gemini calls.
+
+    A call may start when it is the highest-priority waiter (lowest number,
+    then FIFO), fewer than ``max_in_flight`` calls are running and the token
+    bucket (``rate`` per second, up to ``burst``; a rate of 0 disables it)
+    has a token. At most ``max_queue`` callers wait; when the queue is full
+    a new caller displaces the newest waiter of a lower priority, or is
+    rejected straight away if there is none. A caller that waits longer
+    than its queue timeout is rejected too. Rejections raise SchedulerBusy
+    so routes can fall back.
+
+        with scheduler.slot(PRIORITY_SYMPTOM):
+            client.models.generate_content(...)
+    """
+
+    def __init__(self, rate: float = 10.0, burst: int = 20, max_in_flight: int = 8,
+                 max_queue: int = 100, queue_timeout: float = 5.0):
+        # Every call waits in the queue, if only briefly, so it needs a place.
+        if max_queue < 1:
+            raise ValueError(f"max_queue must be at least 1, got {max_queue}")
+        self.rate = rate
+        self.burst = burst
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.tokens = float(burst)
+        self.in_flight = 0
+        self.admitted = 0
+        self.rejected = 0
+        self._refilled_at = time.monotonic()
+        self._queue = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+
+    def _refill(self, now: float) -> None:
+        if self.rate > 0:
+            self.tokens = min(self.burst, self.tokens + (now - self._refilled_at) * self.rate)
+        self._refilled_at = now
+
+    def _has_token(self) -> bool:
+        return self.rate <= 0 or self.tokens >= 1
+
+    def _reject(self, priority: int, reason: str) -> SchedulerBusy:
+        self.rejected += 1
+        GEMINI_REJECTED_TOTAL.inc(priority=PRIORITY_NAMES.get(priority, priority), reason=reason)
+        return SchedulerBusy(f"Gemini scheduler rejected call: {reason}")
+
+    def _make_room(self, priority: int) -> bool:
+        worst = max(self._queue)
+        if worst[0] <= priority:
+            return False
+        worst[2] = "shed"
+        self._queue.remove(worst)
+        heapq.heapify(self._queue)
+        self._wake(worst)
+        return True
+
+    def _wake(self, waiter) -> None:
+        self._cond.notify_all()
+
+    def acquire(self, priority: int, timeout: Optional[float] = None) -> None:
+        started = time.monotonic()
+        deadline = started + (self.queue_timeout if timeout is None else timeout)
+        label = PRIORITY_NAMES.get(priority, priority)
+
+        with self._cond:
+            if len(self._queue) >= self.max_queue and not self._make_room(priority):
+                raise self._reject(priority, "queue_full")
+
+            waiter = [priority, next(self._seq), None]
+            heapq.heappush(self._queue, waiter)
+
+            while True:
+                if waiter[2] == "shed":
+                    raise self._reject(priority, "shed")
+
+                now = time.monotonic()
+                self._refill(now)
+                if self._queue[0] is waiter and self.in_flight < self.max_in_flight and self._has_token():
+                    heapq.heappop(self._queue)
+                    if self.rate > 0:
+                        self.tokens -= 1
+                    self.in_flight += 1
+                    self.admitted += 1
+                    # The next waiter may be able to start as well.
+                    self._cond.notify_all()
+                    GEMINI_QUEUE_WAIT_SECONDS.observe(now - started, priority=label)
+                    return
+
+                remaining = deadline - now
+                if remaining <= 0:
+                    self._queue.remove(waiter)
+                    heapq.heapify(self._queue)
+                    self._cond.notify_all()
+                    raise self._reject(priority, "queue_timeout")
+
+                wait = remaining
+                if self._queue[0] is waiter and self.in_flight < self.max_in_flight and self.rate > 0:
+                    wait = min(wait, (1 - self.tokens) / self.rate)
+                self._cond.wait(wait)
+
+    def release(self) -> None:
+        with self._cond:
+            self.in_flight -= 1
+            self._cond.notify_all()
+
+    @contextmanager
+    def slot(self, priority: int, timeout: Optional[float] = None):
+        self.acquire(priority, timeout)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def stats(self) -> Dict:
+        with self._cond:
+            self._refill(time.monotonic())
+            queued = {name: 0 for name in PRIORITY_NAMES.values()}
+            for waiter in self._queue:
+                name = PRIORITY_NAMES.get(waiter[0], str(waiter[0]))
+                queued[name] = queued.get(name, 0) + 1
+            return {
+                "in_flight": self.in_flight,
+                "max_in_flight": self.max_in_flight,
+                "queued": queued,
+                "queue_depth": len(self._queue),
+                "max_queue": self.max_queue,
+                "tokens": round(self.tokens, 2),
+                "rate": self.rate,
+                "admitted": self.admitted,
+                "rejected": self.rejected,
+            }
+
+
+class AsyncGeminiScheduler(GeminiScheduler):
+    """
+    GeminiScheduler for asyncio: same admission rules, but waiters await a
+    future instead of blocking a thread. All methods must be called from
+    the event loop that owns the scheduler.
+
+        async with scheduler.slot(PRIORITY_SYMPTOM):
+            await client.aio.models.generate_content(...)
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._refill_timer = None
+
+    def _wake(self, waiter) -> None:
+        if not waiter[3].done():
+            waiter[3].set_result(None)
+
+    def _dispatch(self) -> None:
+        now = time.monotonic()
+        self._refill(now)
+        while self._queue and self.in_flight < self.max_in_flight and self._has_token():
+            waiter = heapq.heappop(self._queue)
+            waiter[2] = "admitted"
+            if self.rate > 0:
+                self.tokens -= 1
+            self.in_flight += 1
+            self.admitted += 1
+            GEMINI_QUEUE_WAIT_SECONDS.observe(now - waiter[4], priority=PRIORITY_NAMES.get(waiter[0], waiter[0]))
+            self._wake(waiter)
+
+        if self._queue and self.in_flight < self.max_in_flight and self.rate > 0 and self._refill_timer is None:
+            # Only the token bucket is holding the head back; retry once it refills.
+            self._refill_timer = asyncio.get_running_loop().call_later((1 - self.tokens) / self.rate, self._on_refill)
+
+    def _on_refill(self) -> None:
+        self._refill_timer = None
+        with self._cond:
+            self._dispatch()
+
+    async def acquire(self, priority: int, timeout: Optional[float] = None) -> None:
+        timeout = self.queue_timeout if timeout is None else timeout
+
+        with self._cond:
+            if len(self._queue) >= self.max_queue and not self._make_room(priority):
+                raise self._reject(priority, "queue_full")
+            waiter = [priority, next(self._seq), None, asyncio.get_running_loop().create_future(), time.monotonic()]
+            heapq.heappush(self._queue, waiter)
+            self._dispatch()
+
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter[3]), timeout)
+        except asyncio.TimeoutError:
+            if waiter[2] is None:
+                with self._cond:
+                    self._queue.remove(waiter)
+                    heapq.heapify(self._queue)
+                    self._dispatch()
+                raise self._reject(priority, "queue_timeout")
+        except asyncio.CancelledError:
+            with self._cond:
+                if waiter[2] == "admitted":
+                    self.in_flight -= 1
+                elif waiter[2] is None:
+                    self._queue.remove(waiter)
+                    heapq.heapify(self._queue)
+                self._dispatch()
+            raise
+
+        if waiter[2] == "shed":
+            raise self._reject(priority, "shed")
+
+    async def release(self) -> None:
+        with self._cond:
+            self.in_flight -= 1
+            self._dispatch()
+
+    @asynccontextmanager
+    async def slot(self, priority: int, timeout: Optional[float] = None):
+        await self.acquire(priority, timeout)
+        try:
+            yield
+        finally:
+            await self.release()
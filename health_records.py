@@ -0,0 +1,288 @@
+import os
+import json
+import base64
+import itertools
+import threading
+from bisect import bisect_left, bisect_right, insort
+from collections import defaultdict
+from datetime import date, datetime, time, timezone
+from typing import Dict, List, Optional, Tuple
+
+EPOCH = datetime(1970, 1, 1)
+DATE_FILTERS = ("all", "today", "upcoming", "past")
+
+
+class InvalidCursor(ValueError):
+    """Raised for a pagination cursor that was not produced by search()."""
+
+
+def slot_timestamp(record: dict) -> Optional[float]:
+    """Seconds since the epoch of ``record["slot"]["date"]``, or None if it is missing or unparseable."""
+    value = (record.get("slot") or {}).get("date")
+    if not isinstance(value, str):
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.strip())
+    except ValueError:
+        return None
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return (parsed - EPOCH).total_seconds()
+
+
+def day_start(day: date) -> float:
+    return (datetime.combine(day, time()) - EPOCH).total_seconds()
+
+
+def search_fields(record: dict) -> Tuple[str, ...]:
+    """The lower-cased fields a search term is matched against, as in filterHealthRecords.js."""
+    hospital = record.get("hospital") or {}
+    values = (hospital.get("name"), hospital.get("specialization"), record.get("confirmationNumber"), record.get("symptoms"))
+    return tuple(v.lower() for v in values if isinstance(v, str) and v)
+
+
+def trigrams(text: str) -> set:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def encode_cursor(key: tuple) -> str:
+    return base64.urlsafe_b64encode(json.dumps(key, separators=(",", ":")).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple:
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        missing, neg_ts, seq = key
+        return int(missing), float(neg_ts), int(seq)
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor(f"Invalid cursor: {cursor!r}") from e
+
+
+class HealthRecordIndex:
+    """
+    Search index over one user's health records, with the filter semantics
+    of src/utils/filterHealthRecords.js: a case-insensitive substring term
+    over hospital name, specialization, confirmation number and symptoms;
+    an exact status; a today/upcoming/past window on ``slot.date``; newest
+    slot first, ties in insertion order.
+
+    Every searchable field is indexed by character trigrams, so a term of
+    three or more characters is checked only against records containing
+    all its trigrams. Records are also kept in a list sorted by slot date,
+    updated with bisect on every insert, so date windows and cursors are
+    ranges of that list. Records without a parseable date sort last and
+    match no date window.
+    """
+
+    def __init__(self):
+        self._records: Dict[str, dict] = {}
+        self._fields: Dict[str, Tuple[str, ...]] = {}
+        self._keys: List[tuple] = []
+        self._key_of: Dict[str, tuple] = {}
+        self._id_of: Dict[tuple, str] = {}
+        self._grams = defaultdict(set)
+        self._status = defaultdict(set)
+        self._seq = itertools.count()
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def get(self, record_id: str) -> Optional[dict]:
+        return self._records.get(record_id)
+
+    def upsert(self, record: dict) -> None:
+        """Insert ``record`` or replace the one with the same id, keeping its position among equal dates."""
+        record_id = str(record["id"])
+        with self._lock:
+            old_key = self._key_of.get(record_id)
+            seq = old_key[2] if old_key else next(self._seq)
+            if old_key:
+                self._remove(record_id)
+
+            timestamp = slot_timestamp(record)
+            key = (1, 0.0, seq) if timestamp is None else (0, -timestamp, seq)
+            fields = search_fields(record)
+
+            self._records[record_id] = record
+            self._fields[record_id] = fields
+            insort(self._keys, key)
+            self._key_of[record_id] = key
+            self._id_of[key] = record_id
+            for gram in set().union(*map(trigrams, fields)):
+                self._grams[gram].add(record_id)
+            self._status[record.get("status")].add(record_id)
+
+    def delete(self, record_id: str) -> bool:
+        with self._lock:
+            if record_id not in self._records:
+                return False
+            self._remove(record_id)
+            return True
+
+    def _remove(self, record_id: str) -> None:
+        record = self._records.pop(record_id)
+        fields = self._fields.pop(record_id)
+        key = self._key_of.pop(record_id)
+        del self._keys[bisect_left(self._keys, key)]
+        del self._id_of[key]
+        for gram in set().union(*map(trigrams, fields)):
+            ids = self._grams[gram]
+            ids.discard(record_id)
+            if not ids:
+                del self._grams[gram]
+        status = record.get("status")
+        self._status[status].discard(record_id)
+        if not self._status[status]:
+            del self._status[status]
+
+    def _date_range(self, date_filter: str, today: date) -> Tuple[int, int]:
+        start = day_start(today)
+        # Valid keys are (0, -timestamp, seq), so "at or after t" is a prefix.
+        upcoming_end = bisect_right(self._keys, (0, -start, float("inf")))
+        if date_filter == "upcoming":
+            return 0, upcoming_end
+        if date_filter == "past":
+            return upcoming_end, bisect_left(self._keys, (1,))
+        if date_filter == "today":
+            return bisect_right(self._keys, (0, -(start + 86400), float("inf"))), upcoming_end
+        return 0, len(self._keys)
+
+    def _candidates(self, term: str, status: str) -> Optional[set]:
+        """Ids that can match, or None if every record in the date range can."""
+        sets = []
+        if status != "all":
+            sets.append(self._status.get(status, set()))
+        if len(term) >= 3:
+            sets.extend(self._grams.get(gram, set()) for gram in trigrams(term))
+        if not sets:
+            return None
+        sets.sort(key=len)
+        return sets[0].intersection(*sets[1:])
+
+    def search(self, term: str = "", status: str = "all", date_filter: str = "all",
+               today: Optional[date] = None, cursor: Optional[str] = None, limit: int = 20) -> Tuple[List[dict], Optional[str]]:
+        """One page of matching records, newest slot first, and the cursor for the next page (None on the last)."""
+        term = (term or "").strip().lower()
+        with self._lock:
+            lo, hi = self._date_range(date_filter, today or date.today())
+            if cursor:
+                lo = max(lo, bisect_right(self._keys, decode_cursor(cursor)))
+            candidates = self._candidates(term, status or "all")
+
+            # Sorting the candidates costs about their count; walking the date
+            # range until a page is full costs about limit * range / count.
+            if candidates is not None and len(candidates) ** 2 < (limit + 1) * (hi - lo):
+                lo_key = self._keys[lo] if lo < len(self._keys) else None
+                hi_key = self._keys[hi] if hi < len(self._keys) else None
+                keys = sorted(
+                    k for k in map(self._key_of.get, candidates)
+                    if lo_key is not None and k >= lo_key and (hi_key is None or k < hi_key)
+                )
+            else:
+                keys = (self._keys[i] for i in range(lo, hi))
+                if candidates is not None:
+                    keys = (k for k in keys if self._id_of[k] in candidates)
+
+            page = []
+            for key in keys:
+                record_id = self._id_of[key]
+                if term and not any(term in field for field in self._fields[record_id]):
+                    continue
+                if len(page) == limit:
+                    return [self._records[self._id_of[k]] for k in page], encode_cursor(page[-1])
+                page.append(key)
+
+            return [self._records[self._id_of[k]] for k in page], None
+
+
+class HealthRecordStore:
+    """
+    Per-user HealthRecordIndex instances, optionally persisted to an
+    append-only JSONL log at ``path``. Every change is appended to the log
+    and applied by replaying it, and each process replays new log lines
+    before a search, so several workers sharing the file see the same
+    records. Without a path, records live only in this process.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self._indexes: Dict[str, HealthRecordIndex] = {}
+        self._offset = 0
+        self._lock = threading.Lock()
+        if path:
+            self.sync()
+
+    def index(self, user: str) -> HealthRecordIndex:
+        """``user``'s index; an empty one, not kept, for a user without records."""
+        self.sync()
+        index = self._indexes.get(user or "")
+        return HealthRecordIndex() if index is None else index
+
+    def _apply(self, op: dict) -> None:
+        user = op.get("user") or ""
+        if op["op"] == "upsert":
+            self._indexes.setdefault(user, HealthRecordIndex()).upsert(op["record"])
+        elif op["op"] == "delete":
+            index = self._indexes.get(user)
+            if index is not None and index.delete(op["id"]) and not len(index):
+                del self._indexes[user]
+
+    def _write(self, ops: List[dict]) -> None:
+        if not self.path:
+            with self._lock:
+                for op in ops:
+                    self._apply(op)
+            return
+
+        data = "".join(json.dumps(op, ensure_ascii=False, separators=(",", ":")) + "\n" for op in ops).encode("utf-8")
+        # One O_APPEND write per batch, so concurrent writers never interleave lines.
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, data)
+        finally:
+            os.close(fd)
+        self.sync()
+
+    def sync(self) -> int:
+        """Apply log lines written since the last call, by any process. Returns how many were applied."""
+        if not self.path:
+            return 0
+        with self._lock:
+            try:
+                size = os.path.getsize(self.path)
+            except FileNotFoundError:
+                size = 0
+            if size < self._offset:
+                # The log was truncated or replaced; rebuild from scratch.
+                self._indexes.clear()
+                self._offset = 0
+            if size == self._offset:
+                return 0
+
+            with open(self.path, "rb") as f:
+                f.seek(self._offset)
+                chunk = f.read(size - self._offset)
+            complete = chunk[:chunk.rfind(b"\n") + 1]
+
+            applied = 0
+            for line in complete.splitlines():
+                try:
+                    self._apply(json.loads(line))
+                    applied += 1
+                except (ValueError, KeyError, TypeError) as e:
+                    print(f"⚠️ Skipping bad health-record log line: {e}")
+            self._offset += len(complete)
+            return applied
+
+    def upsert(self, user: str, records: List[dict]) -> None:
+        self._write([{"op": "upsert", "user": user or "", "record": record} for record in records])
+
+    def delete(self, user: str, record_id: str) -> bool:
+        if self.index(user).get(record_id) is None:
+            return False
+        self._write([{"op": "delete", "user": user or "", "id": record_id}])
+        return True
+
+    def search(self, user: str, **filters) -> Tuple[List[dict], Optional[str]]:
+        return self.index(user).search(**filters)
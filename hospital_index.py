@@ -0,0 +1,230 @@
+import os
+import json
+import math
+import time
+import threading
+import numpy as np
+from typing import List, Dict, Optional, Tuple
+
+EARTH_RADIUS_KM = 6371
+
+
+def hospital_from_element(element: dict) -> Optional[Dict]:
+    """
+    Convert an Overpass/OSM element into the hospital dict returned by the API
+    (without distance). Returns None when the element has no usable position.
+    """
+    tags = element.get("tags", {})
+    name = tags.get("name", "Hospital")
+    hospital_lat = element.get("lat") if element.get("type") == "node" else element.get("center", {}).get("lat")
+    hospital_lng = element.get("lon") if element.get("type") == "node" else element.get("center", {}).get("lon")
+    if not hospital_lat or not hospital_lng:
+        return None
+
+    phone = (
+        tags.get("phone")
+        or tags.get("contact:phone")
+        or tags.get("mobile")
+        or tags.get("contact:mobile")
+        or tags.get("telephone")
+        or tags.get("contact:telephone")
+        or tags.get("fax")
+        or "N/A"
+    )
+
+    return {
+        "id": element["id"],
+        "name": name,
+        "lat": hospital_lat,
+        "lng": hospital_lng,
+        "phone": phone.strip() if isinstance(phone, str) else "N/A",
+    }
+
+
+def to_unit_vectors(lat, lng) -> np.ndarray:
+    lat = np.radians(np.asarray(lat, dtype=float))
+    lng = np.radians(np.asarray(lng, dtype=float))
+    cos_lat = np.cos(lat)
+    return np.stack([cos_lat * np.cos(lng), cos_lat * np.sin(lng), np.sin(lat)], axis=-1)
+
+
+def haversine_km(lat1, lng1, lat2, lng2) -> np.ndarray:
+    """Vectorized version of app.calculate_distance."""
+    lat1, lng1 = np.radians(lat1), np.radians(lng1)
+    lat2, lng2 = np.radians(np.asarray(lat2, dtype=float)), np.radians(np.asarray(lng2, dtype=float))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    return EARTH_RADIUS_KM * 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+
+
+def parse_elements(elements: List[dict]) -> Tuple[List[Dict], np.ndarray, np.ndarray]:
+    """
+    Parse Overpass elements into hospitals plus coordinate arrays, dropping
+    duplicate OSM objects (same type and id) and elements without a position.
+    """
+    hospitals, seen = [], set()
+    for element in elements:
+        key = (element.get("type"), element.get("id"))
+        if key in seen:
+            continue
+        seen.add(key)
+        hospital = hospital_from_element(element)
+        if hospital:
+            hospitals.append(hospital)
+
+    return tile_from_hospitals(hospitals)
+
+
+def tile_from_hospitals(hospitals: List[Dict]) -> Tuple[List[Dict], np.ndarray, np.ndarray]:
+    """Pair already-parsed hospitals with their coordinate arrays."""
+    lat = np.array([h["lat"] for h in hospitals], dtype=float)
+    lng = np.array([h["lng"] for h in hospitals], dtype=float)
+    return hospitals, lat, lng
+
+
+def select_nearest(hospitals: List[Dict], lats: np.ndarray, lngs: np.ndarray, lat: float, lng: float,
+                   radius_km: float, k: Optional[int] = None, ids: Optional[np.ndarray] = None) -> List[Dict]:
+    """
+    The ``k`` hospitals closest to (lat, lng) within ``radius_km``, nearest
+    first, with their distance attached. ``ids`` restricts the search to a
+    subset of positions.
+    """
+    if ids is None:
+        ids = np.arange(len(hospitals))
+    if ids.size == 0:
+        return []
+
+    distances = haversine_km(lat, lng, lats[ids], lngs[ids])
+    keep = distances <= radius_km
+    ids, distances = ids[keep], distances[keep]
+
+    if k is not None and k < ids.size:
+        top = np.argpartition(distances, k)[:k]
+        ids, distances = ids[top], distances[top]
+    order = np.argsort(distances, kind="stable")
+
+    return [
+        {**hospitals[i], "distance": round(d, 2)}
+        for i, d in zip(ids[order].tolist(), distances[order].tolist())
+    ]
+
+
+class _Snapshot:
+    """Immutable index state, swapped as a whole on reload."""
+
+    def __init__(self, elements: List[dict], bbox, cell_km: float):
+        self.hospitals, self.lat, self.lng = parse_elements(elements)
+        self.bbox = bbox
+        self.cell = cell_km / EARTH_RADIUS_KM
+        self.xyz = to_unit_vectors(self.lat, self.lng).reshape(-1, 3)
+
+        self.cells = {}
+        keys = np.floor(self.xyz / self.cell).astype(np.int64)
+        for i, key in enumerate(map(tuple, keys.tolist())):
+            self.cells.setdefault(key, []).append(i)
+        self.cells = {key: np.array(ids) for key, ids in self.cells.items()}
+
+
+class HospitalIndex:
+    """
+    In-memory spatial index over a local OSM hospital extract.
+
+    The extract uses the Overpass JSON format ({"elements": [...]}, e.g. saved
+    output of an ``out center tags`` query) and may carry an optional
+    ``"bbox": [min_lat, min_lng, max_lat, max_lng]`` describing the area it
+    covers; otherwise coverage is the bounding box of its hospitals.
+    Points are stored as unit-sphere vectors bucketed into a uniform grid, so
+    a radius query only looks at the cells around the query point.
+    """
+
+    def __init__(self, path: str, cell_km: float = 10):
+        self.path = path
+        self.cell_km = cell_km
+        self._mtime = None
+        self._snapshot = None
+        self._lock = threading.Lock()
+        self.reload()
+
+    def reload(self) -> bool:
+        """Load the extract from disk. Returns False if it was unchanged."""
+        with self._lock:
+            mtime = os.path.getmtime(self.path)
+            if mtime == self._mtime:
+                return False
+
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+
+            snapshot = _Snapshot(data.get("elements", []), data.get("bbox"), self.cell_km)
+            if not snapshot.bbox and snapshot.hospitals:
+                snapshot.bbox = [float(snapshot.lat.min()), float(snapshot.lng.min()),
+                                 float(snapshot.lat.max()), float(snapshot.lng.max())]
+
+            self._snapshot = snapshot
+            self._mtime = mtime
+            print(f"🏥 Loaded {len(snapshot.hospitals)} hospitals from {self.path}")
+            return True
+
+    def start_auto_reload(self, interval: float) -> threading.Thread:
+        """Poll the extract every ``interval`` seconds and reload it when it changes."""
+        def loop():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.reload()
+                except Exception as e:
+                    print(f"⚠️ Hospital extract reload failed: {e}")
+
+        thread = threading.Thread(target=loop, name="hospital-index-reload", daemon=True)
+        thread.start()
+        return thread
+
+    def __len__(self) -> int:
+        return len(self._snapshot.hospitals)
+
+    def covers(self, lat: float, lng: float) -> bool:
+        bbox = self._snapshot.bbox
+        if not bbox:
+            return False
+        min_lat, min_lng, max_lat, max_lng = bbox
+        return min_lat <= lat <= max_lat and min_lng <= lng <= max_lng
+
+    def _candidates(self, snap: _Snapshot, center: np.ndarray, reach: int) -> np.ndarray:
+        cx, cy, cz = np.floor(center / snap.cell).astype(np.int64).tolist()
+        found = [
+            snap.cells[key]
+            for key in (
+                (x, y, z)
+                for x in range(cx - reach, cx + reach + 1)
+                for y in range(cy - reach, cy + reach + 1)
+                for z in range(cz - reach, cz + reach + 1)
+            )
+            if key in snap.cells
+        ]
+        return np.concatenate(found) if found else np.empty(0, dtype=np.int64)
+
+    def query(self, lat: float, lng: float, radius_km: float, k: Optional[int] = None) -> List[Dict]:
+        """Hospitals within ``radius_km``, nearest first, at most ``k`` of them."""
+        snap = self._snapshot
+        if not snap.hospitals:
+            return []
+
+        center = to_unit_vectors(lat, lng)
+        angle = min(radius_km / EARTH_RADIUS_KM, math.pi)
+        chord = 2 * math.sin(angle / 2)
+
+        reach = math.ceil(chord / snap.cell)
+        if (2 * reach + 1) ** 3 >= len(snap.cells):
+            ids = np.arange(len(snap.hospitals))
+        else:
+            ids = self._candidates(snap, center, reach)
+
+        return select_nearest(snap.hospitals, snap.lat, snap.lng, lat, lng, radius_km, k, ids)
+
+    def nearest(self, lat: float, lng: float, k: int = 15) -> List[Dict]:
+        """The ``k`` nearest hospitals regardless of distance."""
+        radius = self.cell_km
+        while True:
+            results = self.query(lat, lng, radius, k)
+            if len(results) >= min(k, len(self)) or radius >= math.pi * EARTH_RADIUS_KM:
+                return results
+            radius *= 4
@@ -0,0 +1,196 @@
+import time
+import bisect
+import threading
+import contextvars
+from typing import Callable, Iterable, List, Optional, Tuple
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+INF_LABEL = 'le="+Inf"'
+
+_request_timings = contextvars.ContextVar("request_timings", default=None)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = tuple(str(labels.get(n, "")) for n in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+class CollectedCounter(Counter):
+    """
+    A counter whose running totals are kept elsewhere (e.g. a cache's hit
+    count) and copied in by a collector before each scrape.
+    """
+
+    def set_total(self, value: float, **labels) -> None:
+        key = tuple(str(labels.get(n, "")) for n in self.labelnames)
+        with self._lock:
+            self._values[key] = value
+
+
+class Gauge(Counter):
+    def set(self, value: float, **labels) -> None:
+        key = tuple(str(labels.get(n, "")) for n in self.labelnames)
+        with self._lock:
+            self._values[key] = value
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        lines[1] = f"# TYPE {self.name} gauge"
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                 buckets: Iterable[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels) -> None:
+        key = tuple(str(labels.get(n, "")) for n in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            snapshot = sorted((key, list(counts), total, count) for key, (counts, total, count) in self._series.items())
+        for key, counts, total, count in snapshot:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, INF_LABEL)} {count}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {repr(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector: Callable[[], None]) -> None:
+        """``collector`` runs before every scrape, e.g. to refresh gauges."""
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        for collector in self._collectors:
+            collector()
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    "medisense_stage_seconds", "Time spent in each stage of request handling.", ["stage"]))
+REQUEST_SECONDS = REGISTRY.register(Histogram(
+    "medisense_request_seconds", "End-to-end request latency.", ["route", "method"]))
+REQUESTS_TOTAL = REGISTRY.register(Counter(
+    "medisense_requests_total", "Requests handled, by route and status.", ["route", "method", "status"]))
+OVERPASS_REQUEST_SECONDS = REGISTRY.register(Histogram(
+    "medisense_overpass_request_seconds", "Latency of individual Overpass mirror attempts.", ["mirror", "outcome"]))
+GEMINI_REQUESTS_TOTAL = REGISTRY.register(Counter(
+    "medisense_gemini_requests_total", "Gemini calls, by call site and outcome.", ["call", "outcome"]))
+GEMINI_QUEUE_WAIT_SECONDS = REGISTRY.register(Histogram(
+    "medisense_gemini_queue_wait_seconds", "Time Gemini calls waited for the scheduler.", ["priority"]))
+GEMINI_REJECTED_TOTAL = REGISTRY.register(Counter(
+    "medisense_gemini_rejected_total", "Gemini calls rejected by the scheduler.", ["priority", "reason"]))
+
+
+class stage:
+    """
+    Times a block of code into STAGE_SECONDS and, while a request is being
+    tracked, into that request's Server-Timing entries.
+
+        with stage("fuzzy_matching"):
+            ...
+    """
+
+    __slots__ = ("name", "started")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.started
+        STAGE_SECONDS.observe(elapsed, stage=self.name)
+        timings = _request_timings.get()
+        if timings is not None:
+            timings.append((self.name, elapsed))
+        return False
+
+
+def start_request_timings() -> List[Tuple[str, float]]:
+    timings = []
+    _request_timings.set(timings)
+    return timings
+
+
+def request_timings() -> Optional[List[Tuple[str, float]]]:
+    return _request_timings.get()
+
+
+def end_request_timings() -> None:
+    _request_timings.set(None)
+
+
+def server_timing_header(timings: List[Tuple[str, float]], total: Optional[float] = None) -> str:
+    entries = [f"{name};dur={elapsed * 1000:.2f}" for name, elapsed in timings]
+    if total is not None:
+        entries.append(f"total;dur={total * 1000:.2f}")
+    return ", ".join(entries)
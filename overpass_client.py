@@ -0,0 +1,262 @@
+import math
+import time
+import asyncio
+import threading
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FuturesTimeout
+from typing import List, Dict, Optional
+
+from metrics import OVERPASS_REQUEST_SECONDS
+
+
+class MirrorStats:
+    """Rolling latency and error score for one Overpass mirror."""
+
+    def __init__(self, url: str, alpha: float, recovery_seconds: float):
+        self.url = url
+        self.alpha = alpha
+        self.recovery_seconds = recovery_seconds
+        self.latency = None
+        self.error_rate = 0.0
+        self.requests = 0
+        self.failures = 0
+        self.last_failure = None
+
+    def record(self, latency: float, ok: bool) -> None:
+        self.requests += 1
+        self.latency = latency if self.latency is None else self.alpha * latency + (1 - self.alpha) * self.latency
+        self.error_rate = self.alpha * (0.0 if ok else 1.0) + (1 - self.alpha) * self.error_rate
+        if not ok:
+            self.failures += 1
+            self.last_failure = time.monotonic()
+
+    def score(self, default_latency: float, failure_cost: float) -> float:
+        """Expected seconds until a usable answer from this mirror; lower is better."""
+        latency = self.latency if self.latency is not None else default_latency
+        error_rate = self.error_rate
+        if self.last_failure is not None:
+            # Let demoted mirrors drift back up so they get retried eventually.
+            error_rate *= math.exp(-(time.monotonic() - self.last_failure) / self.recovery_seconds)
+        return latency + error_rate * failure_cost
+
+    def to_dict(self, default_latency: float, failure_cost: float) -> Dict:
+        return {
+            "url": self.url,
+            "latency_ms": round(self.latency * 1000, 1) if self.latency is not None else None,
+            "error_rate": round(self.error_rate, 3),
+            "requests": self.requests,
+            "failures": self.failures,
+            "score": round(self.score(default_latency, failure_cost), 4),
+        }
+
+
+class _MirrorRanking:
+    """Mirror list, per-mirror stats and ranking shared by the sync and async clients."""
+
+    def __init__(self, mirrors: List[str], hedge: int = 2, timeout: float = 10,
+                 alpha: float = 0.3, recovery_seconds: float = 300):
+        self.mirrors = list(mirrors)
+        self.hedge = max(1, hedge)
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._stats = {url: MirrorStats(url, alpha, recovery_seconds) for url in self.mirrors}
+
+    def ranked_mirrors(self) -> List[str]:
+        # Unmeasured mirrors sit at half the timeout, so they rank behind
+        # known-fast mirrors but ahead of known-slow ones; ties keep config order.
+        # A failure costs a full timeout.
+        with self._lock:
+            return sorted(self.mirrors, key=lambda url: self._stats[url].score(self.timeout / 2, self.timeout))
+
+    def stats(self) -> List[Dict]:
+        with self._lock:
+            return [self._stats[url].to_dict(self.timeout / 2, self.timeout) for url in self.mirrors]
+
+    def _budget(self, deadline: Optional[float]) -> Optional[float]:
+        """Seconds left before ``deadline`` (a time.monotonic() value), or None without one."""
+        return None if deadline is None else deadline - time.monotonic()
+
+    def _record(self, url: str, elapsed: float, ok: bool) -> None:
+        OVERPASS_REQUEST_SECONDS.observe(elapsed, mirror=url, outcome="ok" if ok else "error")
+        with self._lock:
+            self._stats[url].record(elapsed, ok=ok)
+
+    @staticmethod
+    def _check(data) -> dict:
+        # An empty answer is a healthy mirror with nothing nearby, so it
+        # only fails the shape check here; query() decides to look further.
+        if not isinstance(data, dict) or not isinstance(data.get("elements"), list):
+            raise ValueError("malformed Overpass response")
+        return data
+
+
+class OverpassClient(_MirrorRanking):
+    """
+    Races an Overpass query against the best ``hedge`` mirrors at once and
+    returns the first response that contains elements. Mirrors are ranked by
+    their rolling latency and error rate, so slow or failing ones drop down
+    the list; an empty answer counts as a success for the ranking. If no
+    mirror of the first group has elements, the next group is tried, and
+    if none has any, the empty answer is returned. Each attempt is limited
+    to ``timeout`` seconds, and query(timeout=...) bounds the whole call.
+    Each mirror keeps a pooled keep-alive session.
+    """
+
+    def __init__(self, mirrors: List[str], hedge: int = 2, timeout: float = 10,
+                 alpha: float = 0.3, recovery_seconds: float = 300, pool_size: int = 4):
+        super().__init__(mirrors, hedge, timeout, alpha, recovery_seconds)
+        self._sessions = {}
+        for url in self.mirrors:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            self._sessions[url] = session
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(len(self.mirrors), 1) * pool_size,
+            thread_name_prefix="overpass",
+        )
+
+    def _fetch(self, url: str, query: str, timeout: float) -> dict:
+        started = time.monotonic()
+        try:
+            response = self._sessions[url].post(url, data={"data": query}, timeout=timeout)
+            response.raise_for_status()
+            data = self._check(response.json())
+        except Exception:
+            self._record(url, time.monotonic() - started, ok=False)
+            raise
+
+        self._record(url, time.monotonic() - started, ok=True)
+        return data
+
+    def query(self, query: str, timeout: Optional[float] = None) -> Optional[dict]:
+        """
+        Run ``query`` and return the first non-empty Overpass response, an
+        empty one if that is all the mirrors had, or None if every mirror
+        failed or ``timeout`` seconds ran out first.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        ranked = self.ranked_mirrors()
+        empty = None
+        for start in range(0, len(ranked), self.hedge):
+            budget = self._budget(deadline)
+            if budget is not None and budget <= 0:
+                break
+            group = ranked[start:start + self.hedge]
+            print(f"🔍 Racing Overpass endpoints: {', '.join(group)}")
+            attempt_timeout = self.timeout if budget is None else min(self.timeout, budget)
+            futures = {self._executor.submit(self._fetch, url, query, attempt_timeout): url for url in group}
+            try:
+                for future in as_completed(futures, timeout=budget):
+                    url = futures[future]
+                    try:
+                        data = future.result()
+                    except Exception as e:
+                        print(f"⚠️ Overpass mirror {url} failed: {e}")
+                        continue
+                    if not data["elements"]:
+                        print(f"⚠️ Overpass mirror {url} returned no elements")
+                        empty = data
+                        continue
+                    return data
+            except FuturesTimeout:
+                break
+
+        if empty is None and deadline is not None and self._budget(deadline) <= 0:
+            print(f"⏱️ Overpass query gave up after {timeout:.1f}s")
+        return empty
+
+
+class AsyncOverpassClient(_MirrorRanking):
+    """
+    asyncio version of OverpassClient with the same ranking and hedging,
+    over one pooled httpx.AsyncClient. Requests that lose a race keep
+    running in the background so their latency still counts towards the
+    mirror's score, as in the threaded client.
+    """
+
+    def __init__(self, mirrors: List[str], hedge: int = 2, timeout: float = 10,
+                 alpha: float = 0.3, recovery_seconds: float = 300, pool_size: int = 4):
+        super().__init__(mirrors, hedge, timeout, alpha, recovery_seconds)
+        self.pool_size = pool_size
+        self._client = None
+        self._stragglers = set()
+
+    def _http(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=max(len(self.mirrors), 1) * self.pool_size),
+            )
+        return self._client
+
+    async def _fetch(self, url: str, query: str, timeout: float) -> dict:
+        started = time.monotonic()
+        try:
+            response = await self._http().post(url, data={"data": query}, timeout=timeout)
+            response.raise_for_status()
+            data = self._check(response.json())
+        except Exception:
+            self._record(url, time.monotonic() - started, ok=False)
+            raise
+
+        self._record(url, time.monotonic() - started, ok=True)
+        return data
+
+    async def query(self, query: str, timeout: Optional[float] = None) -> Optional[dict]:
+        """
+        Run ``query`` and return the first non-empty Overpass response, an
+        empty one if that is all the mirrors had, or None if every mirror
+        failed or ``timeout`` seconds ran out first.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        ranked = self.ranked_mirrors()
+        empty = None
+        for start in range(0, len(ranked), self.hedge):
+            budget = self._budget(deadline)
+            if budget is not None and budget <= 0:
+                break
+            group = ranked[start:start + self.hedge]
+            print(f"🔍 Racing Overpass endpoints: {', '.join(group)}")
+            attempt_timeout = self.timeout if budget is None else min(self.timeout, budget)
+            pending = {asyncio.ensure_future(self._fetch(url, query, attempt_timeout)): url for url in group}
+            while pending:
+                done, _ = await asyncio.wait(pending, timeout=self._budget(deadline), return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    self._keep_stragglers(pending)
+                    if empty is None:
+                        print(f"⏱️ Overpass query gave up after {timeout:.1f}s")
+                    return empty
+                for task in done:
+                    url = pending.pop(task)
+                    if task.exception() is not None:
+                        print(f"⚠️ Overpass mirror {url} failed: {task.exception()}")
+                        continue
+                    if not task.result()["elements"]:
+                        print(f"⚠️ Overpass mirror {url} returned no elements")
+                        empty = task.result()
+                        continue
+                    self._keep_stragglers(pending)
+                    return task.result()
+
+        return empty
+
+    def _keep_stragglers(self, tasks) -> None:
+        for straggler in tasks:
+            self._stragglers.add(straggler)
+            straggler.add_done_callback(self._discard_straggler)
+
+    def _discard_straggler(self, task: asyncio.Task) -> None:
+        self._stragglers.discard(task)
+        if not task.cancelled():
+            task.exception()
+
+    async def aclose(self) -> None:
+        for task in list(self._stragglers):
+            task.cancel()
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
@@ -0,0 +1,101 @@
+import re
+import threading
+from io import BytesIO
+from concurrent.futures import ThreadPoolExecutor, Future
+
+from metrics import stage
+
+TITLE_MARKUP = "<para align='center'><b><font size=18 color='green'>Medisense Lifestyle Recommendations</font></b></para>"
+FOOTER_MARKUP = "<para align='center'><font size=10 color='gray'>Generated by Medisense AI Health Assistant</font></para>"
+KEYWORD_IGNORE = {"i", "have", "been", "am", "with", "feeling", "a", "the"}
+
+
+class RendererBusy(RuntimeError):
+    """Raised when the render queue is full."""
+
+
+def condition_keyword(health_condition: str, analyzer=None) -> str:
+    """
+    One filename-safe keyword for a health condition: the most severe symptom
+    the analyzer recognises, else the first meaningful word, else "health".
+    """
+    if analyzer is not None:
+        symptoms = analyzer.preprocess_input(health_condition)
+        if symptoms:
+            # resolve_overlaps() does not keep the list sorted by severity.
+            return re.sub(r"[^a-zA-Z0-9_]", "_", max(symptoms, key=analyzer.symptom_severity.get))
+
+    words = re.findall(r"[a-zA-Z]+", health_condition)
+    return next((w.lower() for w in words if w.lower() not in KEYWORD_IGNORE), "health")
+
+
+def render_data(d) -> str:
+    if isinstance(d, dict):
+        return "".join(f"<b>{k.title()}</b><br/>{render_data(v)}" for k, v in d.items())
+    if isinstance(d, list):
+        return "".join(f"- {item}<br/>" for item in d)
+    return f"{d}<br/>"
+
+
+class PDFRenderer:
+    """
+    Renders lifestyle-recommendation PDFs with a stylesheet built once, on a
+    bounded pool of worker threads. At most ``max_pending`` renders may be
+    queued or running; beyond that submit() raises RendererBusy.
+    reportlab is imported and the stylesheet built on the first render, or
+    ahead of time by warm_up().
+    """
+
+    def __init__(self, workers: int = 2, max_pending: int = 16):
+        self._styles = None
+        self._styles_lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="pdf")
+        self._slots = threading.BoundedSemaphore(max_pending)
+
+    @property
+    def styles(self):
+        if self._styles is None:
+            with self._styles_lock:
+                if self._styles is None:
+                    from reportlab.lib.styles import getSampleStyleSheet
+                    self._styles = getSampleStyleSheet()
+        return self._styles
+
+    def warm_up(self) -> None:
+        """Builds the stylesheet and loads the reportlab modules render() uses."""
+        self.styles
+        import reportlab.platypus
+
+    def render(self, health_condition: str, recommendations) -> bytes:
+        from reportlab.lib.units import inch
+        from reportlab.lib.pagesizes import letter
+        from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
+
+        buffer = BytesIO()
+        doc = SimpleDocTemplate(buffer, pagesize=letter)
+        body = self.styles["BodyText"]
+
+        elements = [
+            Paragraph(TITLE_MARKUP, self.styles["Title"]),
+            Spacer(1, 0.3 * inch),
+            Paragraph(f"<b>Based on your condition:</b> {health_condition}", body),
+            Spacer(1, 0.2 * inch),
+            Paragraph(render_data(recommendations), body),
+            Spacer(1, 0.5 * inch),
+            Paragraph(FOOTER_MARKUP, body),
+        ]
+
+        with stage("pdf_build"):
+            doc.build(elements)
+        return buffer.getvalue()
+
+    def submit(self, health_condition: str, recommendations) -> Future:
+        if not self._slots.acquire(blocking=False):
+            raise RendererBusy("PDF renderer is at capacity")
+        try:
+            future = self._executor.submit(self.render, health_condition, recommendations)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
@@ -0,0 +1,194 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+from typing import Any, Callable, Dict, Hashable, Optional
+
+from ttl_cache import TTLCache
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache (
+    namespace  TEXT NOT NULL,
+    key        TEXT NOT NULL,
+    value      BLOB NOT NULL,
+    expires_at REAL NOT NULL,
+    weight     INTEGER NOT NULL,
+    PRIMARY KEY (namespace, key)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS cache_expiry ON cache (namespace, expires_at);
+"""
+
+
+class SharedCache:
+    """
+    TTL cache stored in an SQLite database (WAL mode) so several worker
+    processes share entries and they survive restarts. Has the same
+    get/set/clear/stats interface as TTLCache.
+
+    Each cache lives in its own ``namespace`` of the database file. Reads
+    are plain SELECTs, which WAL lets run alongside a writer; hot entries
+    are also kept in a small in-process TTLCache for ``local_ttl`` seconds.
+    Size bounds (``maxsize`` entries, ``max_weight`` total weight) are
+    enforced every ``evict_every`` writes by dropping expired entries and
+    then the ones closest to expiry, so a namespace can briefly exceed its
+    bounds. SQLite errors are logged and treated as misses.
+    """
+
+    _MISSING = object()
+
+    def __init__(self, path: str, namespace: str, maxsize: int = 256, ttl: float = 3600,
+                 max_weight: Optional[int] = None, weigh: Optional[Callable[[Any], int]] = None,
+                 dumps: Callable[[Any], str] = json.dumps, loads: Callable[[str], Any] = json.loads,
+                 local_size: int = 256, local_ttl: float = 60, evict_every: int = 32):
+        self.path = path
+        self.namespace = namespace
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.max_weight = max_weight
+        self.weigh = weigh or (lambda value: 1)
+        self.dumps = dumps
+        self.loads = loads
+        self.evict_every = max(1, evict_every)
+        self.local = TTLCache(maxsize=local_size, ttl=min(local_ttl, ttl), max_weight=max_weight, weigh=weigh)
+        self._local_thread = threading.local()
+        self._lock = threading.Lock()
+        self._writes = 0
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+        self.evict()
+
+    def _connect(self) -> sqlite3.Connection:
+        # One connection per thread and process; a connection inherited
+        # across fork() must not be reused.
+        conn = getattr(self._local_thread, "conn", None)
+        if conn is None or self._local_thread.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local_thread.conn = conn
+            self._local_thread.pid = os.getpid()
+        return conn
+
+    @staticmethod
+    def _key(key: Hashable) -> str:
+        return json.dumps(key, separators=(",", ":"))
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        value = self.local.get(key, self._MISSING)
+        if value is not self._MISSING:
+            with self._lock:
+                self.hits += 1
+            return value
+
+        try:
+            row = self._connect().execute(
+                "SELECT value FROM cache WHERE namespace = ? AND key = ? AND expires_at > ?",
+                (self.namespace, self._key(key), time.time()),
+            ).fetchone()
+            value = self.loads(row[0]) if row else self._MISSING
+        except (sqlite3.Error, ValueError) as e:
+            print(f"⚠️ Shared cache read failed ({self.namespace}): {e}")
+            with self._lock:
+                self.errors += 1
+            value = self._MISSING
+
+        with self._lock:
+            if value is self._MISSING:
+                self.misses += 1
+                return default
+            self.hits += 1
+        self.local.set(key, value)
+        return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        if self.maxsize <= 0:
+            return
+        weight = self.weigh(value)
+        if self.max_weight is not None and weight > self.max_weight:
+            return
+        self.local.set(key, value)
+
+        try:
+            self._connect().execute(
+                "INSERT OR REPLACE INTO cache (namespace, key, value, expires_at, weight) VALUES (?, ?, ?, ?, ?)",
+                (self.namespace, self._key(key), self.dumps(value), time.time() + self.ttl, weight),
+            )
+        except sqlite3.Error as e:
+            print(f"⚠️ Shared cache write failed ({self.namespace}): {e}")
+            with self._lock:
+                self.errors += 1
+            return
+
+        with self._lock:
+            self._writes += 1
+            due = self._writes % self.evict_every == 0
+        if due:
+            self.evict()
+
+    def evict(self) -> None:
+        """Drop expired entries, then the entries closest to expiry until the bounds hold."""
+        try:
+            conn = self._connect()
+            conn.execute("DELETE FROM cache WHERE namespace = ? AND expires_at <= ?", (self.namespace, time.time()))
+            conn.execute(
+                "DELETE FROM cache WHERE namespace = ? AND key IN ("
+                "SELECT key FROM cache WHERE namespace = ? ORDER BY expires_at DESC LIMIT -1 OFFSET ?)",
+                (self.namespace, self.namespace, self.maxsize),
+            )
+            if self.max_weight is not None:
+                conn.execute(
+                    "DELETE FROM cache WHERE namespace = ? AND key IN ("
+                    "SELECT key FROM (SELECT key, SUM(weight) OVER (ORDER BY expires_at DESC, key) AS running "
+                    "FROM cache WHERE namespace = ?) WHERE running > ?)",
+                    (self.namespace, self.namespace, self.max_weight),
+                )
+        except sqlite3.Error as e:
+            print(f"⚠️ Shared cache eviction failed ({self.namespace}): {e}")
+            with self._lock:
+                self.errors += 1
+
+    def clear(self) -> None:
+        self.local.clear()
+        try:
+            self._connect().execute("DELETE FROM cache WHERE namespace = ?", (self.namespace,))
+        except sqlite3.Error as e:
+            print(f"⚠️ Shared cache clear failed ({self.namespace}): {e}")
+
+    def __len__(self) -> int:
+        try:
+            return self._connect().execute(
+                "SELECT COUNT(*) FROM cache WHERE namespace = ? AND expires_at > ?", (self.namespace, time.time())
+            ).fetchone()[0]
+        except sqlite3.Error:
+            return 0
+
+    def stats(self) -> Dict:
+        try:
+            size, weight = self._connect().execute(
+                "SELECT COUNT(*), COALESCE(SUM(weight), 0) FROM cache WHERE namespace = ? AND expires_at > ?",
+                (self.namespace, time.time()),
+            ).fetchone()
+        except sqlite3.Error:
+            size, weight = 0, 0
+        with self._lock:
+            hits, misses, errors = self.hits, self.misses, self.errors
+        lookups = hits + misses
+        return {
+            "backend": "sqlite",
+            "path": self.path,
+            "size": size,
+            "maxsize": self.maxsize,
+            "weight": weight,
+            "max_weight": self.max_weight,
+            "ttl": self.ttl,
+            "hits": hits,
+            "misses": misses,
+            "local_hits": self.local.hits,
+            "errors": errors,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+        }
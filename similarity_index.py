@@ -0,0 +1,192 @@
+import threading
+from collections import OrderedDict, defaultdict
+from typing import Callable, Dict, Optional, Tuple
+
+from rapidfuzz import fuzz, process
+
+from text_normalizer import tokenize
+
+# Abbreviations and alternative names, mapped to one spelling so that e.g.
+# "high BP", "HTN" and "hypertension" compare equal.
+CONDITION_SYNONYMS = {
+    "bp": "blood pressure",
+    "hbp": "high blood pressure",
+    "htn": "high blood pressure",
+    "hypertension": "high blood pressure",
+    "hypotension": "low blood pressure",
+    "diabetic": "diabetes",
+    "dm": "diabetes",
+    "gerd": "acid reflux",
+    "ckd": "chronic kidney disease",
+    "copd": "chronic obstructive pulmonary disease",
+    "uti": "urinary tract infection",
+    "ibs": "irritable bowel syndrome",
+    "pcod": "pcos",
+    "obese": "obesity",
+    "mi": "heart attack",
+    "cad": "coronary artery disease",
+    "cholesterol": "high cholesterol",
+}
+# Words that describe how long rather than what; a number is dropped only
+# before a duration unit, so "type 2 diabetes" keeps its 2.
+DURATION_UNITS = {"day", "days", "week", "weeks", "month", "months", "year", "years", "yr", "yrs"}
+CONDITION_FILLER = DURATION_UNITS | {
+    "for", "since", "from", "about", "over", "past", "last", "ago", "almost", "nearly", "around",
+    "in", "on", "of", "to", "at", "by",
+}
+# Words that turn a condition into a different one while barely changing the
+# string ("hyperthyroidism" / "hypothyroidism" score 93). Two conditions
+# only match if they carry the same markers. Numbers, words of up to three
+# characters and acronyms count as markers too, since one letter changes
+# the disease: "hepatitis b" / "hepatitis c", "hiv" / "hpv". So does each
+# word's first letter, which typos rarely touch but different words do
+# ("knee sprain" / "knee pain").
+CONTRAST_PREFIXES = ("hyper", "hypo")
+CONTRAST_WORDS = {"high", "low", "left", "right", "upper", "lower", "acute", "chronic", "type", "pre", "post"}
+# Acronyms longer than three letters that still contain a vowel; ones
+# without a vowel ("ptsd") are recognized as such.
+ACRONYMS = {"copd", "gerd", "adhd", "pcos", "pcod", "nafld", "nash", "mrsa", "covid", "sars", "aids"}
+VOWELS = set("aeiouy")
+
+
+def condition_terms(text: str) -> str:
+    """
+    Canonical form of a health condition used for similarity: synonyms
+    expanded, durations dropped, and the distinct words in sorted order.
+    """
+    tokens = tokenize(text)
+    terms = []
+    for i, token in enumerate(tokens):
+        if token in CONDITION_FILLER:
+            continue
+        if token[0].isdigit() and i + 1 < len(tokens) and tokens[i + 1] in DURATION_UNITS:
+            continue
+        terms.append(CONDITION_SYNONYMS.get(token, token))
+    # Expansions can produce e.g. "high high blood pressure".
+    return " ".join(sorted(set(" ".join(terms).split())))
+
+
+def is_acronym(word: str) -> bool:
+    return len(word) <= 3 or word in ACRONYMS or not VOWELS.intersection(word)
+
+
+def contrast_markers(canonical: str) -> frozenset:
+    markers = set()
+    for word in canonical.split():
+        if word in CONTRAST_WORDS or word[0].isdigit() or is_acronym(word):
+            markers.add(word)
+        markers.update(p for p in CONTRAST_PREFIXES if word.startswith(p))
+        markers.add("^" + word[0])
+    return frozenset(markers)
+
+
+class SimilarityIndex:
+    """
+    Maps a key to the most similar key added earlier, if their canonical
+    forms score at least ``threshold`` (0-100). Canonical forms have their
+    words sorted, so rapidfuzz's plain ratio on them is token_sort_ratio
+    without re-sorting every candidate: it tolerates typos and word order
+    but, unlike token_set_ratio, penalises extra words ("diabetes" does not
+    match "diabetes and kidney disease").
+
+    Matches must also agree on contrast_markers(), so "hypothyroidism" never
+    answers for "hyperthyroidism" nor "type 1" for "type 2".
+
+    Only keys sharing a block (the first or last ``block_chars`` characters
+    of a word) are scored, so a lookup touches a handful of entries however
+    large the index grows. Blocks shared by more than ``max_block`` entries
+    are skipped when the query has rarer ones; when it has none, only keys
+    in all of its blocks are scored. At most ``maxsize`` keys
+    are kept, least recently added or matched first out.
+    """
+
+    def __init__(self, maxsize: int = 4096, threshold: float = 90,
+                 canonicalize: Callable[[str], str] = condition_terms,
+                 block_chars: int = 4, max_block: int = 512, max_matches: int = 5):
+        self.maxsize = maxsize
+        self.threshold = threshold
+        self.canonicalize = canonicalize
+        self.block_chars = block_chars
+        self.max_block = max_block
+        self.max_matches = max_matches
+        self._entries: "OrderedDict[str, str]" = OrderedDict()  # canonical -> key
+        self._blocks: Dict[str, set] = defaultdict(set)
+        self._lock = threading.Lock()
+        self.lookups = 0
+        self.hits = 0
+        self.score_total = 0.0
+
+    def _block_keys(self, canonical: str) -> set:
+        n = self.block_chars
+        return {part for word in canonical.split() for part in (word[:n], word[-n:])}
+
+    def add(self, key: str) -> None:
+        canonical = self.canonicalize(key)
+        if not canonical or self.maxsize <= 0:
+            return
+        with self._lock:
+            if canonical in self._entries:
+                self._entries.move_to_end(canonical)
+                self._entries[canonical] = key
+                return
+            self._entries[canonical] = key
+            for block in self._block_keys(canonical):
+                self._blocks[block].add(canonical)
+            while len(self._entries) > self.maxsize:
+                self._remove(next(iter(self._entries)))
+
+    def discard(self, key: str) -> None:
+        with self._lock:
+            canonical = self.canonicalize(key)
+            if self._entries.get(canonical) == key:
+                self._remove(canonical)
+
+    def _remove(self, canonical: str) -> None:
+        del self._entries[canonical]
+        for block in self._block_keys(canonical):
+            members = self._blocks[block]
+            members.discard(canonical)
+            if not members:
+                del self._blocks[block]
+
+    def lookup(self, key: str) -> Optional[Tuple[str, float]]:
+        """``(stored_key, score)`` of the best match at or above the threshold, else None."""
+        canonical = self.canonicalize(key)
+        with self._lock:
+            self.lookups += 1
+            if not canonical:
+                return None
+
+            blocks = sorted((self._blocks[b] for b in self._block_keys(canonical) if b in self._blocks), key=len)
+            if not blocks:
+                return None
+            rare = [b for b in blocks if len(b) <= self.max_block]
+            if rare:
+                candidates = set().union(*rare)
+            else:
+                candidates = blocks[0].intersection(*blocks[1:])
+
+            markers = contrast_markers(canonical)
+            for matched, score, _ in process.extract(canonical, candidates, scorer=fuzz.ratio,
+                                                     score_cutoff=self.threshold, limit=self.max_matches):
+                if contrast_markers(matched) == markers:
+                    self._entries.move_to_end(matched)
+                    self.hits += 1
+                    self.score_total += score
+                    return self._entries[matched], score
+            return None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "maxsize": self.maxsize,
+                "threshold": self.threshold,
+                "lookups": self.lookups,
+                "hits": self.hits,
+                "hit_rate": round(self.hits / self.lookups, 4) if self.lookups else 0.0,
+                "mean_similarity": round(self.score_total / self.hits, 2) if self.hits else None,
+            }
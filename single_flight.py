@@ -0,0 +1,93 @@
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+
+class SingleFlight:
+    """
+    Collapses concurrent calls that share a key into one execution.
+
+    The first caller for a key (the leader) runs ``fn`` in its own thread;
+    callers that arrive while it is running (followers) wait for the
+    leader's result instead of repeating the work. Exceptions raised by
+    ``fn`` are re-raised in every waiting caller, and a follower that waits
+    longer than ``timeout`` gets concurrent.futures.TimeoutError. Nothing is
+    remembered once the call finishes, so this is not a cache.
+    """
+
+    def __init__(self, timeout: Optional[float] = None):
+        self.timeout = timeout
+        self._calls: Dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+        self.leaders = 0
+        self.followers = 0
+
+    def do(self, key: Hashable, fn: Callable[[], Any], timeout: Optional[float] = None) -> Tuple[Any, bool]:
+        """Returns ``(value, shared)``; ``shared`` is True for followers."""
+        with self._lock:
+            future = self._calls.get(key)
+            if future is None:
+                future = self._calls[key] = Future()
+                self.leaders += 1
+                leader = True
+            else:
+                self.followers += 1
+                leader = False
+
+        if not leader:
+            return future.result(timeout=self.timeout if timeout is None else timeout), True
+
+        try:
+            value = fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(value)
+            return value, False
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+    def stats(self) -> Dict:
+        with self._lock:
+            in_flight = len(self._calls)
+            leaders, followers = self.leaders, self.followers
+        total = leaders + followers
+        return {
+            "in_flight": in_flight,
+            "calls": total,
+            "executions": leaders,
+            "coalesced": followers,
+            "coalesced_rate": round(followers / total, 4) if total else 0.0,
+        }
+
+
+class AsyncSingleFlight(SingleFlight):
+    """
+    SingleFlight for coroutines: ``fn`` returns an awaitable, and followers
+    await the leader's result without blocking the event loop.
+    """
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]], timeout: Optional[float] = None) -> Tuple[Any, bool]:
+        future = self._calls.get(key)
+        if future is not None:
+            self.followers += 1
+            return await asyncio.wait_for(asyncio.shield(future), self.timeout if timeout is None else timeout), True
+
+        future = self._calls[key] = asyncio.get_running_loop().create_future()
+        self.leaders += 1
+        try:
+            value = await fn()
+        except BaseException as e:
+            # A cancelled leader must not cancel its followers' tasks.
+            future.set_exception(RuntimeError("shared call was cancelled") if isinstance(e, asyncio.CancelledError) else e)
+            # Mark the exception as retrieved in case nobody was waiting.
+            future.exception()
+            raise
+        else:
+            future.set_result(value)
+            return value, False
+        finally:
+            del self._calls[key]
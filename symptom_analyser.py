@@ -1,96 +1,31 @@
-import re
 import json
 import math
-from rapidfuzz import fuzz
+import numpy as np
 from datetime import datetime
 from typing import List, Dict
 
+from metrics import stage
+from symptom_lexicon import Lexicon, SymptomLexicon
+from symptom_matcher import SymptomMatcher
+from text_normalizer import normalize, without_numbers
+
 class SymptomAnalyzer:
     """
     A basic AI-driven symptom analyzer for healthcare assistance.
     Analyzes symptoms, provides risk assessment, and recommends actions.
     """
     
-    def __init__(self):
-
-        self.symptom_severity = {
-            # General / Constitutional
-            'fever': 4, 'high fever': 7, 'very high fever': 8,
-            'chills': 4, 'sweating': 3, 'fatigue': 2, 'severe fatigue': 5,
-            'weakness': 3, 'extreme weakness': 6, 'weight loss': 4, 'rapid weight loss': 6,
-            'loss of appetite': 2, 'night sweats': 5, 'malaise': 3,
-
-            # Respiratory
-            'cough': 3, 'productive cough': 4, 'dry cough': 3,
-            'bloody cough': 8, 'shortness of breath': 7,
-            'severe shortness of breath': 9, 'difficulty breathing': 8,
-            'wheezing': 5, 'stridor': 9, 'rapid breathing': 7,
-            'slow breathing': 8, 'apnea': 10, 'difficulty breathing while lying down': 8,
-
-            # Cardiovascular
-            'chest pain': 9, 'pressure in chest': 8, 'palpitations': 6,
-            'irregular heartbeat': 7, 'syncope': 9, 'fainting': 7,
-            'cold sweat': 6, 'leg swelling': 5, 'sudden leg swelling': 7,
-            'calf pain': 6, 'bluish lips': 9, 'pallor': 6,
-            'low blood pressure symptom': 8, 'high blood pressure symptom': 5,
-
-            # Neurological
-            'headache': 3, 'severe headache': 9, 'migraine': 6,
-            'dizziness': 5, 'lightheadedness': 5, 'vertigo': 6,
-            'confusion': 7, 'altered mental status': 9,
-            'memory loss': 6, 'difficulty speaking': 8,
-            'numbness': 6, 'weakness on one side': 9,
-            'loss of coordination': 7, 'seizure': 9,
-            'loss of consciousness': 10, 'tremor': 4, 'blurred vision': 6,
-            'double vision': 7, 'slurred speech': 8,
-
-            # Gastrointestinal
-            'nausea': 3, 'vomiting': 5, 'persistent vomiting': 7,
-            'blood in vomit': 9, 'diarrhea': 4, 'bloody diarrhea': 8,
-            'black stool': 9, 'abdominal pain': 6, 'severe abdominal pain': 9,
-            'bloating': 3, 'constipation': 3, 'loss of appetite': 2,
-            'jaundice': 7, 'yellowing of skin': 7, 'fruity breath': 7,
-
-            # Genitourinary
-            'urinary frequency': 3, 'painful urination': 5,
-            'difficulty urinating': 5, 'urinary retention': 8,
-            'blood in urine': 7, 'flank pain': 7,
-            'pelvic pain': 6, 'vaginal bleeding': 7,
-            'heavy vaginal bleeding': 8, 'scrotal pain': 7,
-
-            # Musculoskeletal
-            'body aches': 3, 'muscle pain': 4, 'muscle weakness': 5,
-            'joint pain': 4, 'joint swelling': 5, 'back pain': 4,
-            'neck stiffness': 6, 'severe neck stiffness': 8,
-
-            # Dermatologic / Allergic
-            'rash': 3, 'hives': 6, 'itching': 3,
-            'swelling': 6, 'facial swelling': 8, 'lips swelling': 8,
-            'redness': 3, 'warmth': 4, 'pus': 6,
-            'cellulitis signs': 7, 'blistering rash': 7,
-            'peeling skin': 8, 'purple rash': 9,
-
-            # ENT (Ear, Nose, Throat)
-            'sore throat': 3, 'severe sore throat': 5,
-            'difficulty swallowing': 7, 'runny nose': 2, 'sneezing': 1,
-            'ear pain': 4, 'ear discharge': 6,
-            'hearing loss': 6, 'hoarseness': 3,
-
-            # Endocrine / Metabolic
-            'extreme thirst': 5, 'polydipsia': 5, 'polyuria': 5,
-            'confusion in diabetics': 8, 'cold intolerance': 3,
-            'heat intolerance': 3, 'sweating episodes': 4,
-
-            # Hematologic / Immune
-            'easy bruising': 4, 'bleeding gums': 5,
-            'nosebleed': 4, 'persistent bleeding': 8,
-            'petechiae': 7, 'lymph node swelling': 4,
-            'bleeding': 7, 'severe bleeding': 9, 'internal bleeding': 10,
-
-            # Psychiatric
-            'anxiety': 3, 'panic attack': 6,
-            'hallucinations': 8, 'paranoia': 7, 'suicidal thoughts': 10
-        }
+    def __init__(self, lexicon: SymptomLexicon = None):
+        # Symptom terms, synonyms and severities live in symptom_lexicon.json.
+        self.lexicon = lexicon or SymptomLexicon()
+
+    @property
+    def symptom_severity(self) -> Dict[str, int]:
+        return self.lexicon.current.severity
+
+    @property
+    def matcher(self) -> SymptomMatcher:
+        return self.lexicon.current.matcher
 
 
     def feed_to_gemini(self, symptom_result: dict, human_input: str) -> str:
@@ -117,46 +52,43 @@ class SymptomAnalyzer:
         return json.dumps(payload, indent=2, ensure_ascii=False)
 
         
-    def preprocess_input(self, text: str) -> List[str]:
-        text = text.lower()
-        text = re.sub(r'\b(i have|i feel|i am|feeling|experiencing|having|suffering from|with|and|but|the|a|an)\b', '', text)
-        text = re.sub(r'[^a-z\s]', ' ', text)
-        text = re.sub(r'\s+', ' ', text).strip()
-
-        detected = []
-        for s in self.symptom_severity:
-            score = fuzz.partial_ratio(s, text)
-            if score > 80:
-                detected.append(s)
-
-        if not detected:
-            return []
-
-        detected_sorted = sorted(detected, key=lambda s: self.symptom_severity[s], reverse=True)
-
-        final_symptoms = []
-        for s in detected_sorted:
-            overlapping = [fs for fs in final_symptoms if (s in fs or fs in s)]
-            if not overlapping:
-                final_symptoms.append(s)
+    def preprocess_input(self, text: str, normalized: bool = False, session: Dict = None) -> List[str]:
+        """
+        Detected symptoms in ``text``; pass ``normalized=True`` if it already went through text_normalizer.normalize().
+        ``session`` is a dict kept between follow-up submissions: the text and raw matches are stored in it, and the
+        next call only fuzzy-matches the part of the text that changed.
+        """
+        return self._detect(self.lexicon.current, text, normalized, session)
+
+    def _detect(self, lexicon: Lexicon, text: str, normalized: bool, session: Dict) -> List[str]:
+        with stage("text_normalization"):
+            text = without_numbers(text if normalized else normalize(text))
+
+        matcher = lexicon.matcher
+        with stage("fuzzy_matching"):
+            if session is None:
+                return matcher.find(text)
+            # Matches from another lexicon version may name spellings this one lacks.
+            if "text" in session and session.get("lexicon") == lexicon.digest:
+                matches = matcher.match_incremental(text, session["text"], session["matches"])
             else:
-                keep = s if self.symptom_severity[s] >= self.symptom_severity[overlapping[0]] else overlapping[0]
-                if keep != overlapping[0]:
-                    final_symptoms.remove(overlapping[0])
-                    final_symptoms.append(keep)
-
-        return final_symptoms
+                matches = matcher.match(text)
+            session["text"], session["matches"], session["lexicon"] = text, matches, lexicon.digest
+            return matcher.resolve_overlaps(matcher.terms(matches))
     
-    def compute_severity_score(self, symptoms: List[str], age: int = None, duration_days: int = None) -> Dict:
+    def compute_severity_score(self, symptoms: List[str], age: int = None, duration_days: int = None,
+                               severity: Dict[str, int] = None) -> Dict:
         """
         Compute weighted severity score based on detected symptoms, duration, and age.
         Adjusts for single-symptom cases so one symptom doesn't dominate the result.
+        ``severity`` defaults to the current lexicon's severities.
         """
         if not symptoms:
             return {"overall_score": 0, "category": "none"}
 
         p = 1.6
-        severities = [self.symptom_severity[s] for s in symptoms]
+        severity = severity or self.symptom_severity
+        severities = [severity[s] for s in symptoms]
         base_score = (sum(v ** p for v in severities) / len(severities)) ** (1 / p)
 
         if duration_days is not None:
@@ -195,8 +127,63 @@ class SymptomAnalyzer:
             "duration_factor": duration_factor,
             "symptom_factor": symptom_factor,
         }
+
+    def compute_severity_scores(self, symptom_lists: List[List[str]], ages: List[int] = None, durations: List[int] = None,
+                                severity: Dict[str, int] = None) -> List[Dict]:
+        """
+        Vectorized compute_severity_score over a batch of symptom lists.
+        Ages and durations may contain None, with the same meaning as in the single-record version.
+        """
+        n = len(symptom_lists)
+        ages = ages if ages is not None else [None] * n
+        durations = durations if durations is not None else [None] * n
+
+        results = [{"overall_score": 0, "category": "none"}] * n
+        rows = [i for i, symptoms in enumerate(symptom_lists) if symptoms]
+        if not rows:
+            return results
+
+        p = 1.6
+        severity = severity or self.symptom_severity
+        counts = np.array([len(symptom_lists[i]) for i in rows])
+        severities = np.array([severity[s] for i in rows for s in symptom_lists[i]], dtype=float)
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        base_score = (np.add.reduceat(severities ** p, starts) / counts) ** (1 / p)
+
+        duration = np.array([np.nan if durations[i] is None else durations[i] for i in rows], dtype=float)
+        duration_factor = np.where(np.isnan(duration), 1.0, 1 + 0.4 * (1 - np.exp(-duration / 5)))
+
+        center_age = 32.5
+        age = np.array([np.nan if ages[i] is None else ages[i] for i in rows], dtype=float)
+        age_factor = np.minimum(1 + 0.5 * ((np.abs(age - center_age) / center_age) ** 1.5), 1.5)
+        age_factor = np.where(np.isnan(age), 1.0, age_factor)
+
+        symptom_factor = np.where(counts == 1, 0.6, np.maximum(1.0 - 0.05 * (counts - 2), 0.8))
+
+        final_scores = np.minimum(base_score * duration_factor * age_factor * symptom_factor, 10)
+
+        results = list(results)
+        columns = zip(rows, final_scores.tolist(), age_factor.tolist(), duration_factor.tolist(), symptom_factor.tolist())
+        for i, final_score, age_f, duration_f, symptom_f in columns:
+            final_score = round(final_score, 2)
+            if final_score < 3:
+                category = "low"
+            elif final_score < 7:
+                category = "moderate"
+            else:
+                category = "high"
+
+            results[i] = {
+                "overall_score": final_score,
+                "category": category,
+                "age_factor": age_f,
+                "duration_factor": duration_f,
+                "symptom_factor": symptom_f,
+            }
+
+        return results
         
-    def analyze(self, symptoms_input, age, duration_days) -> Dict:
+    def analyze(self, symptoms_input, age, duration_days, normalized: bool = False, session: Dict = None) -> Dict:
         """
         Main analysis function.
         
@@ -205,11 +192,14 @@ class SymptomAnalyzer:
             duration_days: How long symptoms have been present
             age: Patient age (optional)
             existing_conditions: List of pre-existing conditions (optional)
+            normalized: True if symptoms_input is already normalized text
+            session: Dict carried between follow-up submissions (see preprocess_input)
         
         Returns:
             Dictionary with analysis results and recommendations
         """
-        symptoms = self.preprocess_input(symptoms_input)
+        lexicon = self.lexicon.current
+        symptoms = self._detect(lexicon, symptoms_input, normalized, session)
         
         if not symptoms:
             return {
@@ -217,7 +207,8 @@ class SymptomAnalyzer:
                 'timestamp': datetime.now().isoformat()
             }
 
-        severity_result = self.compute_severity_score(symptoms, age, duration_days)
+        with stage("severity_scoring"):
+            severity_result = self.compute_severity_score(symptoms, age, duration_days, lexicon.severity)
 
         result = {
             'timestamp': datetime.now().isoformat(),
@@ -229,3 +220,44 @@ class SymptomAnalyzer:
         }
 
         return result
+
+    def analyze_many(self, records: List[Dict], normalized: bool = False) -> List[Dict]:
+        """
+        Batch version of analyze().
+
+        Args:
+            records: List of dicts with "symptoms_input", "age" and "duration_days"
+            normalized: True if every "symptoms_input" is already normalized text
+
+        Returns:
+            List of analysis results in the same order as the input records
+        """
+        lexicon = self.lexicon.current
+        symptom_lists = [self._detect(lexicon, r.get('symptoms_input', ''), normalized, None) for r in records]
+        with stage("severity_scoring"):
+            severity_results = self.compute_severity_scores(
+                symptom_lists,
+                [r.get('age') for r in records],
+                [r.get('duration_days') for r in records],
+                lexicon.severity,
+            )
+
+        results = []
+        for symptoms, severity_result in zip(symptom_lists, severity_results):
+            if not symptoms:
+                results.append({
+                    'error': 'No recognizable symptoms detected. Please describe your symptoms more clearly.',
+                    'timestamp': datetime.now().isoformat()
+                })
+                continue
+
+            results.append({
+                'timestamp': datetime.now().isoformat(),
+                'detected_symptoms': symptoms,
+                'severity_score': severity_result['overall_score'],
+                'severity_category': severity_result['category'],
+                'age_factor': severity_result['age_factor'],
+                'duration_factor': severity_result['duration_factor']
+            })
+
+        return results
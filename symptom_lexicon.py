@@ -0,0 +1,245 @@
+import os
+import json
+import mmap
+import time
+import hashlib
+import tempfile
+import threading
+import numpy as np
+from typing import Dict, List, Optional, Tuple
+
+from symptom_matcher import SymptomMatcher
+from text_normalizer import normalize
+
+DEFAULT_LEXICON_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "symptom_lexicon.json")
+
+# Compiled layout: MAGIC, the header length as 8 little-endian bytes, the
+# JSON header, then the bigram count matrix at header["offset"]. Change
+# MAGIC when the layout changes so stale files are recompiled.
+MAGIC = b"MSLEX01\n"
+ALIGNMENT = 64
+
+
+class LexiconError(ValueError):
+    """Raised for a lexicon file that is malformed or spells a symptom twice."""
+
+
+def parse_lexicon(data: dict) -> Tuple[str, float, Dict[str, int], Dict[str, List[str]]]:
+    """
+    ``(version, threshold, severity, synonyms)`` from a lexicon file:
+
+        {"version": "...", "threshold": 80, "terms": [
+            {"term": "fever", "severity": 4, "category": "...", "synonyms": ["pyrexia"]}, ...]}
+
+    Terms and synonyms must already be in text_normalizer.normalize() form,
+    since that is the text they are matched against, and no spelling may
+    appear twice.
+    """
+    if not isinstance(data, dict) or not isinstance(data.get("terms"), list):
+        raise LexiconError('Lexicon must be an object with a "terms" list')
+    version = str(data.get("version", ""))
+    if not version:
+        raise LexiconError('Lexicon has no "version"')
+    threshold = data.get("threshold", 80)
+    if not isinstance(threshold, (int, float)) or not 0 <= threshold <= 100:
+        raise LexiconError(f"Invalid threshold: {threshold!r}")
+
+    severity, synonyms, seen = {}, {}, set()
+
+    def spelling(value, where):
+        if not isinstance(value, str) or not value:
+            raise LexiconError(f"{where}: expected a non-empty string, got {value!r}")
+        if normalize(value) != value:
+            raise LexiconError(f"{where}: {value!r} is not normalized (would match as {normalize(value)!r})")
+        if value in seen:
+            raise LexiconError(f"{where}: {value!r} is defined more than once")
+        seen.add(value)
+        return value
+
+    for n, entry in enumerate(data["terms"]):
+        if not isinstance(entry, dict):
+            raise LexiconError(f"terms[{n}]: expected an object")
+        term = spelling(entry.get("term"), f"terms[{n}]")
+        value = entry.get("severity")
+        if isinstance(value, bool) or not isinstance(value, int) or not 0 <= value <= 10:
+            raise LexiconError(f"{term!r}: severity must be an integer from 0 to 10, got {value!r}")
+        severity[term] = value
+        forms = entry.get("synonyms", [])
+        if not isinstance(forms, list):
+            raise LexiconError(f"{term!r}: synonyms must be a list")
+        if forms:
+            synonyms[term] = [spelling(form, f"{term!r} synonym") for form in forms]
+
+    return version, threshold, severity, synonyms
+
+
+class Lexicon:
+    """Immutable symptom vocabulary and its matcher, swapped as a whole on reload."""
+
+    def __init__(self, version: str, digest: str, severity: Dict[str, int], synonyms: Dict[str, List[str]],
+                 matcher: SymptomMatcher, path: Optional[str] = None):
+        self.version = version
+        self.digest = digest
+        self.severity = severity
+        self.synonyms = synonyms
+        self.matcher = matcher
+        self.path = path
+        self.loaded_at = time.time()
+
+    def stats(self) -> Dict:
+        return {
+            "version": self.version,
+            "digest": self.digest[:12],
+            "terms": len(self.severity),
+            "spellings": len(self.matcher.symptoms),
+            "compiled_path": self.path,
+            "matrix_bytes": int(self.matcher.bigram_counts.nbytes),
+            "loaded_at": self.loaded_at,
+        }
+
+
+def compile_source(raw: bytes) -> Lexicon:
+    """Parse and index lexicon file contents in this process."""
+    try:
+        data = json.loads(raw)
+    except ValueError as e:
+        raise LexiconError(f"Lexicon is not valid JSON: {e}") from e
+    version, threshold, severity, synonyms = parse_lexicon(data)
+    matcher = SymptomMatcher(severity, threshold=threshold, synonyms=synonyms)
+    return Lexicon(version, hashlib.sha256(raw).hexdigest(), severity, synonyms, matcher)
+
+
+def write_compiled(lexicon: Lexicon, path: str) -> None:
+    """Write ``lexicon`` to ``path`` in the compiled layout, replacing any old file atomically."""
+    matcher = lexicon.matcher
+    counts = np.ascontiguousarray(matcher.bigram_counts)
+    header = {
+        "version": lexicon.version,
+        "digest": lexicon.digest,
+        "threshold": matcher.threshold,
+        "severity": list(lexicon.severity.items()),
+        "synonyms": lexicon.synonyms,
+        "bigrams": matcher.bigrams,
+        "dtype": counts.dtype.str,
+        "shape": list(counts.shape),
+    }
+    # The offset is part of the header, so size the header with a placeholder.
+    header["offset"] = 0
+    size = len(json.dumps(header).encode()) + 32
+    header["offset"] = -(-(len(MAGIC) + 8 + size) // ALIGNMENT) * ALIGNMENT
+    encoded = json.dumps(header).encode().ljust(size)
+
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), prefix=".lexicon-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(MAGIC + len(encoded).to_bytes(8, "little") + encoded)
+            f.write(b"\0" * (header["offset"] - f.tell()))
+            f.write(counts.tobytes())
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def open_compiled(path: str) -> Lexicon:
+    """
+    A compiled lexicon with its bigram matrix memory-mapped read-only, so
+    every process that opens the same file shares one copy of it in the
+    page cache. Replacing the file later does not affect an open mapping.
+    """
+    with open(path, "rb") as f:
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    if buffer[:len(MAGIC)] != MAGIC:
+        raise LexiconError(f"{path} is not a compiled lexicon of this format")
+    start = len(MAGIC) + 8
+    header = json.loads(buffer[start:start + int.from_bytes(buffer[len(MAGIC):start], "little")])
+
+    shape = tuple(header["shape"])
+    counts = np.frombuffer(buffer, dtype=np.dtype(header["dtype"]), count=int(np.prod(shape)),
+                           offset=header["offset"]).reshape(shape)
+    severity = dict((term, value) for term, value in header["severity"])
+    matcher = SymptomMatcher(severity, threshold=header["threshold"], synonyms=header["synonyms"],
+                             bigrams=header["bigrams"], bigram_counts=counts)
+    return Lexicon(header["version"], header["digest"], severity, header["synonyms"], matcher, path)
+
+
+def load_lexicon(path: str, compiled_path: Optional[str] = None) -> Lexicon:
+    """
+    The lexicon file at ``path`` via its compiled form at ``compiled_path``
+    (default: next to it, with a .bin extension). The compiled file is
+    rebuilt when it is missing, of an older layout or compiled from other
+    contents; if it cannot be written, the lexicon is indexed in memory.
+    """
+    compiled_path = compiled_path or os.path.splitext(path)[0] + ".bin"
+    with open(path, "rb") as f:
+        raw = f.read()
+    digest = hashlib.sha256(raw).hexdigest()
+
+    try:
+        lexicon = open_compiled(compiled_path)
+        if lexicon.digest == digest:
+            return lexicon
+    except (OSError, ValueError, KeyError):
+        pass
+
+    lexicon = compile_source(raw)
+    try:
+        write_compiled(lexicon, compiled_path)
+    except OSError as e:
+        print(f"⚠️ Could not write compiled symptom lexicon {compiled_path}: {e}")
+        return lexicon
+    return open_compiled(compiled_path)
+
+
+class SymptomLexicon:
+    """
+    The current Lexicon for a lexicon file, hot-swapped when the file changes.
+
+    Readers take ``current`` once per analysis and use that object
+    throughout, so a reload never mixes two versions in one result. A
+    file that fails to parse or validate is reported by the reload loop
+    and the previous version stays in service.
+    """
+
+    def __init__(self, path: str = DEFAULT_LEXICON_PATH, compiled_path: Optional[str] = None):
+        self.path = path
+        self.compiled_path = compiled_path
+        self._mtime = None
+        self.current: Optional[Lexicon] = None
+        self._lock = threading.Lock()
+        self.reload()
+
+    def reload(self) -> bool:
+        """Load the lexicon file if it changed on disk. Returns False if its contents are unchanged."""
+        with self._lock:
+            mtime = os.path.getmtime(self.path)
+            if mtime == self._mtime:
+                return False
+
+            lexicon = load_lexicon(self.path, self.compiled_path)
+            self._mtime = mtime
+            if self.current is not None and lexicon.digest == self.current.digest:
+                return False
+
+            self.current = lexicon
+            print(f"🩺 Loaded symptom lexicon {lexicon.version} ({len(lexicon.severity)} terms, "
+                  f"{len(lexicon.matcher.symptoms)} spellings) from {self.path}")
+            return True
+
+    def start_auto_reload(self, interval: float) -> threading.Thread:
+        """Poll the lexicon file every ``interval`` seconds and swap in new versions."""
+        def loop():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.reload()
+                except Exception as e:
+                    print(f"⚠️ Symptom lexicon reload failed: {e}")
+
+        thread = threading.Thread(target=loop, name="symptom-lexicon-reload", daemon=True)
+        thread.start()
+        return thread
+
+    def stats(self) -> Dict:
+        return self.current.stats()
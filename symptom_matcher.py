@@ -0,0 +1,211 @@
+import os
+import re
+import math
+import numpy as np
+from fractions import Fraction
+from rapidfuzz import fuzz, process
+from typing import List, Dict, Optional, Tuple
+
+
+def bigram_index(symptoms: List[str]) -> Tuple[List[str], np.ndarray]:
+    """
+    The distinct character bigrams of ``symptoms`` and a bigram x symptom
+    matrix of occurrence counts; summing the rows of the bigrams present in
+    a text gives an upper bound on each symptom's surviving bigrams. Counts
+    are uint8 unless some symptom repeats a bigram more than 255 times.
+    """
+    ids, entries = {}, []
+    for i, s in enumerate(symptoms):
+        for j in range(len(s) - 1):
+            entries.append((ids.setdefault(s[j:j + 2], len(ids)), i))
+    counts = np.zeros((len(ids), len(symptoms)), dtype=np.uint16)
+    if entries:
+        rows, cols = zip(*entries)
+        np.add.at(counts, (list(rows), list(cols)), 1)
+    if counts.size == 0 or counts.max() <= np.iinfo(np.uint8).max:
+        counts = counts.astype(np.uint8)
+    return list(ids), counts
+
+
+def contains_phrase(phrase: str, text: str) -> bool:
+    """True if ``phrase`` occurs in ``text`` as whole words."""
+    start = text.find(phrase)
+    while start != -1:
+        end = start + len(phrase)
+        if (start == 0 or not text[start - 1].isalnum()) and (end == len(text) or not text[end].isalnum()):
+            return True
+        start = text.find(phrase, start + 1)
+    return False
+
+
+class SymptomMatcher:
+    """
+    Precompiled matcher over a symptom vocabulary.
+
+    Terms get exactly the same answer as scoring every term with
+    ``fuzz.partial_ratio(term, text) > threshold``, but the fuzzy scorer
+    only runs on spellings that share enough character bigrams with the
+    text to possibly pass. Spellings that occur verbatim in the text are
+    accepted without scoring.
+
+    Synonyms only match as whole words or phrases of the text: partial_ratio
+    would let a fragment of one stand for it ("passed" for "passed out",
+    "emes" for "emesis"), detecting a term the text never mentions.
+    """
+
+    def __init__(self, severity: Dict[str, int], threshold: float = 80,
+                 synonyms: Optional[Dict[str, List[str]]] = None,
+                 bigrams: Optional[List[str]] = None, bigram_counts: Optional[np.ndarray] = None):
+        """
+        ``synonyms`` maps a term to other spellings that are matched like it
+        and reported as it. ``bigrams`` and ``bigram_counts`` are a bigram
+        index built earlier for the same spellings (see symptom_lexicon.py);
+        without them it is built here.
+        """
+        self.severity = severity
+        self.threshold = threshold
+        synonyms = synonyms or {}
+        # Every spelling that is matched, terms first, and the term each stands for.
+        self.symptoms = list(severity) + [form for term in severity for form in synonyms.get(term, ())]
+        self.term_of = {s: s for s in severity}
+        self.term_of.update((form, term) for term in severity for form in synonyms.get(term, ()))
+        self._lengths = [len(s) for s in self.symptoms]
+        self._max_length = max(self._lengths, default=0)
+        self._order = {s: i for i, s in enumerate(self.symptoms)}
+        self._synonyms = frozenset(self.symptoms[len(severity):])
+
+        # A partial_ratio above t (as a fraction) needs an alignment where more
+        # than (3t - 2) / (2 - t) * len(symptom) - 1 adjacent symptom bigrams
+        # survive intact in the text. Below t = 2/3 the bound is useless.
+        t = Fraction(threshold) / 100
+        factor = (3 * t - 2) / (2 - t) if t > Fraction(2, 3) else 0
+        required = {m: max(0, math.floor(factor * m - 1) + 1) if factor else 0 for m in set(self._lengths)}
+        self._required = np.array([required[m] for m in self._lengths], dtype=np.int32)
+        self._length_array = np.array(self._lengths, dtype=np.int32)
+
+        if bigram_counts is None:
+            bigrams, bigram_counts = bigram_index(self.symptoms)
+        self.bigrams = list(bigrams)
+        self.bigram_counts = bigram_counts
+        self._bigram_ids = {b: i for i, b in enumerate(self.bigrams)}
+
+    def candidates(self, text: str) -> List[int]:
+        """Indices of symptoms that could score above the threshold."""
+        n = len(text)
+        present = {self._bigram_ids.get(text[j:j + 2]) for j in range(n - 1)}
+        present.discard(None)
+        if present:
+            hits = self.bigram_counts[list(present)].sum(axis=0, dtype=np.int32)
+        else:
+            hits = np.zeros(len(self.symptoms), dtype=np.int32)
+
+        return np.flatnonzero((self._length_array > n) | (hits >= self._required)).tolist()
+
+    def match(self, text: str) -> List[str]:
+        """All spellings scoring above the threshold, in vocabulary order; see terms()."""
+        if not text:
+            return []
+
+        exact, fuzzy = [], []
+        for i in self.candidates(text):
+            s = self.symptoms[i]
+            if s in self._synonyms:
+                if contains_phrase(s, text):
+                    exact.append(i)
+            else:
+                (exact if s in text else fuzzy).append(i)
+
+        scored = process.extract(
+            text, [self.symptoms[i] for i in fuzzy], scorer=fuzz.partial_ratio,
+            score_cutoff=self.threshold, limit=None,
+        )
+        exact += [fuzzy[j] for _, score, j in scored if score > self.threshold]
+        return [self.symptoms[i] for i in sorted(exact)]
+
+    def match_incremental(self, text: str, previous_text: str, previous_matches: List[str]) -> List[str]:
+        """
+        match(text), given that match(previous_text) returned
+        ``previous_matches``. Only the part of ``text`` after the prefix it
+        shares with ``previous_text`` is matched, plus enough characters
+        before it for a symptom to straddle the edit; the previous and new
+        matches are then re-checked against the whole text.
+
+        Exact: any alignment scoring above the threshold either lies in the
+        shared prefix, where match(previous_text) found it, or overlaps the
+        re-matched tail. A tail alignment cut short by the tail's artificial
+        start, or a previous one that relied on the old end of text, is
+        dropped by the re-check.
+        """
+        shared = len(os.path.commonprefix([text, previous_text]))
+        start = shared - self._max_length - 1
+        # Symptoms longer than the text are scored the other way round, so
+        # short texts get no shortcut.
+        if start <= 0 or len(previous_text) < self._max_length:
+            return self.match(text)
+
+        found = set(previous_matches) | set(self.match(text[start:]))
+        return [s for s in sorted(found, key=self._order.__getitem__) if self._matches(s, text)]
+
+    def _matches(self, s: str, text: str) -> bool:
+        if s in self._synonyms:
+            return contains_phrase(s, text)
+        return s in text or fuzz.partial_ratio(s, text, score_cutoff=self.threshold) > self.threshold
+
+    def terms(self, matches: List[str]) -> List[str]:
+        """The terms that spellings returned by match() stand for, each once, in match order."""
+        return list(dict.fromkeys(self.term_of[s] for s in matches))
+
+    def resolve_overlaps(self, detected: List[str]) -> List[str]:
+        """
+        Collapse symptoms that contain one another, keeping the most severe.
+        """
+        detected_sorted = sorted(detected, key=lambda s: self.severity[s], reverse=True)
+
+        final_symptoms = []
+        for s in detected_sorted:
+            overlapping = next((fs for fs in final_symptoms if s in fs or fs in s), None)
+            if overlapping is None:
+                final_symptoms.append(s)
+            elif self.severity[s] >= self.severity[overlapping] and s != overlapping:
+                final_symptoms.remove(overlapping)
+                final_symptoms.append(s)
+
+        return final_symptoms
+
+    def find(self, text: str) -> List[str]:
+        return self.resolve_overlaps(self.terms(self.match(text)))
+
+
+class CriticalSymptomDetector:
+    """
+    Precompiled whole-phrase detector for emergency symptoms.
+
+    Only phrases the user's text states as whole words count: a fuzzy match
+    is too loose to skip the full analysis on ("stomach pain" scores as
+    "chest pain"). A phrase shortly after a negation in the same clause
+    ("no chest pain", "denies any chest pain") is not reported, so it works
+    on the raw text, before normalization drops punctuation and "but".
+    """
+
+    NEGATIONS = ("no", "not", "denies", "denied", "without", "never")
+    CLAUSE_BREAKS = ("but", "however", "although", "though", "yet")
+
+    def __init__(self, phrases: List[str]):
+        self.phrases = list(phrases)
+        alternation = "|".join(
+            r"[^a-z0-9]+".join(map(re.escape, p.split())) for p in sorted(self.phrases, key=len, reverse=True))
+        self._pattern = re.compile(rf"(?<![a-z0-9])(?:{alternation})(?![a-z0-9])")
+        # A negation up to two words before the phrase with no clause break
+        # in between, e.g. "no recent chest pain" but not "no fever, chest pain".
+        negation, breaks = "|".join(self.NEGATIONS), "|".join(self.CLAUSE_BREAKS)
+        word = rf"[^\w.,;:!?]+(?!(?:{breaks})\b)\w+"
+        self._negated = re.compile(rf"\b(?:{negation})\b(?:{word}){{0,2}}[^\w.,;:!?]*$")
+
+    def detect(self, text: str) -> List[str]:
+        """Critical phrases stated in ``text``, in the order they were declared."""
+        text = str(text).lower()
+        found = {
+            " ".join(re.findall(r"[a-z0-9]+", m.group()))
+            for m in self._pattern.finditer(text) if not self._negated.search(text, 0, m.start())
+        }
+        return [p for p in self.phrases if p in found]
@@ -0,0 +1,73 @@
+import asyncio
+
+import httpx
+
+import asgi
+
+
+def request(method, path, **kwargs):
+    async def send():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=asgi.app), base_url="http://test") as client:
+            return await client.request(method, path, **kwargs)
+
+    return asyncio.run(send())
+
+
+def test_async_route_answers_request_errors():
+    response = request("POST", "/api/nearby-hospitals", json={"max_distance": 5})
+    assert response.status_code == 400
+    assert response.json()["error"] == "Location coordinates are required"
+
+
+def test_async_route_rejects_non_json_body():
+    response = request("POST", "/api/nearby-hospitals", content="lat=1", headers={"Content-Type": "text/plain"})
+    assert response.status_code == 415
+
+
+def test_other_routes_are_served_by_flask():
+    assert request("GET", "/metrics").text.startswith("# HELP")
+    assert request("GET", "/api/symptom-analysis/summary/unknown").status_code == 404
+    assert request("GET", "/api/no-such-route").status_code == 404
+
+
+def test_cors_covers_both_halves():
+    for path in ("/api/cache-stats", "/metrics"):
+        response = request("GET", path, headers={"Origin": "http://localhost:5173"})
+        assert response.headers["access-control-allow-origin"] == "*"
+
+    preflight = request("OPTIONS", "/api/symptom-analysis", headers={
+        "Origin": "http://localhost:5173",
+        "Access-Control-Request-Method": "POST",
+        "Access-Control-Request-Headers": "content-type",
+    })
+    assert preflight.status_code == 200
+    assert "POST" in preflight.headers["access-control-allow-methods"]
+
+
+def test_blocking_work_runs_off_the_event_loop(monkeypatch):
+    import threading
+
+    import app as medisense
+
+    loop_threads, work_threads = set(), []
+
+    def on_thread(fn):
+        def wrapper(*args, **kwargs):
+            work_threads.append(threading.current_thread())
+            return fn(*args, **kwargs)
+        return wrapper
+
+    for name in ("load_session", "run_analysis", "save_session", "cached_recommendations", "parse_download_request"):
+        monkeypatch.setattr(medisense, name, on_thread(getattr(medisense, name)))
+    monkeypatch.setattr(medisense, "CRITICAL_BACKGROUND_SUMMARY", False)
+
+    async def send():
+        loop_threads.add(threading.current_thread())
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=asgi.app), base_url="http://test") as client:
+            await client.post("/api/symptom-analysis", json={"symptoms_input": "severe chest pain", "session_id": "s1"})
+            await client.post("/api/lifestyle-recommendations", json={"health_condition": "asthma"})
+            await client.post("/api/download-recommendations", json={"health_condition": "asthma", "recommendations": {}})
+
+    asyncio.run(send())
+    assert len(work_threads) == 5
+    assert not loop_threads & set(work_threads)
@@ -0,0 +1,58 @@
+import os
+import subprocess
+import sys
+from concurrent.futures import Future
+
+import pytest
+
+import app as medisense
+from shared_cache import SharedCache
+from ttl_cache import TTLCache
+
+RESULT = {"detected_symptoms": ["chest pain"], "severity_score": 6.1, "severity_category": "moderate"}
+
+
+@pytest.fixture
+def shared(tmp_path, monkeypatch):
+    cache = SharedCache(str(tmp_path / "cache.db"), "background_summaries", local_size=0)
+    monkeypatch.setattr(medisense, "background_summaries", cache)
+    monkeypatch.setattr(medisense, "pending_summaries", TTLCache())
+    monkeypatch.setattr(medisense, "CRITICAL_BACKGROUND_SUMMARY", True)
+    return cache
+
+
+def start(future):
+    response = medisense.emergency_response(dict(RESULT), "chest pain", 50, 1, ["chest pain"],
+                                            start_summary=lambda *args: future)
+    return response["summary_id"]
+
+
+def as_other_worker(monkeypatch, cache, summary_id, owner):
+    """The poll lands on a worker that holds no future for the summary."""
+    monkeypatch.setattr(medisense, "pending_summaries", TTLCache())
+    cache.set(summary_id, {**cache.get(summary_id), "owner": owner})
+
+
+def test_other_worker_sees_pending_then_ready(shared, monkeypatch):
+    future = Future()
+    summary_id = start(future)
+    assert medisense.summary_status(summary_id) == ({"status": "pending"}, 202)
+
+    as_other_worker(monkeypatch, shared, summary_id, os.getppid())
+    assert medisense.summary_status(summary_id) == ({"status": "pending"}, 202)
+
+    future.set_result("Overall risk: HIGH. Seek care now.")
+    payload, status = medisense.summary_status(summary_id)
+    assert status == 200 and payload["status"] == "ready"
+    assert payload["ai_summary"] == "Overall risk: HIGH. Seek care now."
+
+
+def test_summary_of_an_exited_worker_is_not_pending_forever(shared, monkeypatch):
+    summary_id = start(Future())
+    exited = subprocess.run([sys.executable, "-c", "import os; print(os.getpid())"], capture_output=True, text=True)
+    as_other_worker(monkeypatch, shared, summary_id, int(exited.stdout))
+    assert medisense.summary_status(summary_id)[1] == 404
+
+
+def test_unknown_summary_id(shared):
+    assert medisense.summary_status("nope")[1] == 404
@@ -0,0 +1,20 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RUN = "import multiprocessing, sys, bulk_score; multiprocessing.set_start_method(sys.argv[1]); " \
+      "sys.argv = ['bulk_score.py', '--workers', '2', '--chunk-size', '1']; bulk_score.main()"
+
+
+@pytest.mark.parametrize("method", ["fork", "spawn"])
+def test_stdout_holds_only_jsonl(method):
+    intake = "".join(json.dumps({"symptoms_input": text, "age": 40}) + "\n" for text in ("fever and cough", "rash", "??"))
+    result = subprocess.run([sys.executable, "-c", RUN, method], input=intake, capture_output=True, text=True,
+                            cwd=ROOT, timeout=120, check=True)
+    lines = result.stdout.splitlines()
+    assert len(lines) == 3
+    assert [json.loads(line)["symptoms_input"] for line in lines[:2]] == ["fever cough", "rash"]
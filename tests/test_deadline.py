@@ -0,0 +1,141 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+
+import app as medisense
+import asgi
+from deadline import DeadlineExceeded, current_deadline, end_deadline, out_of_time, start_deadline, time_left
+from test_overpass_client import FOUND
+
+# 0.1s of budget once REQUEST_TIMEOUT_MARGIN is taken off.
+SHORT = {"X-Request-Timeout": str(medisense.REQUEST_TIMEOUT_MARGIN + 0.1)}
+NEAR = {"latitude": 1.0, "longitude": 2.0, "max_distance": 5}
+
+
+def sleep_out():
+    """Uses up the current request's budget, as a hung upstream would."""
+    time.sleep(time_left() + 0.01)
+
+
+class SlowOverpass:
+    def query(self, query, timeout=None):
+        sleep_out()
+        return None
+
+
+class FastOverpass:
+    def query(self, query, timeout=None):
+        return FOUND
+
+
+def slow_gemini(prompt, priority):
+    sleep_out()
+    raise TimeoutError("Gemini did not answer")
+
+
+@pytest.fixture
+def client(monkeypatch):
+    for name in ("hospital_tile_cache", "empty_tile_cache", "summary_cache", "recommendation_cache"):
+        monkeypatch.setattr(medisense, name, medisense.TTLCache(maxsize=64, ttl=60))
+    monkeypatch.setattr(medisense, "get_hospital_index", lambda: None)
+    monkeypatch.setattr(medisense, "get_overpass_client", SlowOverpass)
+    monkeypatch.setattr(medisense, "scheduled_generate", slow_gemini)
+    return medisense.create_app(warm=False).test_client()
+
+
+def test_deadline_budget_and_degraded_parts():
+    deadline = start_deadline(0.05)
+    try:
+        assert 0 < time_left() <= 0.05
+        assert time_left(0.01) == 0.01
+        assert not out_of_time("hospitals")
+        time.sleep(0.06)
+        with pytest.raises(DeadlineExceeded):
+            time_left()
+        assert out_of_time("hospitals") and out_of_time("hospitals")
+        assert current_deadline().degraded == ["hospitals"]
+        assert medisense.mark_partial({}) == {"partial": True, "degraded": ["hospitals"]}
+    finally:
+        end_deadline()
+    assert time_left(3) == 3
+    assert deadline.expired and current_deadline() is None
+
+
+def test_request_timeout_header():
+    margin, default = medisense.REQUEST_TIMEOUT_MARGIN, medisense.REQUEST_TIMEOUT
+    assert medisense.request_timeout({"x-request-timeout": "2"}) == pytest.approx(2 - margin)
+    assert medisense.request_timeout({"x-request-timeout": "1e9"}) == pytest.approx(medisense.MAX_REQUEST_TIMEOUT - margin)
+    for bad in ("soon", "-1", "nan", "inf", ""):
+        assert medisense.request_timeout({"x-request-timeout": bad}) == pytest.approx(default - margin)
+
+
+def test_hospitals_come_back_empty_and_partial(client):
+    started = time.monotonic()
+    response = client.post("/api/nearby-hospitals", json=NEAR, headers=SHORT)
+    assert time.monotonic() - started < 1
+    assert response.status_code == 200
+    assert response.get_json() == {"hospitals": [], "partial": True, "degraded": ["hospitals"]}
+
+
+def test_hospitals_fall_back_to_a_tile_of_another_radius(client):
+    medisense.cache_tile(medisense.hospital_tile(1.0, 2.0, 10)[0], FOUND["elements"])
+    body = client.post("/api/nearby-hospitals", json=NEAR, headers=SHORT).get_json()
+    assert [h["id"] for h in body["hospitals"]] == [1]
+    assert body["partial"] is True and body["degraded"] == ["hospitals"]
+
+
+def test_analysis_keeps_local_result_without_summary(client):
+    body = client.post("/api/symptom-analysis", json={"symptoms_input": "mild cough and sore throat", "age": 30},
+                       headers=SHORT).get_json()
+    assert body["partial"] is True and body["degraded"] == ["ai_summary"]
+    assert body["detected_symptoms"]
+    assert "Gemini unavailable" not in str(body)
+
+
+def test_batch_keeps_every_record(client):
+    records = [{"symptoms_input": "fever and headache"}, {"symptoms_input": "itchy rash"}]
+    body = client.post("/api/symptom-analysis/batch", json={"records": records, "ai_summary": True},
+                       headers=SHORT).get_json()
+    assert len(body["results"]) == 2
+    assert body["partial"] is True and body["degraded"] == ["ai_summary"]
+
+
+def test_recommendations_fall_back(client):
+    body = client.post("/api/lifestyle-recommendations", json={"health_condition": "deadline test condition"},
+                       headers=SHORT).get_json()
+    assert body["success"] is True and body["recommendations"]
+    assert body["partial"] is True and body["degraded"] == ["recommendations"]
+    assert len(medisense.recommendation_cache) == 0
+
+
+def test_answer_within_budget_is_not_partial(client, monkeypatch):
+    monkeypatch.setattr(medisense, "get_overpass_client", FastOverpass)
+    body = client.post("/api/nearby-hospitals", json=NEAR, headers=SHORT).get_json()
+    assert "partial" not in body and [h["id"] for h in body["hospitals"]] == [1]
+
+
+def test_degraded_parts_are_counted(client):
+    def count():
+        return medisense.DEADLINE_DEGRADED_TOTAL._values.get(("/api/nearby-hospitals", "hospitals"), 0)
+
+    before = count()
+    client.post("/api/nearby-hospitals", json=NEAR, headers=SHORT)
+    assert count() == before + 1
+
+
+def test_asgi_hospitals_come_back_partial(client, monkeypatch):
+    async def query(query, timeout=None):
+        await asyncio.sleep(timeout + 0.01)
+        return None
+
+    monkeypatch.setattr(asgi.overpass_client, "query", query)
+
+    async def send():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=asgi.app), base_url="http://test") as http:
+            return await http.post("/api/nearby-hospitals", json=NEAR, headers=SHORT)
+
+    response = asyncio.run(send())
+    assert response.status_code == 200
+    assert response.json() == {"hospitals": [], "partial": True, "degraded": ["hospitals"]}
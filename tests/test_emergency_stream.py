@@ -0,0 +1,66 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+import app as medisense
+import asgi
+
+CHEST_PAIN = {"symptoms_input": "sudden chest pain", "age": 50}
+
+
+def events(body):
+    return [(block.split("\n")[0][len("event: "):], json.loads(block.split("\n")[1][len("data: "):]))
+            for block in body.strip().split("\n\n")]
+
+
+@pytest.fixture(autouse=True)
+def no_background_summary(monkeypatch):
+    monkeypatch.setattr(medisense, "CRITICAL_BACKGROUND_SUMMARY", False)
+
+
+@pytest.mark.parametrize("query, body", [("?stream=1", CHEST_PAIN), ("", {**CHEST_PAIN, "stream": True})])
+def test_flask_streams_emergency(query, body):
+    response = medisense.create_app(warm=False).test_client().post("/api/symptom-analysis" + query, json=body)
+    assert response.status_code == 200
+    assert response.mimetype == "text/event-stream"
+    (first, emergency), (last, final) = events(response.get_data(as_text=True))
+    assert (first, last) == ("emergency", "final")
+    assert emergency["emergency"] is True and final == emergency
+
+
+def test_flask_without_stream_still_answers_json():
+    response = medisense.create_app(warm=False).test_client().post("/api/symptom-analysis", json=CHEST_PAIN)
+    assert response.mimetype == "application/json"
+    assert response.get_json()["emergency"] is True
+
+
+def test_asgi_streams_emergency():
+    async def post():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=asgi.app), base_url="http://test") as client:
+            return await client.post("/api/symptom-analysis?stream=1", json=CHEST_PAIN)
+
+    response = asyncio.run(post())
+    assert response.headers["content-type"].startswith("text/event-stream")
+    assert [name for name, _ in events(response.text)] == ["emergency", "final"]
+
+
+@pytest.mark.parametrize("text", [
+    "stomach pain", "ache", "mild abdominal pain", "loss", "consciousness", "bleeding", "pain",
+    "no chest pain, just a mild cough", "denies any chest pain", "no fever or chest pain",
+])
+def test_no_emergency_without_a_stated_critical_symptom(text):
+    assert medisense.detect_critical(text) == []
+    response = medisense.create_app(warm=False).test_client().post("/api/symptom-analysis", json={"symptoms_input": text})
+    assert "emergency" not in response.get_json()
+
+
+@pytest.mark.parametrize("text, critical", [
+    ("Sudden CHEST PAIN!", ["chest pain"]),
+    ("no fever, but chest pain", ["chest pain"]),
+    ("no idea why I have chest pain", ["chest pain"]),
+    ("severe bleeding and loss of consciousness", ["severe bleeding", "loss of consciousness"]),
+])
+def test_stated_critical_symptoms_are_detected(text, critical):
+    assert medisense.detect_critical(text) == critical
@@ -0,0 +1,29 @@
+import asyncio
+
+import pytest
+
+from gemini_scheduler import AsyncGeminiScheduler, GeminiScheduler, PRIORITY_LIFESTYLE, PRIORITY_SYMPTOM, SchedulerBusy
+
+
+@pytest.mark.parametrize("cls", [GeminiScheduler, AsyncGeminiScheduler])
+def test_rejects_queue_without_room(cls):
+    with pytest.raises(ValueError):
+        cls(max_queue=0)
+
+
+def test_smallest_queue_admits_and_times_out():
+    scheduler = GeminiScheduler(rate=0, max_in_flight=1, max_queue=1, queue_timeout=0.05)
+    with scheduler.slot(PRIORITY_SYMPTOM):
+        # Waits in the one queue place behind the running call, then times out.
+        with pytest.raises(SchedulerBusy):
+            scheduler.acquire(PRIORITY_LIFESTYLE)
+    assert scheduler.in_flight == 0
+
+
+def test_async_smallest_queue_admits():
+    async def run():
+        scheduler = AsyncGeminiScheduler(rate=0, max_in_flight=1, max_queue=1)
+        async with scheduler.slot(PRIORITY_SYMPTOM):
+            return scheduler.in_flight
+
+    assert asyncio.run(run()) == 1
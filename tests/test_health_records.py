@@ -0,0 +1,209 @@
+import random
+from datetime import date, datetime, timedelta
+
+import pytest
+
+import app as medisense
+from app import RequestError
+from health_records import HealthRecordIndex, HealthRecordStore
+
+TODAY = date(2026, 10, 16)
+HOSPITALS = [("City General", "Cardiology"), ("St. Mary's", "Neurology"), ("Lakeside Clinic", "Dermatology"),
+             ("Cardiac Care Centre", "Cardiology")]
+SYMPTOMS = ["fever and cough", "chest pain", "skin rash", "headache", None]
+STATUSES = ["confirmed", "cancelled", "completed"]
+TERMS = ["", "card", "CITY ", "ca", "fever", "conf-1", "rash", "nothing like this"]
+
+
+def filter_health_records(records, term, status="all", date_filter="all", today=TODAY):
+    """Line-by-line port of src/utils/filterHealthRecords.js, with ``today`` passed in."""
+    term = (term or "").strip().lower()
+    filtered = list(records)
+
+    if term:
+        def matches(r):
+            h = r.get("hospital") or {}
+            fields = (h.get("name"), h.get("specialization"), r.get("confirmationNumber"), r.get("symptoms"))
+            return any(isinstance(f, str) and term in f.lower() for f in fields)
+        filtered = [r for r in filtered if matches(r)]
+
+    if status != "all":
+        filtered = [r for r in filtered if r.get("status") == status]
+
+    if date_filter != "all":
+        midnight = datetime.combine(today, datetime.min.time())
+        keep = {
+            "today": lambda d: d.date() == today,
+            "upcoming": lambda d: d >= midnight,
+            "past": lambda d: d < midnight,
+        }[date_filter]
+        filtered = [r for r in filtered if keep(slot_date(r))]
+
+    filtered.sort(key=slot_date, reverse=True)
+    return filtered
+
+
+def slot_date(record):
+    return datetime.fromisoformat(record["slot"]["date"])
+
+
+def make_record(rng, record_id):
+    name, specialization = rng.choice(HOSPITALS)
+    day = TODAY + timedelta(days=rng.randint(-3, 3))
+    return {
+        "id": record_id,
+        "hospital": {"name": name, "specialization": specialization},
+        "confirmationNumber": f"CONF-{rng.randint(1, 40)}",
+        "symptoms": rng.choice(SYMPTOMS),
+        "status": rng.choice(STATUSES),
+        "slot": {"date": f"{day.isoformat()}T{rng.choice([8, 12, 12, 17]):02d}:00:00"},
+    }
+
+
+class Model:
+    """The records in insertion order, as the index orders ties."""
+
+    def __init__(self):
+        self.records, self.seq, self._next = {}, {}, 0
+
+    def upsert(self, record):
+        if record["id"] not in self.records:
+            self.seq[record["id"]] = self._next
+            self._next += 1
+        self.records[record["id"]] = record
+
+    def delete(self, record_id):
+        del self.records[record_id]
+        del self.seq[record_id]
+
+    def ordered(self):
+        return sorted(self.records.values(), key=lambda r: self.seq[r["id"]])
+
+    def key(self, record):
+        return -slot_date(record).timestamp(), self.seq[record["id"]]
+
+
+def all_pages(index, limit, **filters):
+    found, cursor = [], None
+    while True:
+        page, cursor = index.search(today=TODAY, cursor=cursor, limit=limit, **filters)
+        found += page
+        if cursor is None:
+            return found
+
+
+def mutate(rng, index, model, next_id):
+    for _ in range(rng.randint(1, 6)):
+        if model.records and rng.random() < 0.4:
+            record_id = rng.choice(list(model.records))
+            index.delete(record_id)
+            model.delete(record_id)
+        else:
+            record_id = rng.choice(list(model.records)) if model.records and rng.random() < 0.3 else str(next(next_id))
+            record = make_record(rng, record_id)
+            index.upsert(record)
+            model.upsert(record)
+
+
+def ids(records):
+    return [r["id"] for r in records]
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_search_pages_match_linear_filter(seed):
+    rng = random.Random(seed)
+    index, model, next_id = HealthRecordIndex(), Model(), iter(range(10 ** 6))
+    for _ in range(15):
+        mutate(rng, index, model, next_id)
+        for term in TERMS:
+            for status in ["all"] + STATUSES:
+                for date_filter in ("all", "today", "upcoming", "past"):
+                    expected = filter_health_records(model.ordered(), term, status, date_filter)
+                    found = all_pages(index, rng.randint(1, 4), term=term, status=status, date_filter=date_filter)
+                    assert ids(found) == ids(expected), (term, status, date_filter)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_cursor_continues_after_upserts_and_deletes(seed):
+    rng = random.Random(seed)
+    index, model, next_id = HealthRecordIndex(), Model(), iter(range(10 ** 6))
+    for _ in range(5):
+        mutate(rng, index, model, next_id)
+    for term, status, date_filter in [("", "all", "all"), ("ca", "all", "upcoming"), ("", "confirmed", "past")]:
+        page, cursor = index.search(term, status, date_filter, today=TODAY, limit=2)
+        if cursor is None:
+            continue
+        last = model.key(page[-1])
+        mutate(rng, index, model, next_id)
+
+        # The next pages hold what now matches and sorts after the last record shown.
+        expected = [r for r in filter_health_records(model.ordered(), term, status, date_filter) if model.key(r) > last]
+        found = []
+        while cursor is not None:
+            page, cursor = index.search(term, status, date_filter, today=TODAY, cursor=cursor, limit=2)
+            found += page
+        assert ids(found) == ids(expected)
+
+
+def test_store_keeps_no_index_for_unknown_users(tmp_path):
+    for store in (HealthRecordStore(), HealthRecordStore(str(tmp_path / "records.jsonl"))):
+        assert store.search("nobody") == ([], None)
+        assert store.delete("nobody", "1") is False
+        assert store._indexes == {}
+
+        store.upsert("alice", [make_record(random.Random(0), "1")])
+        assert ids(store.search("alice")[0]) == ["1"]
+        assert store.delete("alice", "1") is True
+        assert store._indexes == {}
+
+
+@pytest.fixture
+def client(monkeypatch):
+    def verify(token):
+        if token not in ("alice-token", "bob-token"):
+            raise RequestError({'error': 'Invalid or expired ID token.'}, 401)
+        return token.split("-")[0]
+
+    monkeypatch.setattr(medisense, "verify_id_token", verify)
+    monkeypatch.setattr(medisense, "health_records", HealthRecordStore())
+    return medisense.create_app(warm=False).test_client()
+
+
+def auth(user):
+    return {"Authorization": f"Bearer {user}-token"}
+
+
+def test_endpoints_require_an_id_token(client):
+    record = make_record(random.Random(0), "1")
+    assert client.post("/api/health-records", json={"record": record}).status_code == 401
+    assert client.get("/api/health-records/search").status_code == 401
+    assert client.delete("/api/health-records/1").status_code == 401
+    assert client.get("/api/health-records/search", headers={"Authorization": "Bearer forged"}).status_code == 401
+
+
+def test_records_belong_to_the_token_user(client):
+    record = make_record(random.Random(0), "1")
+    # A user_id in the body is not trusted.
+    assert client.post("/api/health-records", json={"user_id": "bob", "record": record}, headers=auth("alice")).status_code == 200
+
+    assert client.get("/api/health-records/search", headers=auth("bob")).get_json()["records"] == []
+    assert client.get("/api/health-records/search?user_id=alice", headers=auth("bob")).get_json()["records"] == []
+    assert client.delete("/api/health-records/1", headers=auth("bob")).status_code == 404
+    assert ids(client.get("/api/health-records/search", headers=auth("alice")).get_json()["records"]) == ["1"]
+    assert client.delete("/api/health-records/1", headers=auth("alice")).status_code == 200
+
+
+def test_verify_id_token_rejects_bad_tokens(monkeypatch):
+    monkeypatch.setattr(medisense, "FIREBASE_PROJECT_ID", None)
+    with pytest.raises(RequestError) as e:
+        medisense.verify_id_token("x.y.z")
+    assert e.value.status == 503
+
+    class Certs:
+        status, headers, data = 200, {}, b"{}"
+
+    monkeypatch.setattr(medisense, "FIREBASE_PROJECT_ID", "medisense-test")
+    monkeypatch.setattr(medisense, "firebase_request", lambda url, method="GET", **kwargs: Certs())
+    with pytest.raises(RequestError) as e:
+        medisense.verify_id_token("not-a-jwt")
+    assert e.value.status == 401
@@ -0,0 +1,92 @@
+import json
+import os
+import random
+
+import pytest
+
+from app import calculate_distance
+from hospital_index import HospitalIndex
+
+# A city, a region around it, and points near the north pole and the antimeridian.
+AREAS = [(12.9, 77.5, 0.3), (12.9, 77.5, 4.0), (89.0, 0.0, 0.99), (-10.0, 179.8, 0.5)]
+
+
+def make_elements(rng, count):
+    elements = []
+    for i in range(count):
+        lat_c, lng_c, spread = rng.choice(AREAS)
+        lat = lat_c + rng.uniform(-spread, spread)
+        lng = (lng_c + rng.uniform(-spread, spread) + 180) % 360 - 180
+        if rng.random() < 0.3:
+            element = {"type": "way", "id": i, "center": {"lat": lat, "lon": lng}}
+        else:
+            element = {"type": "node", "id": i, "lat": lat, "lon": lng}
+        element["tags"] = {"name": f"Hospital {i}"}
+        elements.append(element)
+    # A duplicate OSM object and one without a position are dropped.
+    return elements + [dict(elements[0]), {"type": "way", "id": count, "tags": {}}]
+
+
+def brute_force(elements, lat, lng, radius_km, k):
+    found, seen = [], set()
+    for element in elements:
+        if (element["type"], element["id"]) in seen:
+            continue
+        seen.add((element["type"], element["id"]))
+        position = element if element["type"] == "node" else element.get("center", {})
+        if "lat" not in position:
+            continue
+        distance = calculate_distance(lat, lng, position["lat"], position["lon"])
+        if distance <= radius_km:
+            found.append((distance, element["id"]))
+    found.sort()
+    return found[:k]
+
+
+@pytest.fixture
+def extract(tmp_path):
+    def write(elements):
+        path = tmp_path / "hospitals.json"
+        path.write_text(json.dumps({"elements": elements}), encoding="utf-8")
+        return str(path)
+    return write
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_query_equals_brute_force(extract, seed):
+    rng = random.Random(seed)
+    elements = make_elements(rng, 2000)
+    index = HospitalIndex(extract(elements), cell_km=rng.choice([2, 10, 50]))
+
+    for _ in range(150):
+        lat_c, lng_c, spread = rng.choice(AREAS)
+        lat = max(-90.0, min(90.0, lat_c + rng.uniform(-spread, spread)))
+        lng = (lng_c + rng.uniform(-spread, spread) + 180) % 360 - 180
+        radius = rng.choice([0.5, 1, 2, 5, 10, 50, 200, 20000])
+        k = rng.choice([None, 1, 5, 15, 100])
+
+        expected = brute_force(elements, lat, lng, radius, k)
+        found = index.query(lat, lng, radius, k)
+        assert [h["id"] for h in found] == [i for _, i in expected], (lat, lng, radius, k)
+        assert [h["distance"] for h in found] == pytest.approx([round(d, 2) for d, _ in expected], abs=0.01)
+
+
+def test_nearest_equals_brute_force(extract):
+    rng = random.Random(5)
+    elements = make_elements(rng, 500)
+    index = HospitalIndex(extract(elements), cell_km=5)
+    for lat, lng in [(12.9, 77.5), (0.0, 0.0), (-45.0, -120.0), (89.9, 100.0)]:
+        expected = brute_force(elements, lat, lng, float("inf"), 15)
+        assert [h["id"] for h in index.nearest(lat, lng, 15)] == [i for _, i in expected]
+
+
+def test_reload_picks_up_a_changed_extract(extract):
+    rng = random.Random(6)
+    path = extract(make_elements(rng, 50))
+    index = HospitalIndex(path)
+    assert len(index) == 50
+
+    extract(make_elements(rng, 80))
+    os.utime(path, (1, 1))
+    assert index.reload()
+    assert len(index) == 80
@@ -0,0 +1,9 @@
+import app as medisense
+
+
+def test_running_totals_are_exported_as_counters():
+    text = medisense.REGISTRY.render()
+    assert "# TYPE medisense_cache_lookups_total counter" in text
+    assert "# TYPE medisense_gemini_coalesced_calls_total counter" in text
+    assert 'medisense_cache_lookups_total{cache="ai_summaries",result="hit"}' in text
+    assert "# TYPE medisense_cache_entries gauge" in text
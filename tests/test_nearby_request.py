@@ -0,0 +1,33 @@
+import pytest
+
+import app as medisense
+
+
+def parse(**fields):
+    return medisense.parse_nearby_request({"latitude": 12.97, "longitude": 77.59, **fields})
+
+
+@pytest.mark.parametrize("max_distance", ["nan", "inf", "-inf", float("nan"), float("inf"), 0, -5, "far"])
+def test_rejects_non_finite_or_non_positive_distance(max_distance):
+    with pytest.raises(medisense.RequestError) as e:
+        parse(max_distance=max_distance)
+    assert e.value.status == 400
+
+
+def test_rejects_distance_beyond_cap():
+    with pytest.raises(medisense.RequestError) as e:
+        parse(max_distance=1e6)
+    assert e.value.status == 400
+    assert "at most" in e.value.payload["error"]
+
+
+def test_accepts_largest_bucket():
+    assert parse(max_distance=medisense.MAX_HOSPITAL_RADIUS_KM, limit=500)[2:] == (
+        medisense.MAX_HOSPITAL_RADIUS_KM, medisense.MAX_HOSPITAL_LIMIT)
+
+
+def test_route_answers_400_for_nan():
+    client = medisense.create_app(warm=False).test_client()
+    response = client.post("/api/nearby-hospitals", json={"latitude": 1, "longitude": 2, "max_distance": "nan"})
+    assert response.status_code == 400
+    assert response.get_json()["hospitals"] == []
@@ -0,0 +1,137 @@
+import asyncio
+
+import pytest
+
+import app as medisense
+import asgi
+from overpass_client import AsyncOverpassClient, OverpassClient
+
+EMPTY = {"elements": []}
+FOUND = {"elements": [{"type": "node", "id": 1, "lat": 1.0, "lon": 2.0}]}
+
+
+class FakeResponse:
+    def __init__(self, data):
+        self.data = data
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.data
+
+
+class FailingSession:
+    def post(self, url, data=None, timeout=None):
+        raise ConnectionError(url)
+
+
+class FakeSession:
+    def __init__(self, data):
+        self.data = data
+
+    def post(self, url, data=None, timeout=None):
+        return FakeResponse(self.data)
+
+
+def sync_client(answers):
+    client = OverpassClient(list(answers), hedge=1, timeout=1)
+    for url, data in answers.items():
+        client._sessions[url] = FakeSession(data) if data is not None else FailingSession()
+    return client
+
+
+def test_empty_answer_does_not_demote_mirror():
+    client = sync_client({"a": EMPTY, "b": EMPTY})
+    assert client.query("q") == EMPTY
+    assert [m["failures"] for m in client.stats()] == [0, 0]
+    assert [m["error_rate"] for m in client.stats()] == [0.0, 0.0]
+
+
+def test_empty_answer_still_tries_next_group():
+    client = sync_client({"a": EMPTY, "b": FOUND})
+    assert client.query("q") == FOUND
+    assert client.stats()[0]["failures"] == 0
+
+
+def test_malformed_answer_is_a_failure():
+    client = sync_client({"a": {"remark": "runtime error"}, "b": FOUND})
+    assert client.query("q") == FOUND
+    assert client.stats()[0]["failures"] == 1
+
+
+def test_async_empty_answer_does_not_demote_mirror():
+    client = AsyncOverpassClient(["a", "b"], hedge=1, timeout=1)
+    answers = {"a": EMPTY, "b": FOUND}
+
+    class FakeHttp:
+        async def post(self, url, data=None, timeout=None):
+            return FakeResponse(answers[url])
+
+    client._client = FakeHttp()
+    assert asyncio.run(client.query("q")) == FOUND
+    assert [m["failures"] for m in client.stats()] == [0, 0]
+
+
+def test_only_failures_give_none():
+    assert sync_client({"a": None, "b": EMPTY}).query("q") == EMPTY
+    assert sync_client({"a": None, "b": None}).query("q") is None
+
+
+def test_async_empty_answers_are_returned():
+    client = AsyncOverpassClient(["a", "b"], hedge=1, timeout=1)
+
+    class FakeHttp:
+        async def post(self, url, data=None, timeout=None):
+            return FakeResponse(EMPTY)
+
+    client._client = FakeHttp()
+    assert asyncio.run(client.query("q")) == EMPTY
+
+
+class CountingClient:
+    def __init__(self, data):
+        self.data, self.calls = data, 0
+
+    def query(self, query, timeout=None):
+        self.calls += 1
+        return self.data
+
+
+@pytest.fixture
+def tile_caches(monkeypatch):
+    monkeypatch.setattr(medisense, "hospital_tile_cache", medisense.TTLCache(maxsize=16, ttl=60))
+    monkeypatch.setattr(medisense, "empty_tile_cache", medisense.TTLCache(maxsize=16, ttl=60))
+
+
+@pytest.mark.usefixtures("tile_caches")
+def test_empty_tile_is_cached(monkeypatch):
+    client = CountingClient(EMPTY)
+    monkeypatch.setattr(medisense, "get_overpass_client", lambda: client)
+    assert medisense.get_hospitals_overpass(1.0, 2.0) == []
+    assert medisense.get_hospitals_overpass(1.0, 2.0) == []
+    assert client.calls == 1
+    assert len(medisense.hospital_tile_cache) == 0
+
+
+@pytest.mark.usefixtures("tile_caches")
+def test_failed_query_is_not_cached(monkeypatch):
+    client = CountingClient(None)
+    monkeypatch.setattr(medisense, "get_overpass_client", lambda: client)
+    assert medisense.get_hospitals_overpass(1.0, 2.0) == []
+    assert medisense.get_hospitals_overpass(1.0, 2.0) == []
+    assert client.calls == 2
+
+
+@pytest.mark.usefixtures("tile_caches")
+def test_async_empty_tile_is_cached(monkeypatch):
+    calls = []
+
+    async def query(query, timeout=None):
+        calls.append(query)
+        return EMPTY
+
+    monkeypatch.setattr(asgi.overpass_client, "query", query)
+    assert asyncio.run(asgi.get_hospitals_overpass(1.0, 2.0, 5, 15)) == []
+    assert asyncio.run(asgi.get_hospitals_overpass(1.0, 2.0, 5, 15)) == []
+    assert len(calls) == 1
@@ -0,0 +1,35 @@
+import threading
+
+import app as medisense
+from pdf_renderer import PDFRenderer, condition_keyword
+
+BODY = {"health_condition": "Diabetes", "recommendations": {"diet": ["less sugar"]}}
+
+
+class FixedAnalyzer:
+    symptom_severity = {"rash": 3, "chest pain": 9, "cough": 3}
+
+    def preprocess_input(self, text):
+        return ["rash", "chest pain", "cough"]
+
+
+def test_keyword_is_most_severe_symptom():
+    assert condition_keyword("whatever", FixedAnalyzer()) == "chest_pain"
+
+
+def test_render_timeout_answers_busy_and_frees_queued_slot(monkeypatch):
+    release = threading.Event()
+    renderer = PDFRenderer(workers=1, max_pending=2)
+    monkeypatch.setattr(renderer, "render", lambda *args: release.wait(5) and b"%PDF")
+    monkeypatch.setattr(medisense, "pdf_renderer", renderer)
+    monkeypatch.setattr(medisense, "PDF_RENDER_TIMEOUT", 0.05)
+    client = medisense.create_app(warm=False).test_client()
+
+    # The first render occupies the only worker; the second times out while queued.
+    first = client.post("/api/download-recommendations", json=BODY)
+    second = client.post("/api/download-recommendations", json=BODY)
+    assert first.status_code == second.status_code == 503
+    assert second.get_json() == medisense.PDF_BUSY_ERROR
+    # The cancelled queued render gave its slot back.
+    assert renderer._slots.acquire(blocking=False)
+    release.set()
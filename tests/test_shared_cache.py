@@ -0,0 +1,97 @@
+import pytest
+
+import shared_cache
+import ttl_cache
+from shared_cache import SharedCache
+from test_ttl_cache import Clock
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(shared_cache, "time", clock)
+    monkeypatch.setattr(ttl_cache, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "cache.db")
+
+
+def reader(path, namespace="test", **kwargs):
+    """A second worker's view of the cache, without an in-process copy."""
+    return SharedCache(path, namespace, local_size=0, **kwargs)
+
+
+def test_entries_are_shared_per_namespace(clock, path):
+    SharedCache(path, "test").set("a", {"x": 1})
+    assert reader(path).get("a") == {"x": 1}
+    assert reader(path, "other").get("a") is None
+
+
+def test_entries_expire_after_ttl(clock, path):
+    cache = SharedCache(path, "test", ttl=10)
+    cache.set("a", 1)
+    clock.advance(9.9)
+    assert cache.get("a") == 1
+    assert reader(path).get("a") == 1
+    clock.advance(0.1)
+    assert cache.get("a") is None
+    assert reader(path).get("a") is None
+    assert len(cache) == 0
+
+
+def test_local_copy_expires_with_the_entry(clock, path):
+    cache = SharedCache(path, "test", ttl=5, local_ttl=60)
+    cache.set("a", 1)
+    clock.advance(5)
+    assert cache.get("a") is None
+
+
+def test_evict_drops_expired_rows(clock, path):
+    cache = SharedCache(path, "test", ttl=10)
+    cache.set("a", 1)
+    clock.advance(10)
+    cache.evict()
+    count = cache._connect().execute("SELECT COUNT(*) FROM cache WHERE namespace = 'test'").fetchone()[0]
+    assert count == 0
+
+
+def test_maxsize_evicts_entries_closest_to_expiry(clock, path):
+    cache = SharedCache(path, "test", maxsize=2, ttl=10, evict_every=1)
+    for key in "abc":
+        cache.set(key, key)
+        clock.advance(1)
+    view = reader(path)
+    assert [view.get(key) for key in "abc"] == [None, "b", "c"]
+    assert cache.stats()["size"] == 2
+
+
+def test_max_weight_evicts_until_under_bound(clock, path):
+    cache = SharedCache(path, "test", maxsize=100, ttl=10, max_weight=10, weigh=len, evict_every=1)
+    for key, value in [("a", "xxxx"), ("b", "xxxx"), ("c", "xx")]:
+        cache.set(key, value)
+        clock.advance(1)
+    assert cache.stats()["weight"] == 10
+
+    cache.set("d", "xxxxxx")
+    view = reader(path)
+    assert [view.get(key) for key in "abcd"] == [None, None, "xx", "xxxxxx"]
+    assert cache.stats()["weight"] == 8
+
+
+def test_value_heavier_than_max_weight_is_not_stored(clock, path):
+    cache = SharedCache(path, "test", max_weight=4, weigh=len)
+    cache.set("a", "xxxxx")
+    assert cache.get("a") is None
+    assert reader(path).get("a") is None
+
+
+def test_unreadable_value_is_a_miss(clock, path):
+    cache = SharedCache(path, "test", local_size=0)
+    cache._connect().execute(
+        "INSERT INTO cache (namespace, key, value, expires_at, weight) VALUES ('test', '\"a\"', 'not json', ?, 1)",
+        (clock.time() + 10,))
+    assert cache.get("a", "default") == "default"
+    assert cache.stats()["errors"] == 1
@@ -0,0 +1,43 @@
+import pytest
+
+from similarity_index import SimilarityIndex
+
+
+@pytest.mark.parametrize("stored, query", [
+    ("hepatitis c", "hepatitis b"),
+    ("hepatitis b", "hepatitis a"),
+    ("hepatitis a", "hepatitis b"),
+    ("vitamin b deficiency", "vitamin d deficiency"),
+    ("hemophilia b", "hemophilia a"),
+    ("hemophilia a", "hemophilia b"),
+    ("hypothyroidism", "hyperthyroidism"),
+    ("type 1 diabetes", "type 2 diabetes"),
+    ("hiv infection", "hpv infection"),
+    ("hiv positive", "hpv positive"),
+    ("hsv outbreak", "hpv outbreak"),
+    ("hpv", "hsv"),
+    ("ptsd symptoms", "pts symptoms"),
+    ("copd flare", "cold flare"),
+    ("knee pain", "knee sprain"),
+    ("ankle sprain", "ankle pain"),
+])
+def test_contrast_markers_must_match(stored, query):
+    index = SimilarityIndex()
+    index.add(stored)
+    assert index.lookup(query) is None
+
+
+@pytest.mark.parametrize("stored, query", [
+    ("hepatitis b", "Hepatitis  B"),
+    ("vitamin d deficiency", "deficiency of vitamin d"),
+    ("lower back pain", "pain in lower back"),
+    ("high blood pressure", "high blod pressure"),
+    ("lower back pain", "lower back pains"),
+    ("migraine headache", "migrain headache"),
+    ("hiv infection", "hiv infecton"),
+    ("copd exacerbation", "copd exacerbaton"),
+])
+def test_same_condition_still_matches(stored, query):
+    index = SimilarityIndex()
+    index.add(stored)
+    assert index.lookup(query)[0] == stored
@@ -0,0 +1,138 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FuturesTimeout
+
+import pytest
+
+from single_flight import AsyncSingleFlight, SingleFlight
+
+CALLERS = 8
+ERROR = ValueError("upstream failed")
+
+
+def fail():
+    raise ERROR
+
+
+def wait_until(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.001)
+
+
+def run_together(flights, fn, key="k"):
+    """Calls flights.do() from CALLERS threads, letting ``fn`` finish only once all of them have joined."""
+    release, calls = threading.Event(), []
+
+    def leader_fn():
+        calls.append(1)
+        release.wait(5)
+        return fn()
+
+    def call():
+        try:
+            return flights.do(key, leader_fn)
+        except Exception as e:
+            return e
+
+    with ThreadPoolExecutor(CALLERS) as pool:
+        futures = [pool.submit(call) for _ in range(CALLERS)]
+        wait_until(lambda: flights.stats()["calls"] == CALLERS)
+        release.set()
+        results = [f.result() for f in futures]
+    return len(calls), results
+
+
+def test_concurrent_callers_share_one_call():
+    flights = SingleFlight(timeout=5)
+    calls, results = run_together(flights, lambda: object())
+    assert calls == 1
+    assert len({id(value) for value, _ in results}) == 1
+    assert sorted(shared for _, shared in results) == [False] + [True] * (CALLERS - 1)
+    assert flights.stats() == {"in_flight": 0, "calls": CALLERS, "executions": 1,
+                               "coalesced": CALLERS - 1, "coalesced_rate": round((CALLERS - 1) / CALLERS, 4)}
+
+
+def test_error_reaches_every_waiter():
+    calls, results = run_together(SingleFlight(timeout=5), fail)
+    assert calls == 1
+    assert results == [ERROR] * CALLERS
+
+
+def test_finished_call_is_not_remembered():
+    flights, calls = SingleFlight(), []
+    for _ in range(3):
+        assert flights.do("k", lambda: calls.append(1) or len(calls)) == (len(calls), False)
+    assert len(calls) == 3
+
+
+def test_different_keys_run_separately():
+    flights = SingleFlight()
+    assert flights.do("a", lambda: 1) == (1, False)
+    assert flights.do("b", lambda: 2) == (2, False)
+
+
+def test_follower_times_out():
+    flights, release = SingleFlight(), threading.Event()
+    leader = threading.Thread(target=flights.do, args=("k", lambda: release.wait(5)))
+    leader.start()
+    wait_until(lambda: flights.stats()["in_flight"] == 1)
+    with pytest.raises(FuturesTimeout):
+        flights.do("k", lambda: None, timeout=0.01)
+    release.set()
+    leader.join()
+
+
+def run_async(flights, fn):
+    calls = []
+
+    async def main():
+        release = asyncio.Event()
+
+        async def leader_fn():
+            calls.append(1)
+            await release.wait()
+            return fn()
+
+        tasks = [asyncio.create_task(flights.do("k", leader_fn)) for _ in range(CALLERS)]
+        while flights.stats()["calls"] < CALLERS:
+            await asyncio.sleep(0)
+        release.set()
+        return await asyncio.gather(*tasks, return_exceptions=True)
+
+    results = asyncio.run(main())
+    return len(calls), results
+
+
+def test_async_concurrent_callers_share_one_call():
+    calls, results = run_async(AsyncSingleFlight(timeout=5), lambda: object())
+    assert calls == 1
+    assert len({id(value) for value, _ in results}) == 1
+    assert sorted(shared for _, shared in results) == [False] + [True] * (CALLERS - 1)
+
+
+def test_async_error_reaches_every_waiter():
+    calls, results = run_async(AsyncSingleFlight(timeout=5), fail)
+    assert calls == 1
+    assert results == [ERROR] * CALLERS
+
+
+def test_async_cancelled_leader_fails_followers_without_cancelling_them():
+    flights = AsyncSingleFlight(timeout=5)
+
+    async def main():
+        leader = asyncio.create_task(flights.do("k", lambda: asyncio.sleep(5)))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(flights.do("k", lambda: asyncio.sleep(0)))
+        await asyncio.sleep(0)
+        leader.cancel()
+        results = await asyncio.gather(leader, follower, return_exceptions=True)
+        return results, flights.stats()["in_flight"]
+
+    (leader, follower), in_flight = asyncio.run(main())
+    assert isinstance(leader, asyncio.CancelledError)
+    assert isinstance(follower, RuntimeError)
+    assert in_flight == 0
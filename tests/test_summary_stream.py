@@ -0,0 +1,73 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import app as medisense
+import asgi
+from gemini_scheduler import AsyncGeminiScheduler, GeminiScheduler
+from ttl_cache import TTLCache
+
+BODY = {"symptoms_input": "mild cough and runny nose", "age": 30, "stream": True}
+CHUNKS = ["Overall ", "risk: ", "LOW."]
+
+
+def fake_client():
+    async def stream_async(**kwargs):
+        async def chunks():
+            for text in CHUNKS:
+                yield SimpleNamespace(text=text)
+        return chunks()
+
+    return SimpleNamespace(
+        models=SimpleNamespace(generate_content_stream=lambda **kwargs: (SimpleNamespace(text=t) for t in CHUNKS)),
+        aio=SimpleNamespace(models=SimpleNamespace(generate_content_stream=stream_async)),
+    )
+
+
+def setup(monkeypatch):
+    monkeypatch.setattr(medisense, "client", fake_client())
+    monkeypatch.setattr(medisense, "summary_cache", TTLCache())
+
+
+def test_flask_releases_slot_before_client_reads(monkeypatch):
+    setup(monkeypatch)
+    scheduler = GeminiScheduler(max_in_flight=1)
+    monkeypatch.setattr(medisense, "gemini_scheduler", scheduler)
+    response = medisense.create_app(warm=False).test_client().post(
+        "/api/symptom-analysis", json=BODY, buffered=False)
+    body = iter(response.response)
+    assert next(body).startswith(b"event: analysis")
+    assert next(body).startswith(b"event: token")
+
+    # Only the first token was read, yet the upstream stream has finished and given its slot back.
+    started = time.monotonic()
+    while scheduler.in_flight or scheduler.admitted == 0:
+        assert time.monotonic() - started < 5
+        time.sleep(0.01)
+    rest = b"".join(body).decode()
+    response.close()
+    assert rest.count("event: token") == len(CHUNKS) - 1
+    assert '"ai_summary": "Overall risk: LOW."' in rest
+
+
+def test_asgi_releases_slot_before_client_reads(monkeypatch):
+    setup(monkeypatch)
+    scheduler = AsyncGeminiScheduler(max_in_flight=1)
+    monkeypatch.setattr(asgi, "gemini_scheduler", scheduler)
+
+    async def run():
+        # Straight from the body iterator: the test transport would read the whole body first.
+        result = medisense.run_analysis("mild cough", 30, 0, None)
+        body = asgi.stream_analysis(result, "mild cough", 30, 0).body_iterator
+        assert (await anext(body)).startswith("event: analysis")
+        assert (await anext(body)).startswith("event: token")
+        for _ in range(50):
+            if scheduler.admitted and not scheduler.in_flight:
+                break
+            await asyncio.sleep(0.01)
+        assert scheduler.admitted and not scheduler.in_flight
+        return "".join([event async for event in body])
+
+    rest = asyncio.run(run())
+    assert rest.count("event: token") == len(CHUNKS) - 1
+    assert '"ai_summary": "Overall risk: LOW."' in rest
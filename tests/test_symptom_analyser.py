@@ -0,0 +1,57 @@
+import random
+
+import pytest
+
+from symptom_analyser import SymptomAnalyzer
+from symptom_lexicon import DEFAULT_LEXICON_PATH, SymptomLexicon
+from test_symptom_matcher import LEXICON, texts
+
+ANALYZER = SymptomAnalyzer(SymptomLexicon(DEFAULT_LEXICON_PATH))
+AGES = [None, 0, 1, 18, 32, 33, 45, 70, 95, 120]
+DURATIONS = [None, 0, 1, 3, 7, 30, 365]
+
+
+def without_timestamp(result):
+    return {k: v for k, v in result.items() if k != "timestamp"}
+
+
+def same_score(batch, scalar):
+    assert batch.keys() == scalar.keys()
+    for key, value in scalar.items():
+        if isinstance(value, float):
+            assert batch[key] == pytest.approx(value, rel=1e-12), key
+        else:
+            assert batch[key] == value, key
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_compute_severity_scores_equals_scalar(seed):
+    rng = random.Random(seed)
+    terms = list(LEXICON.severity)
+    symptom_lists = [rng.sample(terms, rng.choice([0, 1, 1, 2, 3, 5, 8])) for _ in range(400)]
+    ages = [rng.choice(AGES) for _ in symptom_lists]
+    durations = [rng.choice(DURATIONS) for _ in symptom_lists]
+
+    batch = ANALYZER.compute_severity_scores(symptom_lists, ages, durations, LEXICON.severity)
+    for row, symptoms in enumerate(symptom_lists):
+        scalar = ANALYZER.compute_severity_score(symptoms, ages[row], durations[row], LEXICON.severity)
+        same_score(batch[row], scalar)
+
+
+def test_compute_severity_scores_defaults_match_scalar():
+    symptom_lists = [[], ["fever"], ["fever", "cough"]]
+    batch = ANALYZER.compute_severity_scores(symptom_lists)
+    for row, symptoms in enumerate(symptom_lists):
+        same_score(batch[row], ANALYZER.compute_severity_score(symptoms))
+
+
+def test_analyze_many_equals_analyze():
+    rng = random.Random(7)
+    records = [{"symptoms_input": text, "age": rng.choice(AGES), "duration_days": rng.choice(DURATIONS)}
+               for text in texts(7, 300, list(LEXICON.severity)) + ["", "nothing to see here"]]
+
+    batch = ANALYZER.analyze_many(records, normalized=True)
+    assert len(batch) == len(records)
+    for record, result in zip(records, batch):
+        scalar = ANALYZER.analyze(record["symptoms_input"], record["age"], record["duration_days"], normalized=True)
+        same_score(without_timestamp(result), without_timestamp(scalar))
@@ -0,0 +1,55 @@
+import random
+
+import pytest
+from rapidfuzz import fuzz
+
+from symptom_analyser import SymptomAnalyzer
+from symptom_lexicon import DEFAULT_LEXICON_PATH, SymptomLexicon
+from symptom_matcher import SymptomMatcher, contains_phrase
+from test_symptom_matcher import texts
+
+LEXICON = SymptomLexicon(DEFAULT_LEXICON_PATH).current
+ANALYZER = SymptomAnalyzer(SymptomLexicon(DEFAULT_LEXICON_PATH))
+
+
+@pytest.mark.parametrize("text, absent", [
+    ("coughing", "bloody cough"),
+    ("couh", "bloody cough"),
+    ("i passed", "loss of consciousness"),
+    ("the screen blacked", "loss of consciousness"),
+    ("throwing things", "vomiting"),
+    ("my stomach", "abdominal pain"),
+    ("emes", "vomiting"),
+    ("i am exhausted", "fatigue"),
+])
+def test_synonym_fragments_do_not_match(text, absent):
+    assert absent not in ANALYZER.preprocess_input(text)
+
+
+@pytest.mark.parametrize("text, term", [
+    ("bad stomach ache since monday", "abdominal pain"),
+    ("pyrexia", "fever"),
+    ("two days of emesis", "vomiting"),
+    ("loose stools", "diarrhea"),
+])
+def test_whole_synonyms_match_their_term(text, term):
+    assert term in ANALYZER.preprocess_input(text)
+
+
+def test_synonyms_change_only_texts_that_contain_one():
+    plain = SymptomMatcher(LEXICON.severity, threshold=LEXICON.matcher.threshold)
+    synonyms = [s for forms in LEXICON.synonyms.values() for s in forms]
+    for text in texts(4, 1500, list(LEXICON.severity) + synonyms):
+        if not any(contains_phrase(s, text) for s in synonyms):
+            assert LEXICON.matcher.find(text) == plain.find(text), text
+
+
+def test_match_equals_scoring_every_spelling():
+    matcher = LEXICON.matcher
+    synonyms = set(matcher.symptoms) - set(LEXICON.severity)
+    for text in texts(5, 800, matcher.symptoms):
+        expected = [
+            s for s in matcher.symptoms
+            if (contains_phrase(s, text) if s in synonyms else fuzz.partial_ratio(s, text) > matcher.threshold)
+        ]
+        assert matcher.match(text) == expected, text
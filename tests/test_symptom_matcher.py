@@ -0,0 +1,81 @@
+import random
+
+import pytest
+from rapidfuzz import fuzz
+
+from symptom_lexicon import DEFAULT_LEXICON_PATH, load_lexicon
+from symptom_matcher import SymptomMatcher
+from text_normalizer import normalize
+
+LEXICON = load_lexicon(DEFAULT_LEXICON_PATH)
+FILLER = "i have had a bad since yesterday and it gets worse at night my left side".split()
+
+
+def typo(word, rng):
+    """``word`` with one character dropped, doubled, swapped or replaced."""
+    if len(word) < 3:
+        return word
+    i = rng.randrange(len(word) - 1)
+    return rng.choice([
+        word[:i] + word[i + 1:],
+        word[:i] + word[i] + word[i:],
+        word[:i] + word[i + 1] + word[i] + word[i + 2:],
+        word[:i] + rng.choice("aeiourst") + word[i + 1:],
+    ])
+
+
+def make_text(rng, spellings, words):
+    out = []
+    for _ in range(words):
+        roll = rng.random()
+        if roll < 0.2:
+            out.extend(rng.choice(spellings).split())
+        elif roll < 0.35:
+            out.extend(typo(w, rng) for w in rng.choice(spellings).split())
+        elif roll < 0.45:
+            out.append(rng.choice(rng.choice(spellings).split()))
+        else:
+            out.append(rng.choice(FILLER))
+    return normalize(" ".join(out))
+
+
+def texts(seed, count, spellings):
+    rng = random.Random(seed)
+    return [make_text(rng, spellings, rng.choice([1, 2, 4, 8, 20, 60])) for _ in range(count)]
+
+
+def test_match_equals_scoring_every_symptom():
+    # The loop SymptomMatcher replaced, over the terms alone.
+    matcher = SymptomMatcher(LEXICON.severity)
+    for text in texts(0, 800, list(LEXICON.severity)) + ["", "a", "fever", "chest"]:
+        assert matcher.match(text) == [s for s in LEXICON.severity if fuzz.partial_ratio(s, text) > 80], text
+
+
+@pytest.mark.parametrize("threshold", [60, 70, 90])
+def test_match_is_exact_at_other_thresholds(threshold):
+    matcher = SymptomMatcher(LEXICON.severity, threshold=threshold)
+    for text in texts(threshold, 300, list(LEXICON.severity)):
+        assert matcher.match(text) == [s for s in LEXICON.severity if fuzz.partial_ratio(s, text) > threshold], text
+
+
+def follow_up(rng, text, spellings):
+    """``text`` with words appended, a span rewritten, or its end cut off, as a user edits a submission."""
+    kind = rng.choice(["append", "append", "edit", "truncate"])
+    if kind == "append" or not text:
+        return normalize(text + " " + make_text(rng, spellings, rng.choice([1, 3, 10])))
+    if kind == "edit":
+        i = rng.randrange(len(text))
+        return normalize(text[:i] + " " + make_text(rng, spellings, 2) + " " + text[i + rng.randint(0, 15):])
+    return text[:rng.randrange(len(text))].strip()
+
+
+def test_match_incremental_equals_match():
+    matcher = LEXICON.matcher
+    rng = random.Random(2)
+    for text in texts(3, 150, matcher.symptoms):
+        matches = matcher.match(text)
+        for _ in range(6):
+            new_text = follow_up(rng, text, matcher.symptoms)
+            matches = matcher.match_incremental(new_text, text, matches)
+            assert matches == matcher.match(new_text), (text, new_text)
+            text = new_text
@@ -0,0 +1,68 @@
+import random
+import re
+
+from symptom_analyser import SymptomAnalyzer
+from symptom_lexicon import Lexicon
+from symptom_matcher import SymptomMatcher
+from test_symptom_matcher import LEXICON
+from text_normalizer import normalize, without_numbers
+
+# The route and analyzer normalization that text_normalizer replaced.
+OLD_FILLER = re.compile(r'\b(i have|i feel|i am|feeling|experiencing|having|suffering from|with|and|but|the|a|an)\b')
+
+
+def old_route_text(symptoms_input):
+    return re.sub(
+        r'\b(i have|i am|im|my|i feel|i got|i suffer from|having|got|is|was|the|a|an)\b',
+        '',
+        re.sub(r'[^a-z0-9 ,.-]', '', re.sub(r'\s+', ' ', str(symptoms_input).strip().lower()))
+    ).strip()
+
+
+def old_matcher_text(text):
+    text = OLD_FILLER.sub('', text.lower())
+    text = re.sub(r'[^a-z\s]', ' ', text)
+    return re.sub(r'\s+', ' ', text).strip()
+
+
+class FixedLexicon:
+    # Terms only, as the analyzer had before synonyms.
+    current = Lexicon("test", "test", LEXICON.severity, {}, SymptomMatcher(LEXICON.severity))
+
+
+WORDS = "i have my was got feeling with and but the a an since for about it hurts bad".split()
+NUMBERS = ["3", "39.5", "102", "2", "10", "7.2", "1st", "24h", "x2", "100.4f"]
+PUNCTUATION = [",", ".", "-", "!", "?", ";", "/"]
+
+
+def make_input(rng):
+    parts = []
+    for _ in range(rng.choice([1, 3, 6, 12, 25])):
+        roll = rng.random()
+        if roll < 0.3:
+            parts.append(rng.choice(list(LEXICON.severity)))
+        elif roll < 0.5:
+            parts.append(rng.choice(NUMBERS))
+        elif roll < 0.6:
+            parts[-1:] = [p + rng.choice(PUNCTUATION) for p in parts[-1:]]
+        else:
+            parts.append(rng.choice(WORDS))
+    text = " ".join(parts)
+    return text.upper() if rng.random() < 0.1 else text
+
+
+def test_detections_match_old_pipeline():
+    analyzer = SymptomAnalyzer(FixedLexicon())
+    matcher = FixedLexicon.current.matcher
+    rng = random.Random(0)
+    for _ in range(1500):
+        text = make_input(rng)
+        expected = matcher.find(old_matcher_text(old_route_text(text)))
+        # The route normalizes once and hands the analyzer normalized text; other callers pass raw text.
+        assert analyzer.preprocess_input(normalize(text), normalized=True) == expected, text
+        assert analyzer.preprocess_input(text) == expected, text
+
+
+def test_without_numbers():
+    assert without_numbers(normalize("Fever 39.5 for 3 days, x2")) == "fever for days x"
+    assert without_numbers("") == ""
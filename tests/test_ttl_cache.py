@@ -0,0 +1,98 @@
+import pytest
+
+import ttl_cache
+from ttl_cache import TTLCache
+
+
+class Clock:
+    """Stands in for the time module; both clocks move only when told to."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+    def time(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(ttl_cache, "time", clock)
+    return clock
+
+
+def test_entries_expire_after_ttl(clock):
+    cache = TTLCache(maxsize=8, ttl=10)
+    cache.set("a", 1)
+    clock.advance(9.9)
+    assert cache.get("a") == 1
+    clock.advance(0.1)
+    assert cache.get("a") is None
+    assert len(cache) == 0
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+
+def test_set_restarts_ttl(clock):
+    cache = TTLCache(maxsize=8, ttl=10)
+    cache.set("a", 1)
+    clock.advance(8)
+    cache.set("a", 2)
+    clock.advance(8)
+    assert cache.get("a") == 2
+
+
+def test_expired_entry_gives_back_its_weight(clock):
+    cache = TTLCache(maxsize=8, ttl=10, max_weight=10, weigh=len)
+    cache.set("a", "xxxxxx")
+    clock.advance(10)
+    assert cache.get("a") is None
+    assert cache.weight == 0
+    cache.set("b", "yyyyyyyyyy")
+    assert cache.get("b") == "yyyyyyyyyy"
+
+
+def test_maxsize_evicts_least_recently_used(clock):
+    cache = TTLCache(maxsize=2, ttl=10)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == (1, 3)
+    assert cache.evictions == 1
+
+
+def test_max_weight_evicts_until_under_bound(clock):
+    cache = TTLCache(maxsize=100, ttl=10, max_weight=10, weigh=len)
+    for key, value in [("a", "xxxx"), ("b", "xxxx"), ("c", "xx")]:
+        cache.set(key, value)
+    assert cache.weight == 10
+
+    cache.set("d", "xxxxxx")
+    assert cache.get("a") is None and cache.get("b") is None
+    assert (cache.get("c"), cache.get("d")) == ("xx", "xxxxxx")
+    assert cache.weight == 8
+    assert cache.evictions == 2
+
+
+def test_replacing_an_entry_updates_its_weight(clock):
+    cache = TTLCache(maxsize=100, ttl=10, max_weight=10, weigh=len)
+    cache.set("a", "xxxxxxxx")
+    cache.set("a", "xx")
+    cache.set("b", "xxxxxxxx")
+    assert cache.weight == 10
+    assert cache.get("a") == "xx"
+
+
+def test_value_heavier_than_max_weight_is_not_stored(clock):
+    cache = TTLCache(maxsize=100, ttl=10, max_weight=4, weigh=len)
+    cache.set("a", "xxx")
+    cache.set("b", "xxxxx")
+    assert cache.get("b") is None
+    assert cache.get("a") == "xxx"
@@ -0,0 +1,43 @@
+import re
+from typing import List
+
+# Filler phrases dropped from symptom descriptions before matching. Phrases
+# of several words match across any run of whitespace.
+STOPWORDS = [
+    "i suffer from", "suffering from", "experiencing", "feeling", "having",
+    "i have", "i feel", "i am", "i got", "im", "my", "got",
+    "with", "and", "but", "is", "was", "the", "an", "a",
+]
+
+_STOPWORD_ALTERNATION = "|".join(
+    r"\s+".join(map(re.escape, phrase.split())) for phrase in sorted(STOPWORDS, key=len, reverse=True)
+)
+# One scan: a stopword phrase matches the first branch and yields "", any
+# other word or number is captured. Everything else (punctuation,
+# whitespace, non-ASCII letters) is skipped.
+TOKEN_PATTERN = re.compile(rf"\b(?:{_STOPWORD_ALTERNATION})\b|([a-z]+|[0-9]+(?:\.[0-9]+)?)")
+APOSTROPHES = str.maketrans("", "", "'’")
+
+
+def tokenize(text) -> List[str]:
+    """Lower-cased word and number tokens of ``text``, without stopwords or punctuation."""
+    return [token for token in TOKEN_PATTERN.findall(str(text).lower().translate(APOSTROPHES)) if token]
+
+
+def normalize(text) -> str:
+    """
+    The normalized form of a symptom description: its tokens joined by
+    single spaces. Routes normalize input once with this; SymptomAnalyzer
+    matches on the same string, and it is what Gemini prompts and
+    responses echo back.
+    """
+    return " ".join(tokenize(text))
+
+
+def without_numbers(normalized: str) -> str:
+    """
+    ``normalized`` text without its number tokens. Symptoms are matched on
+    this: numbers ("39.5", "3 days") name no symptom, but fuzzy matching
+    would score them as part of a nearby one.
+    """
+    return " ".join(token for token in normalized.split(" ") if token and not token[0].isdigit())
@@ -0,0 +1,88 @@
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+
+class TTLCache:
+    """
+    Thread-safe, size-bounded LRU cache whose entries expire after a fixed TTL.
+    Keeps hit/miss/eviction counters for monitoring.
+
+    Besides the entry count, the cache can be bounded by total weight: pass
+    ``weigh`` (value -> int) and ``max_weight`` to cap e.g. the number of
+    elements held across all entries.
+    """
+
+    _MISSING = object()
+
+    def __init__(self, maxsize: int = 256, ttl: float = 3600,
+                 max_weight: Optional[int] = None, weigh: Optional[Callable[[Any], int]] = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.max_weight = max_weight
+        self.weigh = weigh or (lambda value: 1)
+        self.weight = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key, self._MISSING)
+            if entry is self._MISSING:
+                self.misses += 1
+                return default
+
+            expires_at, value, weight = entry
+            if expires_at <= now:
+                del self._data[key]
+                self.weight -= weight
+                self.misses += 1
+                return default
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        if self.maxsize <= 0:
+            return
+        weight = self.weigh(value)
+        if self.max_weight is not None and weight > self.max_weight:
+            return
+        with self._lock:
+            previous = self._data.pop(key, None)
+            if previous is not None:
+                self.weight -= previous[2]
+            self._data[key] = (time.monotonic() + self.ttl, value, weight)
+            self.weight += weight
+            while len(self._data) > self.maxsize or (self.max_weight is not None and self.weight > self.max_weight):
+                _, (_, _, evicted_weight) = self._data.popitem(last=False)
+                self.weight -= evicted_weight
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.weight = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "weight": self.weight,
+            "max_weight": self.max_weight,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }